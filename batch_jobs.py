@@ -0,0 +1,413 @@
+"""
+Batch Job Runner
+
+This module runs offline work such as nightly article generation or
+transcript summarization through the OpenAI Batch API instead of one
+synchronous request at a time. Batch requests are billed at a discount and
+do not count against the per-minute rate limits, which makes them the
+cheapest way to push many prompts through when nobody waits on the result.
+
+Dependencies:
+    - openai: The official OpenAI Python client library
+    - Environment variable OPENAI_API_KEY must be set
+
+Features:
+    - Build Batch API JSONL files from article specs or transcript chunks
+    - Upload, submit and poll with exponential backoff
+    - Results downloaded once and parsed line by line, never held in memory
+    - Outputs mapped back to inputs by custom_id
+    - Resumable: job state lives on disk, so an interrupted run picks up
+      where it stopped without submitting the batch twice
+
+Example:
+    $ export OPENAI_API_KEY='your-api-key'
+    $ python batch_jobs.py articles specs.json --directory jobs/articles
+    $ python batch_jobs.py summaries transcript.txt --directory jobs/summaries
+
+    from batch_jobs import BatchJob, article_requests
+
+    job = BatchJob("jobs/articles")
+    results = job.run(article_requests(specs))
+    print(results["article-0"].content)
+"""
+
+import argparse
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from openai import OpenAI
+
+from news_generator import build_messages
+from openai_client import get_client
+from text_chunking import chunk_text
+from token_budget import fit_max_tokens, max_tokens_for_words
+from youtube_summarization import SUMMARY_PROMPT
+
+DEFAULT_MODEL = "gpt-4"
+CHAT_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+POLL_INTERVAL = 5.0
+MAX_POLL_INTERVAL = 300.0
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def chat_request(custom_id: str, **body) -> Dict[str, Any]:
+    """
+    Build one chat completion line of a batch input file.
+
+    Args:
+        custom_id (str): Identifier used to match the output to this request
+        **body: Keyword arguments of chat.completions.create
+
+    Returns:
+        Dict[str, Any]: Batch request line
+    """
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": CHAT_ENDPOINT,
+        "body": body,
+    }
+
+
+def article_requests(
+    specs: Sequence[Dict[str, Any]], model: str = DEFAULT_MODEL
+) -> List[Dict[str, Any]]:
+    """
+    Build batch requests for news articles.
+
+    Args:
+        specs (Sequence[Dict[str, Any]]): Article specs with facts, tone,
+            length_words and style, and optionally an id
+        model (str): OpenAI model to use
+
+    Returns:
+        List[Dict[str, Any]]: Batch request lines, custom_id "article-<n>"
+        unless the spec has an id
+
+    Raises:
+        ValueError: If a spec is invalid
+        ContextOverflowError: If a spec's prompt leaves no room for the article
+    """
+    requests = []
+    for position, spec in enumerate(specs):
+        # Same messages and budget as news_generator.assist_journalist
+        messages = build_messages(
+            spec["facts"], spec["tone"], spec["length_words"], spec["style"]
+        )
+        requests.append(
+            chat_request(
+                str(spec.get("id", f"article-{position}")),
+                model=model,
+                messages=messages,
+                max_tokens=fit_max_tokens(
+                    messages, model, max_tokens_for_words(spec["length_words"])
+                ),
+            )
+        )
+    return requests
+
+
+def summary_requests(
+    chunks: Sequence[str], model: str = DEFAULT_MODEL, prompt: str = SUMMARY_PROMPT
+) -> List[Dict[str, Any]]:
+    """
+    Build batch requests summarizing transcript chunks.
+
+    Args:
+        chunks (Sequence[str]): Text chunks to summarize
+        model (str): OpenAI model to use
+        prompt (str): System prompt describing the summarization task
+
+    Returns:
+        List[Dict[str, Any]]: Batch request lines, custom_id "chunk-<n>"
+    """
+    return [
+        chat_request(
+            f"chunk-{position}",
+            model=model,
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": chunk},
+            ],
+        )
+        for position, chunk in enumerate(chunks)
+    ]
+
+
+def write_jsonl(requests: Iterable[Dict[str, Any]], path: str) -> int:
+    """
+    Write batch request lines to a JSONL file.
+
+    Args:
+        requests (Iterable[Dict[str, Any]]): Batch request lines
+        path (str): File to write
+
+    Returns:
+        int: Number of lines written
+
+    Raises:
+        ValueError: If two requests share a custom_id
+    """
+    seen = set()
+    temporary = f"{path}.tmp"
+    try:
+        with open(temporary, "w", encoding="utf-8") as jsonl_file:
+            for request in requests:
+                if request["custom_id"] in seen:
+                    raise ValueError(f"Duplicate custom_id {request['custom_id']}")
+                seen.add(request["custom_id"])
+                jsonl_file.write(json.dumps(request, separators=(",", ":")) + "\n")
+    except ValueError:
+        os.remove(temporary)
+        raise
+    os.replace(temporary, path)
+    return len(seen)
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one batch request."""
+
+    custom_id: str
+    content: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        """Whether the request produced a completion."""
+        return self.error is None
+
+
+def parse_result_line(line: str) -> BatchResult:
+    """
+    Parse one line of a batch output or error file.
+
+    Args:
+        line (str): JSON line written by the Batch API
+
+    Returns:
+        BatchResult: Completion text or error message of the request
+    """
+    record = json.loads(line)
+    custom_id = record["custom_id"]
+    if record.get("error"):
+        return BatchResult(custom_id, error=record["error"].get("message"))
+    response = record.get("response") or {}
+    body = response.get("body") or {}
+    if response.get("status_code") != 200:
+        message = (body.get("error") or {}).get("message")
+        return BatchResult(
+            custom_id, error=message or f"HTTP {response.get('status_code')}"
+        )
+    return BatchResult(custom_id, content=body["choices"][0]["message"]["content"])
+
+
+class BatchJob:
+    """
+    A Batch API job whose progress is kept in a directory.
+
+    The directory holds the input file, the job state and the downloaded
+    results. Every step is skipped when its result is already recorded,
+    so calling run again resumes an interrupted job.
+
+    Args:
+        directory (str): Directory holding the job files
+        client (Optional[OpenAI]): Client to use, defaults to the shared client
+    """
+
+    def __init__(self, directory: str, client: Optional[OpenAI] = None):
+        self.directory = directory
+        self.client = client
+        self.input_path = os.path.join(directory, "input.jsonl")
+        self.state_path = os.path.join(directory, "state.json")
+        self.output_path = os.path.join(directory, "output.jsonl")
+        self.errors_path = os.path.join(directory, "errors.jsonl")
+        os.makedirs(directory, exist_ok=True)
+        self.state: Dict[str, Any] = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as state_file:
+                self.state = json.load(state_file)
+
+    def _client(self) -> OpenAI:
+        return self.client or get_client()
+
+    def _save_state(self, **changes):
+        self.state.update(changes)
+        temporary = f"{self.state_path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as state_file:
+            json.dump(self.state, state_file, indent=2)
+        os.replace(temporary, self.state_path)
+
+    def prepare(self, requests: Iterable[Dict[str, Any]]) -> int:
+        """
+        Write the input file unless the job already has one.
+
+        Args:
+            requests (Iterable[Dict[str, Any]]): Batch request lines
+
+        Returns:
+            int: Number of requests in the input file
+        """
+        if "requests" not in self.state:
+            self._save_state(requests=write_jsonl(requests, self.input_path))
+        return self.state["requests"]
+
+    def submit(self, metadata: Optional[Dict[str, str]] = None) -> str:
+        """
+        Upload the input file and create the batch, unless already done.
+
+        Args:
+            metadata (Optional[Dict[str, str]]): Metadata attached to the batch
+
+        Returns:
+            str: Batch ID
+        """
+        if "input_file_id" not in self.state:
+            with open(self.input_path, "rb") as input_file:
+                uploaded = self._client().files.create(file=input_file, purpose="batch")
+            self._save_state(input_file_id=uploaded.id)
+        if "batch_id" not in self.state:
+            batch = self._client().batches.create(
+                input_file_id=self.state["input_file_id"],
+                endpoint=CHAT_ENDPOINT,
+                completion_window=COMPLETION_WINDOW,
+                metadata=metadata,
+            )
+            self._save_state(batch_id=batch.id, status=batch.status)
+        return self.state["batch_id"]
+
+    def wait(
+        self,
+        poll_interval: float = POLL_INTERVAL,
+        max_interval: float = MAX_POLL_INTERVAL,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """
+        Poll the batch until it reaches a terminal status.
+
+        The polling interval doubles after every check, up to max_interval.
+
+        Args:
+            poll_interval (float): Seconds before the second check
+            max_interval (float): Longest wait between checks
+            timeout (Optional[float]): Give up after this many seconds
+
+        Returns:
+            str: Final batch status
+
+        Raises:
+            TimeoutError: If the batch is still running after timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = poll_interval
+        while self.state.get("status") not in TERMINAL_STATUSES:
+            batch = self._client().batches.retrieve(self.state["batch_id"])
+            self._save_state(
+                status=batch.status,
+                output_file_id=batch.output_file_id,
+                error_file_id=batch.error_file_id,
+            )
+            if batch.status in TERMINAL_STATUSES:
+                break
+            if deadline is not None and time.monotonic() + interval > deadline:
+                raise TimeoutError(
+                    f"Batch {batch.id} is still {batch.status} after {timeout}s"
+                )
+            time.sleep(interval)
+            interval = min(interval * 2, max_interval)
+        return self.state["status"]
+
+    def _download(self, file_id: Optional[str], path: str):
+        if not file_id or os.path.exists(path):
+            return
+        temporary = f"{path}.tmp"
+        with self._client().files.with_streaming_response.content(file_id) as response:
+            with open(temporary, "wb") as result_file:
+                for data in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    result_file.write(data)
+        os.replace(temporary, path)
+
+    def iter_results(self) -> Iterator[BatchResult]:
+        """
+        Download the result files once and parse them line by line.
+
+        Yields:
+            BatchResult: One result per request, in file order
+        """
+        self._download(self.state.get("output_file_id"), self.output_path)
+        self._download(self.state.get("error_file_id"), self.errors_path)
+        for path in (self.output_path, self.errors_path):
+            if not os.path.exists(path):
+                continue
+            with open(path, "r", encoding="utf-8") as result_file:
+                for line in result_file:
+                    if line.strip():
+                        yield parse_result_line(line)
+
+    def run(
+        self,
+        requests: Iterable[Dict[str, Any]],
+        poll_interval: float = POLL_INTERVAL,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, BatchResult]:
+        """
+        Prepare, submit and wait for the job, then collect its results.
+
+        Args:
+            requests (Iterable[Dict[str, Any]]): Batch request lines; ignored
+                when the job directory already has an input file
+            poll_interval (float): Seconds before the second status check
+            timeout (Optional[float]): Give up waiting after this many seconds
+
+        Returns:
+            Dict[str, BatchResult]: Results keyed by custom_id
+
+        Raises:
+            RuntimeError: If the batch failed, expired or was cancelled
+        """
+        self.prepare(requests)
+        self.submit()
+        status = self.wait(poll_interval, timeout=timeout)
+        if status != "completed":
+            raise RuntimeError(f"Batch {self.state['batch_id']} ended as {status}")
+        return {result.custom_id: result for result in self.iter_results()}
+
+
+def main():
+    """Run an article or summary batch from the command line."""
+    parser = argparse.ArgumentParser(description="Run an OpenAI Batch API job")
+    parser.add_argument("kind", choices=["articles", "summaries"])
+    parser.add_argument(
+        "input", help="JSON list of article specs, or a text file to summarize"
+    )
+    parser.add_argument("--directory", default="batch_job")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+
+    with open(args.input, "r", encoding="utf-8") as input_file:
+        if args.kind == "articles":
+            requests = article_requests(json.load(input_file), args.model)
+        else:
+            requests = summary_requests(chunk_text(input_file.read()), args.model)
+
+    job = BatchJob(args.directory)
+    results = job.run(requests, args.poll_interval)
+    for request in requests:
+        result = results.get(request["custom_id"])
+        if result is None:
+            print(f"{request['custom_id']}: no result")
+        elif result.ok:
+            print(f"{request['custom_id']}: {result.content}")
+        else:
+            print(f"{request['custom_id']}: error: {result.error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Endpoint Benchmark Suite
+
+This script runs every endpoint wrapper in the repository against the local
+stub server and measures latency percentiles, throughput at several
+concurrency levels and peak memory. Results are saved as JSON, and a
+previous results file can be given to flag regressions between runs.
+
+Dependencies:
+    - openai: The official OpenAI Python client library
+    - numpy: Used by the embeddings wrapper
+
+Features:
+    - Chat, embeddings, moderation, text-to-speech, speech-to-text, a
+      TTS to STT round trip, image generation, vision and tool calls
+    - Configurable stub latency, streaming delay and injected error rate
+    - p50/p95/p99 latency, throughput and error count per concurrency level
+    - Peak resident set size of the process after every case
+    - JSON output and comparison against an earlier run
+
+Example:
+    $ python benchmark.py --requests 100 --concurrency 1 8 32 --output run.json
+    $ python benchmark.py --error-rate 0.05 --compare run.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from embeddings import embed_texts, embedding_limiter
+from image_generation import generate_image, image_limiter
+from mock_openai_server import start_server
+from moderation import moderation_limiter
+from moderation_guard import ModerationGuard
+from news_generator import ask_chatgpt
+from openai_client import configure
+from rate_limiter import default_limiter
+from speech_to_text import transcribe_file, transcription_limiter
+from text_to_speech import speech_limiter, synthesize
+from tool_call import run_tool_loop
+from vision import ask_about_images
+
+AUDIO_FILE = "output.mp3"
+VISION_IMAGE = "https://example.com/a.jpg"
+REGRESSION_TOLERANCE = 0.2
+
+Case = Callable[[int], None]
+
+
+def _chat(i: int):
+    ask_chatgpt(
+        [{"role": "user", "content": f"Benchmark prompt {i}"}], bypass_cache=True
+    )
+
+
+def _embeddings(i: int):
+    embed_texts([f"benchmark text {i} {n}" for n in range(16)])
+
+
+_guard = ModerationGuard()
+
+
+def _moderation(i: int):
+    _guard.check(f"benchmark comment {i}")
+
+
+def _text_to_speech(i: int):
+    with tempfile.NamedTemporaryFile(suffix=".mp3") as audio_file:
+        synthesize(f"Benchmark sentence number {i}.", audio_file.name)
+
+
+def _speech_to_text(i: int):
+    transcribe_file(AUDIO_FILE)
+
+
+def _round_trip(i: int):
+    text = f"round trip number {i} done"
+    with tempfile.NamedTemporaryFile(suffix=".mp3") as audio_file:
+        synthesize(text, audio_file.name)
+        segments, _ = transcribe_file(audio_file.name)
+    heard = " ".join(segment.text for segment in segments)
+    if heard.split() != text.split():
+        raise ValueError(f"Round trip mismatch: {heard!r}")
+
+
+def _image(i: int):
+    with tempfile.NamedTemporaryFile(suffix=".png") as image_file:
+        generate_image(f"Benchmark image {i}", image_file.name)
+
+
+def _vision(i: int):
+    ask_about_images([VISION_IMAGE], f"Give the name of the animal in image {i}")
+
+
+def _tool_calls(i: int):
+    run_tool_loop(
+        [{"role": "user", "content": f"SELECT name FROM products LIMIT {i % 5 + 1}"}],
+        bypass_cache=True,
+    )
+
+
+CASES: Dict[str, Case] = {
+    "chat": _chat,
+    "embeddings": _embeddings,
+    "moderation": _moderation,
+    "text_to_speech": _text_to_speech,
+    "speech_to_text": _speech_to_text,
+    "tts_stt_round_trip": _round_trip,
+    "image_generation": _image,
+    "vision": _vision,
+    "tool_calls": _tool_calls,
+}
+
+
+def percentile(samples: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted samples, None when there are none."""
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in megabytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def run_case(case: Case, total: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Call a case total times with the given number of threads.
+
+    Args:
+        case (Case): Benchmark case, called with the request number
+        total (int): Number of calls
+        concurrency (int): Number of calls in flight
+
+    Returns:
+        Dict[str, Any]: Latency percentiles in seconds, throughput in
+        successful calls per second, error count and first error message
+    """
+    latencies: List[float] = []
+    errors: List[str] = []
+
+    def call(i: int):
+        started = time.perf_counter()
+        try:
+            case(i)
+        except Exception as e:  # pylint: disable=broad-except
+            errors.append(f"{type(e).__name__}: {e}")
+        else:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def compare(results: List[Dict[str, Any]], previous: Dict[str, Any], tolerance: float):
+    """
+    Print changes against an earlier run, marking regressions.
+
+    Args:
+        results (List[Dict[str, Any]]): Results of this run
+        previous (Dict[str, Any]): Contents of an earlier results file
+        tolerance (float): Relative slowdown reported as a regression
+    """
+    before = {(r["case"], r["concurrency"]): r for r in previous["results"]}
+    print(f"\n{'case':<20} {'conc':>5} {'p50':>8} {'p95':>8} {'throughput':>11}")
+    for result in results:
+        old = before.get((result["case"], result["concurrency"]))
+        if old is None:
+            continue
+        changes = []
+        regressed = False
+        for key, higher_is_worse in (
+            ("p50", True),
+            ("p95", True),
+            ("throughput", False),
+        ):
+            if not old.get(key) or result.get(key) is None:
+                changes.append("n/a")
+                continue
+            change = result[key] / old[key] - 1
+            regressed |= (change if higher_is_worse else -change) > tolerance
+            changes.append(f"{change:+.0%}")
+        print(
+            f"{result['case']:<20} {result['concurrency']:>5} {changes[0]:>8} "
+            f"{changes[1]:>8} {changes[2]:>11}{'  REGRESSION' if regressed else ''}"
+        )
+
+
+def main():
+    """Start the stub server, run the selected cases and save the results."""
+    parser = argparse.ArgumentParser(description="Benchmark the endpoint wrappers")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-retries", type=int, default=default_limiter.max_retries)
+    parser.add_argument("--retry-delay", type=float, default=0.05)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="Earlier results file")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args()
+
+    server, base_url = start_server(
+        latency=args.latency,
+        token_latency=args.token_latency,
+        error_rate=args.error_rate,
+    )
+    configure(base_url=base_url, api_key="benchmark")
+    for limiter in (
+        default_limiter,
+        embedding_limiter,
+        image_limiter,
+        moderation_limiter,
+        speech_limiter,
+        transcription_limiter,
+    ):
+        limiter.max_retries = args.max_retries
+        limiter.base_delay = args.retry_delay
+
+    results = []
+    print(
+        f"{'case':<20} {'conc':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+        f"{'req/s':>8} {'errors':>7} {'RSS MB':>8}"
+    )
+    try:
+        for name in args.cases:
+            for concurrency in args.concurrency:
+                result = run_case(CASES[name], args.requests, concurrency)
+                result.update(case=name, concurrency=concurrency)
+                results.append(result)
+
+                def ms(value: Optional[float]) -> str:
+                    return "n/a" if value is None else f"{value * 1000:.1f}"
+
+                print(
+                    f"{name:<20} {concurrency:>5} {ms(result['p50']):>8} "
+                    f"{ms(result['p95']):>8} {ms(result['p99']):>8} "
+                    f"{result['throughput']:>8.1f} {result['errors']:>7} "
+                    f"{result['peak_rss_mb']:>8.1f}"
+                )
+    finally:
+        server.shutdown()
+
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "compare")
+        },
+        "results": results,
+    }
+    temporary = f"{args.output}.tmp"
+    with open(temporary, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    os.replace(temporary, args.output)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as previous_file:
+            compare(results, json.load(previous_file), args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
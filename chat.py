@@ -2,9 +2,11 @@
 A simple OpenAI chat completion example using the OpenAI API.
 
 This script demonstrates how to:
-1. Initialize the OpenAI client
+1. Get the shared OpenAI client
 2. Set up a basic chat conversation
-3. Handle API responses and errors
+3. Stream the response as it is generated
+4. Moderate the user's input in parallel with the completion
+5. Handle API responses and errors
 
 Dependencies:
     - openai: The official OpenAI Python client library
@@ -16,25 +18,40 @@ Example:
     $ python chat.py
 """
 
-import os
-from openai import OpenAI
 from openai import OpenAIError
-
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
+from moderation_guard import FlaggedInputError, get_default_guard, input_text
+from openai_client import get_client
+from rate_limiter import create_chat_completion
+from streaming import ChatStream
 
 MODEL = "gpt-4o"
+STREAM = True
+MODERATE = True
 messages = [
     {"role": "system", "content": "You are a helpful assistant."},
     {"role": "user", "content": "What is the purpose of life?"},
 ]
 
 try:
-    if not client.api_key:
-        raise ValueError("OpenAI API key not found in environment variables")
+    client = get_client()
+    guard = get_default_guard() if MODERATE else None
+
+    if STREAM:
+        stream = ChatStream(client, model=MODEL, messages=messages)
+        deltas = guard.stream(input_text(messages), iter(stream)) if guard else stream
+        for delta in deltas:
+            print(delta, end="", flush=True)
+        print(f"\n\n[{stream.stats}]")
+    else:
+
+        def complete():
+            return create_chat_completion(client, model=MODEL, messages=messages)
+
+        response = guard.run(input_text(messages), complete) if guard else complete()
+        print(response.choices[0].message.content)
 
-    response = client.chat.completions.create(model=MODEL, messages=messages)
-    print(response.choices[0].message.content)
+except FlaggedInputError as e:
+    print(f"Request rejected: {str(e)}")
 
 except OpenAIError as e:
     print(f"OpenAI API error occurred: {str(e)}")
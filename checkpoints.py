@@ -0,0 +1,206 @@
+"""
+Resumable Job Checkpoints
+
+This module records the result of every chunk-level step of the YouTube
+jobs in a local SQLite database, keyed by video id, chunk hash, prompt
+version and model. When a long run dies halfway through a multi-hour
+lecture, restarting it skips every chunk that was already paid for and
+only processes the rest.
+
+Dependencies:
+    - Python standard library only
+
+Features:
+    - Checkpoints keyed by (video id, chunk hash, prompt version, model)
+    - Prompt versions derived from the prompt text, so editing a prompt
+      invalidates its old results automatically
+    - Each result committed as soon as it is produced
+    - Safe to share between threads and asyncio tasks
+
+Example:
+    from checkpoints import CheckpointStore, prompt_version
+
+    store = CheckpointStore("checkpoints.sqlite")
+    version = prompt_version(SUMMARY_PROMPT)
+    summary = store.get_or_run(video_id, chunk, version, "gpt-4", summarize)
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+DEFAULT_PATH = "checkpoints.sqlite"
+
+
+def chunk_hash(text: str) -> str:
+    """Return the hex SHA-256 digest identifying a chunk of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def prompt_version(*prompts: str) -> str:
+    """
+    Derive a short version tag from the prompt text of a step.
+
+    Args:
+        *prompts (str): Every prompt that shapes the step's output
+
+    Returns:
+        str: First 12 hex digits of the SHA-256 of the prompts
+    """
+    return hashlib.sha256("\0".join(prompts).encode("utf-8")).hexdigest()[:12]
+
+
+class CheckpointStore:
+    """
+    SQLite-backed store of completed chunk results.
+
+    Args:
+        path (str): SQLite database file
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            "video_id TEXT NOT NULL, chunk_hash TEXT NOT NULL, "
+            "prompt_version TEXT NOT NULL, model TEXT NOT NULL, "
+            "result TEXT NOT NULL, created REAL NOT NULL, "
+            "PRIMARY KEY (video_id, chunk_hash, prompt_version, model))"
+        )
+        self._conn.commit()
+
+    def get(self, video_id: str, chunk: str, version: str, model: str) -> Optional[str]:
+        """
+        Look up the stored result of a chunk.
+
+        Args:
+            video_id (str): Video the chunk belongs to
+            chunk (str): Input text of the step
+            version (str): Prompt version from prompt_version
+            model (str): OpenAI model used for the step
+
+        Returns:
+            Optional[str]: The stored result, or None if the step has not run
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM checkpoints WHERE video_id = ? "
+                "AND chunk_hash = ? AND prompt_version = ? AND model = ?",
+                (video_id, chunk_hash(chunk), version, model),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return row[0]
+
+    def set(self, video_id: str, chunk: str, version: str, model: str, result: str):
+        """
+        Record the result of a chunk, committing it immediately.
+
+        Args:
+            video_id (str): Video the chunk belongs to
+            chunk (str): Input text of the step
+            version (str): Prompt version from prompt_version
+            model (str): OpenAI model used for the step
+            result (str): Output of the step
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?)",
+                (video_id, chunk_hash(chunk), version, model, result, time.time()),
+            )
+            self._conn.commit()
+
+    def get_or_run(
+        self,
+        video_id: str,
+        chunk: str,
+        version: str,
+        model: str,
+        run: Callable[[str], Optional[str]],
+    ) -> Optional[str]:
+        """
+        Return the stored result of a chunk, running the step on a miss.
+
+        Args:
+            video_id (str): Video the chunk belongs to
+            chunk (str): Input text of the step
+            version (str): Prompt version from prompt_version
+            model (str): OpenAI model used for the step
+            run (Callable[[str], Optional[str]]): Runs the step on the chunk;
+                empty results are not recorded
+
+        Returns:
+            Optional[str]: Stored or freshly computed result
+        """
+        result = self.get(video_id, chunk, version, model)
+        if result is None:
+            result = run(chunk)
+            if result:
+                self.set(video_id, chunk, version, model, result)
+        return result
+
+    async def get_or_run_async(
+        self,
+        video_id: str,
+        chunk: str,
+        version: str,
+        model: str,
+        run: Callable[[str], Awaitable[Optional[str]]],
+    ) -> Optional[str]:
+        """
+        Asynchronous variant of get_or_run.
+
+        The SQLite lookup and write run in a worker thread, so a slow disk
+        does not stall the other steps on the event loop.
+        """
+        result = await asyncio.to_thread(self.get, video_id, chunk, version, model)
+        if result is None:
+            result = await run(chunk)
+            if result:
+                await asyncio.to_thread(
+                    self.set, video_id, chunk, version, model, result
+                )
+        return result
+
+    def completed(self, video_id: str) -> int:
+        """Return the number of recorded steps of a video."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM checkpoints WHERE video_id = ?", (video_id,)
+            ).fetchone()[0]
+
+    def clear(self, video_id: Optional[str] = None):
+        """Remove the checkpoints of one video, or of every video."""
+        with self._lock:
+            if video_id is None:
+                self._conn.execute("DELETE FROM checkpoints")
+            else:
+                self._conn.execute(
+                    "DELETE FROM checkpoints WHERE video_id = ?", (video_id,)
+                )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit and miss counters and the hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,126 @@
+"""
+Transcript Chunking Micro-Benchmark
+
+This script compares the original character-based, word-list chunker that
+used to live in the YouTube scripts with the token-aware chunker in
+text_chunking.py, on synthetic multi-megabyte transcripts.
+
+Dependencies:
+    - tiktoken: OpenAI's tokenizer library
+
+Features:
+    - Synthetic transcripts of configurable size
+    - Wall-clock time and peak traced memory per implementation
+    - Number of chunks and average chunk size in tokens
+
+Example:
+    $ python chunking_benchmark.py --megabytes 1 4 16
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from text_chunking import iter_chunk_spans, iter_transcript_chunks
+from token_budget import count_tokens
+
+WORDS = (
+    "so today we are going to talk about how neural networks learn from data "
+    "and why gradient descent works the loss function measures the error "
+    "backpropagation computes derivatives layer by layer um you know basically"
+).split()
+
+
+def legacy_chunk_text(text: str, chunk_size: int = 4000) -> List[str]:
+    """The character-based chunker previously duplicated in the YouTube scripts."""
+    words = text.split()
+    chunks = []
+    current_chunk = []
+    current_size = 0
+
+    for word in words:
+        current_size += len(word) + 1  # +1 for space
+        if current_size > chunk_size:
+            chunks.append(" ".join(current_chunk))
+            current_chunk = [word]
+            current_size = len(word)
+        else:
+            current_chunk.append(word)
+
+    if current_chunk:
+        chunks.append(" ".join(current_chunk))
+    return chunks
+
+
+def make_transcript(megabytes: float, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Build synthetic transcript entries totalling roughly the given size.
+
+    Args:
+        megabytes (float): Approximate size of the joined transcript text
+        seed (int): Random seed for reproducible transcripts
+
+    Returns:
+        List[Dict[str, Any]]: Entries shaped like YouTubeTranscriptApi output
+    """
+    rng = random.Random(seed)
+    target = int(megabytes * 1024 * 1024)
+    entries = []
+    size = 0
+    start = 0.0
+    while size < target:
+        text = " ".join(rng.choices(WORDS, k=rng.randint(5, 15)))
+        entries.append({"text": text, "start": start, "duration": 3.0})
+        size += len(text) + 1
+        start += 3.0
+    return entries
+
+
+def measure(func: Callable[[], int]) -> Dict[str, float]:
+    """Run func once, returning its result with elapsed time and peak memory."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    chunks = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"chunks": chunks, "seconds": elapsed, "peak_mb": peak / 1024 / 1024}
+
+
+def main():
+    """Run the benchmark for each requested transcript size."""
+    parser = argparse.ArgumentParser(description="Benchmark transcript chunkers")
+    parser.add_argument("--megabytes", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--max-tokens", type=int, default=1000)
+    args = parser.parse_args()
+
+    count_tokens("warm up the tokenizer")
+
+    print(
+        f"{'size':>8} {'implementation':<22} {'chunks':>7} {'seconds':>9} {'peak MB':>9}"
+    )
+    for megabytes in args.megabytes:
+        entries = make_transcript(megabytes)
+        text = " ".join(entry["text"] for entry in entries)
+
+        cases = {
+            "legacy (chars)": lambda: len(legacy_chunk_text(text)),
+            "token spans": lambda: sum(
+                1 for _ in iter_chunk_spans(text, args.max_tokens)
+            ),
+            "token stream": lambda: sum(
+                1 for _ in iter_transcript_chunks(iter(entries), args.max_tokens)
+            ),
+        }
+        for name, func in cases.items():
+            result = measure(func)
+            print(
+                f"{megabytes:>6.1f}MB {name:<22} {result['chunks']:>7} "
+                f"{result['seconds']:>9.3f} {result['peak_mb']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
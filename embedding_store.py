@@ -0,0 +1,201 @@
+"""
+Persistent Embedding Store
+
+This module keeps embeddings on disk keyed by (model, dimensions, sha256 of
+the text), so repeated texts such as boilerplate paragraphs or recurring
+transcript lines are only embedded and billed once.
+
+Dependencies:
+    - numpy: Vector storage
+
+Features:
+    - Append-only float32 vector file per model and dimension count
+    - Compact index of 32-byte text digests, one per stored row
+    - Memory-mapped reads, so stores larger than memory are fine
+    - Recovery from interrupted writes by trimming partial rows
+
+Example:
+    from embedding_store import EmbeddingStore
+    from embeddings import embed_texts
+
+    store = EmbeddingStore(".embeddings")
+    vectors = embed_texts(texts, store=store)
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DIGEST_SIZE = 32
+ROW_DTYPE = np.float32
+
+
+def text_digest(text: str) -> bytes:
+    """Return the SHA-256 digest identifying a text in the store."""
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class _Namespace:
+    """Vectors of a single (model, dimensions) pair."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.keys_path = os.path.join(directory, "keys.bin")
+        self.meta_path = os.path.join(directory, "meta.json")
+        self.width: Optional[int] = None
+        self.rows: Dict[bytes, int] = {}
+        self._mmap: Optional[np.memmap] = None
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as meta_file:
+                self.width = json.load(meta_file)["width"]
+        if self.width is None or not os.path.exists(self.vectors_path):
+            return
+
+        row_bytes = self.width * np.dtype(ROW_DTYPE).itemsize
+        keys_size = (
+            os.path.getsize(self.keys_path) if os.path.exists(self.keys_path) else 0
+        )
+        count = min(
+            keys_size // DIGEST_SIZE,
+            os.path.getsize(self.vectors_path) // row_bytes,
+        )
+        # Drop the tail of a write that was interrupted half-way
+        with open(self.keys_path, "a+b") as keys_file:
+            keys_file.seek(0)
+            keys_file.truncate(count * DIGEST_SIZE)
+            keys = keys_file.read()
+        with open(self.vectors_path, "r+b") as vectors_file:
+            vectors_file.truncate(count * row_bytes)
+
+        for row in range(count):
+            self.rows[keys[row * DIGEST_SIZE : (row + 1) * DIGEST_SIZE]] = row
+
+    def _vectors(self) -> np.ndarray:
+        if self._mmap is None or self._mmap.shape[0] < len(self.rows):
+            self._mmap = np.memmap(
+                self.vectors_path,
+                dtype=ROW_DTYPE,
+                mode="r",
+                shape=(len(self.rows), self.width),
+            )
+        return self._mmap
+
+    def get(self, digests: Sequence[bytes]) -> Tuple[np.ndarray, List[int]]:
+        found = [(i, self.rows[d]) for i, d in enumerate(digests) if d in self.rows]
+        if not found:
+            return np.empty((0, self.width or 0), dtype=ROW_DTYPE), []
+        positions, rows = zip(*found)
+        return np.asarray(self._vectors()[list(rows)]), list(positions)
+
+    def add(self, digests: Sequence[bytes], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=ROW_DTYPE)
+        if self.width is None:
+            self.width = vectors.shape[1]
+            with open(self.meta_path, "w", encoding="utf-8") as meta_file:
+                json.dump({"width": self.width}, meta_file)
+        elif vectors.shape[1] != self.width:
+            raise ValueError(
+                f"Expected vectors of width {self.width}, got {vectors.shape[1]}"
+            )
+
+        new = []
+        seen = set()
+        for i, digest in enumerate(digests):
+            if digest not in self.rows and digest not in seen:
+                seen.add(digest)
+                new.append(i)
+        if not new:
+            return
+        # Vectors are written before keys, so a key always has its row
+        with open(self.vectors_path, "ab") as vectors_file:
+            vectors_file.write(vectors[new].tobytes())
+        with open(self.keys_path, "ab") as keys_file:
+            keys_file.write(b"".join(digests[i] for i in new))
+        for i in new:
+            self.rows[digests[i]] = len(self.rows)
+
+
+class EmbeddingStore:
+    """
+    On-disk embedding cache keyed by model, dimensions and text digest.
+
+    Args:
+        directory (str): Directory holding one sub-directory per model and
+            dimension count
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._namespaces: Dict[Tuple[str, Optional[int]], _Namespace] = {}
+        self._lock = threading.Lock()
+
+    def _namespace(self, model: str, dimensions: Optional[int]) -> _Namespace:
+        key = (model, dimensions)
+        if key not in self._namespaces:
+            name = f"{model}-{dimensions or 'native'}".replace(os.sep, "_")
+            self._namespaces[key] = _Namespace(os.path.join(self.directory, name))
+        return self._namespaces[key]
+
+    def get(
+        self, model: str, dimensions: Optional[int], digests: Sequence[bytes]
+    ) -> Tuple[np.ndarray, List[int]]:
+        """
+        Look up stored vectors.
+
+        Args:
+            model (str): Embedding model
+            dimensions (Optional[int]): Requested output size, None for the default
+            digests (Sequence[bytes]): Text digests from text_digest
+
+        Returns:
+            Tuple[np.ndarray, List[int]]: Found vectors, and the positions in
+            digests they belong to
+        """
+        with self._lock:
+            vectors, positions = self._namespace(model, dimensions).get(digests)
+            self.hits += len(positions)
+            self.misses += len(digests) - len(positions)
+        return vectors, positions
+
+    def add(
+        self,
+        model: str,
+        dimensions: Optional[int],
+        digests: Sequence[bytes],
+        vectors: np.ndarray,
+    ):
+        """
+        Append vectors that are not stored yet.
+
+        Args:
+            model (str): Embedding model
+            dimensions (Optional[int]): Requested output size, None for the default
+            digests (Sequence[bytes]): Text digests from text_digest
+            vectors (np.ndarray): One vector per digest
+        """
+        if len(digests) != len(vectors):
+            raise ValueError("Expected one vector per digest")
+        if not digests:
+            return
+        with self._lock:
+            self._namespace(model, dimensions).add(digests, vectors)
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit and miss counters and the hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -7,27 +7,370 @@ text similarity, and other NLP tasks.
 
 Dependencies:
     - openai: The official OpenAI Python client library
+    - numpy: Vector storage and similarity search
+    - tiktoken: Token counting for request packing
     - Environment variable OPENAI_API_KEY must be set
 
 Features:
     - Generate vector embeddings from text input
     - Support for different embedding models
-    - Batch processing of multiple texts
+    - Batch processing of multiple texts, packed up to the per-request limits
+    - Concurrent batch requests under the embeddings' own rate limiter
+    - Repeated texts embedded once, with an optional persistent store
+    - Compact float32 matrices that can be memory-mapped from disk
+    - Vectorized top-k cosine search with optional dimension truncation
     - Optimized for semantic search applications
 
 Example:
     $ export OPENAI_API_KEY='your-api-key'
     $ python embeddings.py
+
+    from embeddings import EmbeddingIndex, embed_texts
+
+    index = EmbeddingIndex(embed_texts(documents))
+    index.save("documents.npy")
+    index = EmbeddingIndex.load("documents.npy")
+    positions, scores = index.search(embed_texts(["my query"]), k=5)
 """
 
-import os
-from openai import OpenAI
+import asyncio
+import base64
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from openai import AsyncOpenAI
+
+from embedding_store import EmbeddingStore, text_digest
+from openai_client import close_async_client, get_async_client
+from rate_limiter import RateLimiter
+from token_budget import count_tokens
 
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
+MODEL = "text-embedding-3-small"
 
-result = client.embeddings.create(
-    input="The food was delicious and the waiter...", model="text-embedding-3-small"
+# Per-request limits of the embeddings endpoint
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300000
+MAX_CONCURRENCY = 4
+EMBEDDING_REQUESTS_PER_MINUTE = 3000
+EMBEDDING_TOKENS_PER_MINUTE = 1000000
+
+# Embedding models have their own quota, separate from chat models, so their
+# rate limit headers must not overwrite the chat limiter's state
+embedding_limiter = RateLimiter(
+    requests_per_minute=EMBEDDING_REQUESTS_PER_MINUTE,
+    tokens_per_minute=EMBEDDING_TOKENS_PER_MINUTE,
 )
 
-print(result)
+
+def iter_batches(
+    texts: Sequence[str],
+    model: str = MODEL,
+    max_inputs: int = MAX_INPUTS_PER_REQUEST,
+    max_tokens: int = MAX_TOKENS_PER_REQUEST,
+) -> Iterator[Tuple[int, int, int]]:
+    """
+    Pack consecutive texts into batches that respect the per-request limits.
+
+    Args:
+        texts (Sequence[str]): Texts to embed
+        model (str): Embedding model whose tokenizer is used
+        max_inputs (int): Maximum number of inputs per request
+        max_tokens (int): Maximum total tokens per request
+
+    Yields:
+        Tuple[int, int, int]: Start index, end index and token count of a batch
+    """
+    start = 0
+    tokens = 0
+    for position, text in enumerate(texts):
+        size = count_tokens(text, model)
+        if position > start and (
+            position - start >= max_inputs or tokens + size > max_tokens
+        ):
+            yield start, position, tokens
+            start = position
+            tokens = 0
+        tokens += size
+    if start < len(texts):
+        yield start, len(texts), tokens
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Scale every row to unit length so dot products are cosine similarities.
+
+    Args:
+        matrix (np.ndarray): Vectors, one per row
+
+    Returns:
+        np.ndarray: float32 matrix of unit-length rows
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def truncate_dimensions(matrix: np.ndarray, dimensions: int) -> np.ndarray:
+    """
+    Shorten text-embedding-3-* vectors and renormalize them.
+
+    These models are trained so that a prefix of the vector is itself a
+    usable embedding, which trades a little accuracy for memory and speed.
+
+    Args:
+        matrix (np.ndarray): Vectors, one per row
+        dimensions (int): Number of leading dimensions to keep
+
+    Returns:
+        np.ndarray: float32 matrix with the given number of columns
+    """
+    if dimensions <= 0 or dimensions > matrix.shape[-1]:
+        raise ValueError(f"dimensions must be between 1 and {matrix.shape[-1]}")
+    return normalize_rows(matrix[..., :dimensions])
+
+
+def _decode_embedding(embedding) -> np.ndarray:
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype=np.float32)
+    return np.asarray(embedding, dtype=np.float32)
+
+
+async def _embed_batches(
+    texts: Sequence[str],
+    model: str,
+    dimensions: Optional[int],
+    max_concurrency: int,
+    client: AsyncOpenAI,
+) -> Optional[np.ndarray]:
+    """Embed texts in packed, concurrent requests into one float32 matrix."""
+    create = client.with_options(max_retries=0).embeddings.with_raw_response.create
+    semaphore = asyncio.Semaphore(max_concurrency)
+    matrix: Optional[np.ndarray] = None
+
+    async def run(start: int, end: int, tokens: int):
+        nonlocal matrix
+        request = {"model": model, "input": list(texts[start:end])}
+        if dimensions:
+            request["dimensions"] = dimensions
+        async with semaphore:
+            response = await embedding_limiter.call_async(
+                create, estimated_tokens=tokens, encoding_format="base64", **request
+            )
+        for item in response.data:
+            vector = _decode_embedding(item.embedding)
+            if matrix is None:
+                matrix = np.empty((len(texts), vector.shape[0]), dtype=np.float32)
+            matrix[start + item.index] = vector
+
+    await asyncio.gather(*(run(*batch) for batch in iter_batches(texts, model)))
+    return matrix
+
+
+async def embed_texts_async(
+    texts: Sequence[str],
+    model: str = MODEL,
+    dimensions: Optional[int] = None,
+    max_concurrency: int = MAX_CONCURRENCY,
+    client: Optional[AsyncOpenAI] = None,
+    store: Optional[EmbeddingStore] = None,
+) -> np.ndarray:
+    """
+    Embed many texts with packed, concurrent requests.
+
+    Repeated texts are embedded once and, with a store, texts embedded by
+    earlier runs are not sent at all. Vectors are requested base64-encoded
+    and decoded straight into float32 matrices, so no Python lists of floats
+    are built.
+
+    Args:
+        texts (Sequence[str]): Texts to embed
+        model (str): Embedding model to use
+        dimensions (Optional[int]): Output size for text-embedding-3-* models
+        max_concurrency (int): Maximum number of requests in flight
+        client (Optional[AsyncOpenAI]): Client to use, defaults to the shared client
+        store (Optional[EmbeddingStore]): Persistent store of known embeddings
+
+    Returns:
+        np.ndarray: float32 matrix with one embedding per input row
+
+    Raises:
+        ValueError: If a text is empty or max_concurrency is not positive
+        OpenAIError: If API call fails
+    """
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be a positive number")
+    if any(not text for text in texts):
+        raise ValueError("Texts to embed must not be empty")
+    if not texts:
+        return np.empty((0, dimensions or 0), dtype=np.float32)
+
+    # Deduplicate: unique[i] is the first input with digest digests[i]
+    first_seen: Dict[bytes, int] = {}
+    inverse = np.empty(len(texts), dtype=np.intp)
+    for position, text in enumerate(texts):
+        inverse[position] = first_seen.setdefault(text_digest(text), len(first_seen))
+    digests = list(first_seen)
+    unique = np.empty(len(digests), dtype=np.intp)
+    unique[inverse] = np.arange(len(texts))
+
+    vectors: Optional[np.ndarray] = None
+    missing = list(range(len(digests)))
+    if store is not None:
+        stored, found = store.get(model, dimensions, digests)
+        if found:
+            vectors = np.empty((len(digests), stored.shape[1]), dtype=np.float32)
+            vectors[found] = stored
+            found_set = set(found)
+            missing = [i for i in missing if i not in found_set]
+
+    if missing:
+        fresh = await _embed_batches(
+            [texts[unique[i]] for i in missing],
+            model,
+            dimensions,
+            max_concurrency,
+            client or get_async_client(),
+        )
+        if vectors is None:
+            vectors = np.empty((len(digests), fresh.shape[1]), dtype=np.float32)
+        vectors[missing] = fresh
+        if store is not None:
+            store.add(model, dimensions, [digests[i] for i in missing], fresh)
+
+    return vectors[inverse]
+
+
+def embed_texts(
+    texts: Sequence[str],
+    model: str = MODEL,
+    dimensions: Optional[int] = None,
+    max_concurrency: int = MAX_CONCURRENCY,
+    store: Optional[EmbeddingStore] = None,
+) -> np.ndarray:
+    """
+    Embed many texts; synchronous wrapper around embed_texts_async.
+
+    Args:
+        texts (Sequence[str]): Texts to embed
+        model (str): Embedding model to use
+        dimensions (Optional[int]): Output size for text-embedding-3-* models
+        max_concurrency (int): Maximum number of requests in flight
+        store (Optional[EmbeddingStore]): Persistent store of known embeddings
+
+    Returns:
+        np.ndarray: float32 matrix with one embedding per input row
+    """
+
+    async def run() -> np.ndarray:
+        # The loop's pooled connections cannot outlive asyncio.run
+        try:
+            return await embed_texts_async(
+                texts, model, dimensions, max_concurrency, store=store
+            )
+        finally:
+            await close_async_client()
+
+    return asyncio.run(run())
+
+
+class EmbeddingIndex:
+    """
+    Cosine-similarity index over a float32 embedding matrix.
+
+    Rows are stored unit-normalized, so a search is a single matrix-vector
+    product followed by a partial sort.
+
+    Args:
+        vectors (np.ndarray): Embeddings, one per row
+        dimensions (Optional[int]): Truncate vectors to this many dimensions
+        normalized (bool): Whether the rows are already unit length
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        dimensions: Optional[int] = None,
+        normalized: bool = False,
+    ):
+        if dimensions:
+            vectors = truncate_dimensions(vectors, dimensions)
+        elif not normalized:
+            vectors = normalize_rows(vectors)
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @property
+    def dimensions(self) -> int:
+        """Number of dimensions of the stored vectors."""
+        return self.vectors.shape[1]
+
+    def save(self, path: str):
+        """Write the normalized matrix to a .npy file."""
+        np.save(path, self.vectors)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "EmbeddingIndex":
+        """
+        Load an index written by save.
+
+        Args:
+            path (str): .npy file
+            mmap (bool): Memory-map the file instead of reading it into memory
+
+        Returns:
+            EmbeddingIndex: The loaded index
+        """
+        vectors = np.load(path, mmap_mode="r" if mmap else None)
+        return cls(vectors, normalized=True)
+
+    def search(self, queries: np.ndarray, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the k most similar rows for each query vector.
+
+        Args:
+            queries (np.ndarray): One query vector or a matrix of query rows
+            k (int): Number of results per query
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Row positions and cosine scores, shaped
+            (queries, k) and sorted by decreasing similarity
+        """
+        queries = np.atleast_2d(queries)
+        if queries.shape[1] != self.dimensions:
+            queries = queries[:, : self.dimensions]
+        queries = normalize_rows(queries)
+        k = min(k, len(self))
+
+        scores = queries @ self.vectors.T
+        if k < len(self):
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(len(self)), scores.shape).copy()
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return (
+            np.take_along_axis(top, order, axis=1),
+            np.take_along_axis(top_scores, order, axis=1),
+        )
+
+
+def main():
+    """Embed a few sentences and run a similarity search over them."""
+    documents: List[str] = [
+        "The food was delicious and the waiter...",
+        "The service was slow and the soup was cold.",
+        "Our hotel room had a beautiful view of the sea.",
+        "The restaurant's dessert menu was excellent.",
+    ]
+    index = EmbeddingIndex(embed_texts(documents, dimensions=256))
+    positions, scores = index.search(embed_texts(["great meal"], dimensions=256), k=2)
+
+    for position, score in zip(positions[0], scores[0]):
+        print(f"{score:.3f}  {documents[position]}")
+
+
+if __name__ == "__main__":
+    main()
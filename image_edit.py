@@ -6,29 +6,315 @@ It allows you to edit existing images by providing natural language prompts.
 
 Dependencies:
     - openai: The official OpenAI Python client library
+    - Pillow: Validating and preparing images before upload
     - Environment variable OPENAI_API_KEY must be set
 
 Features:
     - Edit existing images using natural language prompts
     - Support for various image formats (PNG, JPEG)
     - Handles API authentication and error responses
+    - Local validation of image and mask dimensions and mask transparency,
+      before anything is uploaded
+    - Images converted to RGBA PNG and downsized to the edit resolution;
+      files the endpoint accepts as they are are uploaded unchanged
+    - Prepared uploads cached by content hash, so repeated edits of the same
+      base image skip decoding and re-encoding
 
 Example:
     $ export OPENAI_API_KEY='your-api-key'
     $ python image_edit.py
+
+    from image_edit import edit_image
+
+    urls = edit_image("output.png", "mask.png", "Add a red umbrella", size="512x512")
 """
 
+import hashlib
+import io
 import os
-from openai import OpenAI
+from typing import List, Optional, Tuple
+
+from openai import OpenAI, OpenAIError
+from PIL import Image, ImageOps
+
+from openai_client import get_client
+
+MODEL = "dall-e-2"
+SIZE = "1024x1024"
+SIZES = ("256x256", "512x512", "1024x1024")
+MAX_UPLOAD_BYTES = 4 * 1024 * 1024
+CACHE_DIRECTORY = ".image_cache"
+# Bump when the preparation steps change, to invalidate cached files
+PREPARATION_VERSION = "2"
+# Pixel formats the edit endpoint accepts as they are
+UPLOAD_MODES = ("RGBA", "LA", "L")
+DEMO_SIZE = "512x512"
+
+
+def _side(size: str) -> int:
+    if size not in SIZES:
+        raise ValueError(f"Size must be one of {', '.join(SIZES)}")
+    return int(size.split("x")[0])
+
+
+def _encode_png(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    data = buffer.getvalue()
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise ValueError(
+            f"Prepared image is {len(data)} bytes, over the {MAX_UPLOAD_BYTES} limit"
+        )
+    return data
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as source:
+        return source.read()
+
+
+def _fit(image: Image.Image, side: int, resample: int) -> Image.Image:
+    # Centre-crop to a square, then scale; never upscale small images
+    side = min(side, *image.size)
+    return ImageOps.fit(image, (side, side), method=resample)
+
+
+def is_conforming(image: Image.Image, path: str, size: str = SIZE) -> bool:
+    """
+    Check whether a file can be uploaded as it is, without re-encoding.
+
+    Args:
+        image (Image.Image): The opened file
+        path (str): Path of the file
+        size (str): Edit resolution, one of SIZES
+
+    Returns:
+        bool: True for a square PNG in an accepted pixel format, no larger
+        than the edit resolution and under the upload limit
+    """
+    width, height = image.size
+    return (
+        image.format == "PNG"
+        and image.mode in UPLOAD_MODES
+        and width == height
+        and width <= _side(size)
+        and os.path.getsize(path) <= MAX_UPLOAD_BYTES
+    )
+
+
+def validate_pair(image: Image.Image, mask: Optional[Image.Image]):
+    """
+    Check an image and its mask the way the edit endpoint would.
+
+    Args:
+        image (Image.Image): Image to edit
+        mask (Optional[Image.Image]): Mask whose transparent pixels mark
+            the area to edit; without a mask the image itself needs them
+
+    Raises:
+        ValueError: If the mask does not match the image or has no
+            transparent area
+    """
+    if mask is not None and mask.size != image.size:
+        raise ValueError(
+            f"Mask is {mask.size[0]}x{mask.size[1]} but image is "
+            f"{image.size[0]}x{image.size[1]}"
+        )
+    area = mask if mask is not None else image
+    name = "Mask" if mask is not None else "Image without a mask"
+    if "A" not in area.getbands() and "transparency" not in area.info:
+        raise ValueError(f"{name} has no alpha channel")
+    if area.convert("RGBA").getchannel("A").getextrema()[0] != 0:
+        raise ValueError(f"{name} has no fully transparent area to edit")
+
+
+def prepare_image(image: Image.Image, size: str = SIZE) -> bytes:
+    """
+    Convert an image to the square RGBA PNG the edit endpoint expects.
+
+    Args:
+        image (Image.Image): Image to convert
+        size (str): Edit resolution, one of SIZES
+
+    Returns:
+        bytes: PNG data
 
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
+    Raises:
+        ValueError: If the size is unsupported or the result is too large
+    """
+    return _encode_png(_fit(image.convert("RGBA"), _side(size), Image.LANCZOS))
 
-with open("output.png", "rb") as image_file, open("mask.png", "rb") as mask_file:
-    response = client.images.edit(
-        image=image_file,
-        mask=mask_file,
-        prompt="A indian man is walking down the street.",
+
+def prepare_mask(mask: Image.Image, size: str = SIZE) -> bytes:
+    """
+    Convert a mask like prepare_image, keeping its transparency crisp.
+
+    Args:
+        mask (Image.Image): Mask to convert
+        size (str): Edit resolution, one of SIZES
+
+    Returns:
+        bytes: PNG data
+
+    Raises:
+        ValueError: If the size is unsupported or the result is too large
+    """
+    return _encode_png(_fit(mask.convert("RGBA"), _side(size), Image.NEAREST))
+
+
+class PreparedImageCache:
+    """
+    On-disk cache of prepared uploads keyed by the source file's content.
+
+    Args:
+        directory (str): Directory holding the prepared PNG files
+    """
+
+    def __init__(self, directory: str = CACHE_DIRECTORY):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def file_hash(path: str) -> str:
+        """Return the hex SHA-256 digest of a file's content."""
+        digest = hashlib.sha256()
+        with open(path, "rb") as source:
+            for block in iter(lambda: source.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def prepare(
+        self, image_path: str, mask_path: Optional[str], size: str
+    ) -> Tuple[bytes, Optional[bytes]]:
+        """
+        Validate and prepare an image and optional mask, using cached files.
+
+        Args:
+            image_path (str): Image to edit
+            mask_path (Optional[str]): Mask marking the area to edit
+            size (str): Edit resolution, one of SIZES
+
+        Returns:
+            Tuple[bytes, Optional[bytes]]: PNG data of the image and the mask
+
+        Raises:
+            ValueError: If the files are invalid
+        """
+        _side(size)
+        image_hash = self.file_hash(image_path)
+        mask_hash = self.file_hash(mask_path) if mask_path else ""
+        stem = hashlib.sha256(
+            f"{PREPARATION_VERSION}:{size}:{image_hash}:{mask_hash}".encode()
+        ).hexdigest()[:32]
+        image_file = os.path.join(self.directory, f"{stem}.image.png")
+        mask_file = os.path.join(self.directory, f"{stem}.mask.png")
+
+        if os.path.exists(image_file) and (not mask_path or os.path.exists(mask_file)):
+            self.hits += 1
+            with open(image_file, "rb") as cached:
+                image_data = cached.read()
+            mask_data = None
+            if mask_path:
+                with open(mask_file, "rb") as cached:
+                    mask_data = cached.read()
+            return image_data, mask_data
+
+        self.misses += 1
+        with Image.open(image_path) as image:
+            mask = Image.open(mask_path) if mask_path else None
+            try:
+                validate_pair(image, mask)
+                if is_conforming(image, image_path, size):
+                    image_data = _read(image_path)
+                else:
+                    image_data = prepare_image(image, size)
+                if mask is None:
+                    mask_data = None
+                elif is_conforming(mask, mask_path, size):
+                    mask_data = _read(mask_path)
+                else:
+                    mask_data = prepare_mask(mask, size)
+            finally:
+                if mask is not None:
+                    mask.close()
+        if mask_data is not None:
+            self._write(mask_file, mask_data)
+        self._write(image_file, image_data)
+        return image_data, mask_data
+
+    @staticmethod
+    def _write(path: str, data: bytes):
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as prepared:
+            prepared.write(data)
+        os.replace(temporary, path)
+
+
+_default_cache: Optional[PreparedImageCache] = None
+
+
+def edit_image(
+    image_path: str,
+    mask_path: Optional[str],
+    prompt: str,
+    size: str = SIZE,
+    n: int = 1,
+    cache: Optional[PreparedImageCache] = None,
+    client: Optional[OpenAI] = None,
+) -> List[str]:
+    """
+    Edit an image, uploading a validated, downsized PNG.
+
+    Args:
+        image_path (str): Image to edit
+        mask_path (Optional[str]): Mask whose transparent pixels mark the
+            area to edit; without a mask the image's own transparency is used
+        prompt (str): Description of the edited image
+        size (str): Edit resolution, one of SIZES
+        n (int): Number of variants to generate
+        cache (Optional[PreparedImageCache]): Cache of prepared uploads,
+            defaults to one in CACHE_DIRECTORY
+        client (Optional[OpenAI]): Client to use, defaults to the shared client
+
+    Returns:
+        List[str]: URLs of the edited images
+
+    Raises:
+        ValueError: If the image or mask is invalid
+        OpenAIError: If API call fails
+    """
+    global _default_cache  # pylint: disable=global-statement
+    if cache is None:
+        if _default_cache is None:
+            _default_cache = PreparedImageCache()
+        cache = _default_cache
+    image_data, mask_data = cache.prepare(image_path, mask_path, size)
+    files = {"image": ("image.png", image_data, "image/png")}
+    if mask_data is not None:
+        files["mask"] = ("mask.png", mask_data, "image/png")
+    response = (client or get_client()).images.edit(
+        model=MODEL, prompt=prompt, size=size, n=n, **files
     )
+    return [image.url for image in response.data]
+
+
+def main():
+    """Edit the example image with its mask."""
+    try:
+        urls = edit_image(
+            "output.png",
+            "mask.png",
+            "A indian man is walking down the street.",
+            size=DEMO_SIZE,
+        )
+        print(urls[0])
+    except OpenAIError as e:
+        print(f"OpenAI API error occurred: {str(e)}")
+    except (ValueError, OSError) as e:
+        print(f"Error: {str(e)}")
+
 
-print(response.data[0].url)
+if __name__ == "__main__":
+    main()
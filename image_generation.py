@@ -6,6 +6,7 @@ It provides a simple interface for creating images from natural language descrip
 
 Dependencies:
     - openai: The official OpenAI Python client library
+    - requests: Downloading generated images
     - Environment variable OPENAI_API_KEY must be set
 
 Features:
@@ -13,30 +14,259 @@ Features:
     - Support for different image sizes and styles
     - Handles API authentication and error responses
     - Save generated images to local storage
+    - Bulk mode: many prompts generated concurrently within the image rate
+      limit, downloaded over a pooled session and streamed to disk
+    - Outputs named by prompt hash, so finished prompts are skipped on rerun
 
 Example:
     $ export OPENAI_API_KEY='your-api-key'
     $ python image_generation.py
+    $ python image_generation.py prompts.txt --directory images --concurrency 8
+
+    from image_generation import generate_images
+
+    for result in generate_images(prompts, "images"):
+        print(result.path, result.error)
 """
 
+import argparse
+import base64
+import hashlib
+import json
 import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
 import requests
-from openai import OpenAI
+from requests.adapters import HTTPAdapter
+from openai import OpenAI, OpenAIError
+
+from openai_client import get_client
+from rate_limiter import RateLimiter
+
+MODEL = "dall-e-3"
+SIZE = "1024x1024"
+QUALITY = "standard"
+IMAGES_PER_MINUTE = 50
+MAX_CONCURRENCY = 8
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+MANIFEST = "manifest.jsonl"
+
+# Image endpoints are limited in images per minute, separately from text
+image_limiter = RateLimiter(requests_per_minute=IMAGES_PER_MINUTE)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size: int = MAX_CONCURRENCY) -> requests.Session:
+    """
+    Return the HTTP session used for downloads, creating it on first use.
+
+    Args:
+        pool_size (int): Connections kept open per host
+
+    Returns:
+        requests.Session: Shared session with a connection pool
+    """
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def prompt_key(
+    prompt: str, model: str = MODEL, size: str = SIZE, quality: str = QUALITY
+) -> str:
+    """Return the file name stem identifying a prompt and its settings."""
+    request = json.dumps([prompt, model, size, quality])
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()[:32]
+
+
+def _download(url: str, path: str, session: requests.Session):
+    temporary = f"{path}.tmp"
+    with session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        with open(temporary, "wb") as image_file:
+            for data in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                image_file.write(data)
+    os.replace(temporary, path)
+
+
+def _write_b64(data: str, path: str):
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as image_file:
+        image_file.write(base64.b64decode(data))
+    os.replace(temporary, path)
+
+
+def generate_image(
+    prompt: str,
+    path: str,
+    model: str = MODEL,
+    size: str = SIZE,
+    quality: str = QUALITY,
+    b64_json: bool = False,
+    client: Optional[OpenAI] = None,
+    session: Optional[requests.Session] = None,
+):
+    """
+    Generate one image and save it; the file appears only once complete.
+
+    Args:
+        prompt (str): Description of the image
+        path (str): Output file
+        model (str): Image model to use
+        size (str): Image size, e.g. "1024x1024"
+        quality (str): "standard" or "hd"
+        b64_json (bool): Receive the image inline instead of by URL
+        client (Optional[OpenAI]): Client to use, defaults to the shared client
+        session (Optional[requests.Session]): Session for the download
+
+    Raises:
+        OpenAIError: If API call fails
+        requests.RequestException: If the download fails
+    """
+    client = client or get_client()
+    generate = client.with_options(max_retries=0).images.with_raw_response.generate
+    response = image_limiter.call(
+        generate,
+        model=model,
+        prompt=prompt,
+        size=size,
+        quality=quality,
+        response_format="b64_json" if b64_json else "url",
+    )
+    image = response.data[0]
+    if b64_json:
+        _write_b64(image.b64_json, path)
+    else:
+        _download(image.url, path, session or get_session())
+
+
+@dataclass
+class ImageResult:
+    """Outcome of one prompt of a bulk run."""
+
+    prompt: str
+    path: str
+    skipped: bool = False
+    error: Optional[str] = None
+
+
+def generate_images(
+    prompts: Iterable[str],
+    directory: str,
+    model: str = MODEL,
+    size: str = SIZE,
+    quality: str = QUALITY,
+    b64_json: bool = False,
+    max_concurrency: int = MAX_CONCURRENCY,
+) -> Iterator[ImageResult]:
+    """
+    Generate images for many prompts concurrently.
+
+    Each image is saved as <directory>/<prompt_key>.png, and prompts whose
+    file already exists are skipped, so an interrupted campaign resumes
+    where it stopped. A manifest.jsonl in the directory maps files back to
+    prompts. At most max_concurrency prompts are in flight, so the prompt
+    list may be arbitrarily long.
+
+    Args:
+        prompts (Iterable[str]): Image descriptions, consumed lazily
+        directory (str): Output directory
+        model (str): Image model to use
+        size (str): Image size, e.g. "1024x1024"
+        quality (str): "standard" or "hd"
+        b64_json (bool): Receive images inline instead of by URL
+        max_concurrency (int): Maximum number of prompts in flight
+
+    Yields:
+        ImageResult: One per distinct prompt, in prompt order
+
+    Raises:
+        ValueError: If max_concurrency is not positive
+    """
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be a positive number")
+    os.makedirs(directory, exist_ok=True)
+    client = get_client()
+    session = get_session(max_concurrency)
+    manifest_lock = threading.Lock()
+    manifest_path = os.path.join(directory, MANIFEST)
+
+    def run(prompt: str, path: str) -> ImageResult:
+        try:
+            generate_image(
+                prompt, path, model, size, quality, b64_json, client, session
+            )
+        except (OpenAIError, requests.RequestException, OSError) as e:
+            return ImageResult(prompt, path, error=str(e))
+        record = {"file": os.path.basename(path), "prompt": prompt, "model": model}
+        with manifest_lock, open(manifest_path, "a", encoding="utf-8") as manifest:
+            manifest.write(json.dumps(record) + "\n")
+        return ImageResult(prompt, path)
+
+    seen = set()
+    pending: "deque[Future]" = deque()
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for prompt in prompts:
+            key = prompt_key(prompt, model, size, quality)
+            if key in seen:
+                continue
+            seen.add(key)
+            path = os.path.join(directory, f"{key}.png")
+            if os.path.exists(path):
+                # Queued behind running prompts to keep results in order
+                done: Future = Future()
+                done.set_result(ImageResult(prompt, path, skipped=True))
+                pending.append(done)
+                continue
+            if len(pending) >= max_concurrency:
+                yield pending.popleft().result()
+            pending.append(executor.submit(run, prompt, path))
+        while pending:
+            yield pending.popleft().result()
 
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
 
-response = client.images.generate(
-    model="dall-e-3",
-    prompt="A indian man is walking down the street.",
-    size="1024x1024",
-    quality="standard",
-)
+def main():
+    """Generate the example image, or every prompt of a file."""
+    parser = argparse.ArgumentParser(description="Generate images with DALL-E")
+    parser.add_argument("prompts", nargs="?", help="File with one prompt per line")
+    parser.add_argument("--directory", default="images")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--b64", action="store_true", help="Receive images inline")
+    args = parser.parse_args()
 
-image_url = response.data[0].url
+    try:
+        if args.prompts is None:
+            generate_image("A indian man is walking down the street.", "output.png")
+            print("Image saved as output.png")
+            return
+        with open(args.prompts, "r", encoding="utf-8") as prompt_file:
+            prompts = (line.strip() for line in prompt_file if line.strip())
+            counts = {"generated": 0, "skipped": 0, "failed": 0}
+            for result in generate_images(
+                prompts, args.directory, b64_json=args.b64,
+                max_concurrency=args.concurrency,
+            ):  # fmt: skip
+                if result.error is not None:
+                    counts["failed"] += 1
+                    print(f"Failed: {result.prompt}: {result.error}")
+                else:
+                    counts["skipped" if result.skipped else "generated"] += 1
+        print(", ".join(f"{count} {name}" for name, count in counts.items()))
+    except (OpenAIError, requests.RequestException) as e:
+        print(f"Error: {str(e)}")
 
-image_data = requests.get(image_url, timeout=10).content
-with open("output.png", "wb") as image_file:
-    image_file.write(image_data)
 
-print("Image saved as output.png")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,733 @@
+"""
+Local OpenAI API Stub Server
+
+This script runs a small HTTP server that mimics the parts of the OpenAI API
+used by the examples in this repository, so they can be exercised locally
+without network access, API keys or cost.
+
+Dependencies:
+    - Python standard library only
+
+Features:
+    - Fake /v1/chat/completions endpoint with deterministic replies,
+      including server-sent event streaming, parallel tool calls and
+      JSON replies shaped by a json_schema response_format
+    - Fake /v1/embeddings endpoint with deterministic vectors
+    - Fake /v1/moderations endpoint with deterministic scores for text
+      arrays and mixed text and image inputs
+    - Fake /v1/audio/speech endpoint streaming one audio frame per word,
+      and /v1/audio/transcriptions reading those frames back with
+      verbose_json segment timestamps
+    - Fake /v1/files and /v1/batches endpoints; a batch advances one status
+      per poll and then runs its requests through the fake endpoints
+    - Fake /v1/images/generations and /v1/images/edits endpoints returning
+      small solid-colour PNGs as base64 or as URLs served by the stub itself
+    - Configurable artificial latency per request
+    - Error injection: a configurable fraction of requests fail with 429
+      (with retry-after-ms) or 500
+    - Generous x-ratelimit-* headers so rate limiters can adapt
+    - Runs in a background thread for use from other scripts
+
+Example:
+    $ python mock_openai_server.py --port 8080 --latency 0.5
+    $ export OPENAI_BASE_URL='http://127.0.0.1:8080/v1'
+    $ export OPENAI_API_KEY='test'
+    $ python youtube_summarization.py
+
+    Or from Python:
+
+    from mock_openai_server import start_server
+    server, base_url = start_server(latency=0.2)
+    ...
+    server.shutdown()
+"""
+
+import argparse
+import base64
+import email.policy
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+import uuid
+import zlib
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+EMBEDDING_DIMENSIONS = 1536
+
+MODERATION_CATEGORIES = [
+    "harassment", "harassment/threatening", "hate", "hate/threatening",
+    "illicit", "illicit/violent", "self-harm", "self-harm/instructions",
+    "self-harm/intent", "sexual", "sexual/minors", "violence", "violence/graphic",
+]  # fmt: skip
+
+# Fake speech is a sequence of fixed-size MP3-like frames, one per word
+SPEECH_FRAME_HEADER = b"\xff\xfb\x90\x00"
+SPEECH_FRAME_SIZE = 417
+
+# Statuses a fake batch moves through, one step per retrieval
+BATCH_STATUSES = ["validating", "in_progress", "finalizing", "completed"]
+
+RATE_LIMIT_HEADERS = {
+    "x-ratelimit-limit-requests": "10000",
+    "x-ratelimit-remaining-requests": "10000",
+    "x-ratelimit-reset-requests": "0s",
+    "x-ratelimit-limit-tokens": "2000000",
+    "x-ratelimit-remaining-tokens": "2000000",
+    "x-ratelimit-reset-tokens": "0s",
+}
+
+
+def _tool_calls(body: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Call the first tool twice in parallel, as models do for multi-part queries.
+
+    Required string parameters are filled with the user's message.
+    """
+    function = body["tools"][0]["function"]
+    content = str(body["messages"][-1].get("content") or "")
+    required = function.get("parameters", {}).get("required", [])
+    calls = []
+    for _ in range(2):
+        arguments = {name: content for name in required}
+        calls.append(
+            {
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {
+                    "name": function["name"],
+                    "arguments": json.dumps(arguments),
+                },
+            }
+        )
+    return calls
+
+
+def _schema_instance(
+    schema: Dict[str, Any], words: List[str], root: Dict[str, Any], path: str = ""
+) -> Any:
+    """
+    Build a value matching a JSON schema, filling strings from the given words.
+
+    Strings differ by their position in the document, so array items are
+    distinct; arrays get their minimum number of items, at least one.
+    """
+    if "$ref" in schema:
+        name = schema["$ref"].split("/")[-1]
+        return _schema_instance(root.get("$defs", {})[name], words, root, path)
+    if "anyOf" in schema:
+        return _schema_instance(schema["anyOf"][0], words, root, path)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    kind = schema.get("type", "string")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "null")
+    if kind == "object":
+        return {
+            name: _schema_instance(value, words, root, f"{path}.{name}")
+            for name, value in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [
+            _schema_instance(schema.get("items", {}), words, root, f"{path}[{i}]")
+            for i in range(max(schema.get("minItems", 1), 1))
+        ]
+    if kind == "integer":
+        return schema.get("minimum", 0)
+    if kind == "number":
+        return float(schema.get("minimum", 0))
+    if kind == "boolean":
+        return True
+    if kind == "null":
+        return None
+    return f"{' '.join(words[-8:])} ({path.lstrip('.') or 'value'})"
+
+
+def _chat_completion(body: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a fake chat completion for the given request body.
+
+    The reply is the first few words of the last message, prefixed with
+    "Summary:", which keeps outputs short and deterministic.
+    """
+    messages = body.get("messages") or [{"content": ""}]
+    content = messages[-1].get("content") or ""
+    if not isinstance(content, str):
+        content = " ".join(
+            part.get("text", "") for part in content if isinstance(part, dict)
+        )
+    words = content.split()
+    reply = "Summary: " + " ".join(words[:12])
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        schema = response_format["json_schema"].get("schema", {})
+        reply = json.dumps(_schema_instance(schema, words, schema))
+    message = {"role": "assistant", "content": reply}
+    finish_reason = "stop"
+    if (
+        body.get("tools")
+        and body.get("tool_choice") != "none"
+        and messages[-1].get("role") == "user"
+    ):
+        message = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": _tool_calls(body),
+        }
+        finish_reason = "tool_calls"
+    prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in messages)
+    completion_tokens = len(reply.split())
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4"),
+        "choices": [
+            {
+                "index": 0,
+                "message": message,
+                "finish_reason": finish_reason,
+            }
+        ],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _embedding(text: str, dimensions: int) -> List[float]:
+    """Return a deterministic pseudo-random vector derived from the text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    return [rng.uniform(-1.0, 1.0) for _ in range(dimensions)]
+
+
+def _embeddings(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a fake embeddings response for the given request body."""
+    inputs = body.get("input") or []
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    dimensions = body.get("dimensions") or EMBEDDING_DIMENSIONS
+    data = []
+    for index, text in enumerate(inputs):
+        vector = _embedding(str(text), dimensions)
+        if body.get("encoding_format") == "base64":
+            packed = struct.pack(f"<{dimensions}f", *vector)
+            vector = base64.b64encode(packed).decode("ascii")
+        data.append({"object": "embedding", "index": index, "embedding": vector})
+    tokens = sum(len(str(text).split()) for text in inputs)
+    return {
+        "object": "list",
+        "data": data,
+        "model": body.get("model", "text-embedding-3-small"),
+        "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+    }
+
+
+def _moderation_result(content: str, input_types: List[str]) -> Dict[str, Any]:
+    """Score one moderation input; mentions of "kill" score high on violence."""
+    seed = int.from_bytes(hashlib.sha256(content.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    scores = {name: 0.4 * rng.random() ** 8 for name in MODERATION_CATEGORIES}
+    if "kill" in content.lower():
+        scores["violence"] = 0.9
+    categories = {name: score > 0.5 for name, score in scores.items()}
+    return {
+        "flagged": any(categories.values()),
+        "categories": categories,
+        "category_scores": scores,
+        "category_applied_input_types": {
+            name: input_types for name in MODERATION_CATEGORIES
+        },
+    }
+
+
+def _moderations(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a fake moderation response; a list of parts is a single input."""
+    inputs = body.get("input") or ""
+    if isinstance(inputs, str):
+        results = [_moderation_result(inputs, ["text"])]
+    elif inputs and isinstance(inputs[0], dict):
+        types = sorted(
+            {"image" if p["type"] == "image_url" else "text" for p in inputs}
+        )
+        results = [_moderation_result(json.dumps(inputs, sort_keys=True), types)]
+    else:
+        results = [_moderation_result(str(text), ["text"]) for text in inputs]
+    return {
+        "id": f"modr-{uuid.uuid4().hex}",
+        "model": body.get("model", "omni-moderation-latest"),
+        "results": results,
+    }
+
+
+def _speech_frames(body: Dict[str, Any]) -> List[bytes]:
+    """Fake audio: one MP3-sized frame per word, carrying the word itself."""
+    return [
+        (SPEECH_FRAME_HEADER + word.encode("utf-8")).ljust(SPEECH_FRAME_SIZE, b"\0")[
+            :SPEECH_FRAME_SIZE
+        ]
+        for word in str(body.get("input", "")).split()
+    ]
+
+
+def _transcription(audio: bytes, response_format: str) -> Tuple[bytes, str]:
+    """
+    Fake transcription: frames written by the fake speech endpoint read back
+    as their words, half a second each; other audio gives one placeholder
+    word per second at 128 kbps.
+    """
+    frames = [
+        audio[i : i + SPEECH_FRAME_SIZE]
+        for i in range(0, len(audio), SPEECH_FRAME_SIZE)
+    ]
+    if frames and all(f.startswith(SPEECH_FRAME_HEADER) for f in frames):
+        words = [f[len(SPEECH_FRAME_HEADER) :].rstrip(b"\0").decode() for f in frames]
+        seconds_per_word = 0.5
+    else:
+        digest = hashlib.sha256(audio).hexdigest()
+        words = [f"audio{digest[:6]}-{n}" for n in range(max(1, len(audio) // 16000))]
+        seconds_per_word = 1.0
+    text = " ".join(words)
+    if response_format == "text":
+        return text.encode("utf-8"), "text/plain"
+    payload: Dict[str, Any] = {"text": text}
+    if response_format == "verbose_json":
+        payload["language"] = "english"
+        payload["duration"] = len(words) * seconds_per_word
+        payload["segments"] = [
+            {
+                "id": n,
+                "start": first * seconds_per_word,
+                "end": min(first + 8, len(words)) * seconds_per_word,
+                "text": " " + " ".join(words[first : first + 8]),
+            }
+            for n, first in enumerate(range(0, len(words), 8))
+        ]
+    return json.dumps(payload).encode("utf-8"), "application/json"
+
+
+def _png(width: int, height: int, seed: str) -> bytes:
+    """Encode a solid-colour RGB PNG whose colour is derived from the seed."""
+    color = hashlib.sha256(seed.encode("utf-8")).digest()[:3]
+    raw = (b"\0" + color * width) * height
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _parse_multipart(
+    content_type: str, data: bytes
+) -> Dict[str, Tuple[Optional[str], bytes]]:
+    """Parse a multipart/form-data body into {field: (filename, content)}."""
+    header = f"Content-Type: {content_type}\r\n\r\n".encode("latin-1")
+    message = BytesParser(policy=email.policy.default).parsebytes(header + data)
+    return {
+        part.get_param("name", header="content-disposition"): (
+            part.get_filename(),
+            part.get_payload(decode=True),
+        )
+        for part in message.iter_parts()
+    }
+
+
+def _file_object(file_id: str, stored: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": file_id,
+        "object": "file",
+        "bytes": len(stored["content"]),
+        "created_at": stored["created_at"],
+        "filename": stored["filename"],
+        "purpose": stored["purpose"],
+        "status": "processed",
+    }
+
+
+def _batch_line(request: Dict[str, Any]) -> Tuple[bool, Dict[str, Any]]:
+    """Run one batch input line; returns whether it succeeded and its output."""
+    url = request.get("url", "")
+    body = request.get("body") or {}
+    if url.endswith("/chat/completions"):
+        response = _chat_completion(body)
+    elif url.endswith("/embeddings"):
+        response = _embeddings(body)
+    else:
+        error = {"code": "invalid_url", "message": f"Unsupported url {url}"}
+        return False, {
+            "id": f"batch_req_{uuid.uuid4().hex}",
+            "custom_id": request.get("custom_id"),
+            "response": None,
+            "error": error,
+        }
+    return True, {
+        "id": f"batch_req_{uuid.uuid4().hex}",
+        "custom_id": request.get("custom_id"),
+        "response": {
+            "status_code": 200,
+            "request_id": uuid.uuid4().hex,
+            "body": response,
+        },
+        "error": None,
+    }
+
+
+def _chat_completion_chunks(completion: Dict[str, Any], include_usage: bool):
+    """Split a fake chat completion into streaming chunks, one per word."""
+    base = {
+        "id": completion["id"],
+        "object": "chat.completion.chunk",
+        "created": completion["created"],
+        "model": completion["model"],
+    }
+    content = completion["choices"][0]["message"]["content"]
+    words = content.split(" ")
+    yield dict(
+        base,
+        choices=[{"index": 0, "delta": {"role": "assistant"}, "finish_reason": None}],
+    )
+    for position, word in enumerate(words):
+        text = word if position == 0 else " " + word
+        yield dict(
+            base,
+            choices=[{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+        )
+    yield dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+    if include_usage:
+        yield dict(base, choices=[], usage=completion["usage"])
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Request handler emulating a subset of the OpenAI REST API."""
+
+    server_version = "MockOpenAI/1.0"
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this, Nagle's
+    # algorithm and delayed ACKs add ~40ms to every response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Silence per-request logging."""
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200):
+        self._send_bytes(
+            json.dumps(payload).encode("utf-8"), "application/json", status
+        )
+
+    def _send_bytes(self, data: bytes, content_type: str, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in RATE_LIMIT_HEADERS.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_chunked(self, chunks: Iterable[bytes], content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in RATE_LIMIT_HEADERS.items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                self.wfile.write(
+                    f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n"
+                )
+                self.wfile.flush()
+                if self.server.token_latency:
+                    time.sleep(self.server.token_latency)
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early, e.g. a cancelled generation
+            self.close_connection = True
+
+    def _send_event_stream(self, events):
+        self._send_chunked(
+            (
+                f"data: {e if isinstance(e, str) else json.dumps(e)}\n\n".encode(
+                    "utf-8"
+                )
+                for e in list(events) + ["[DONE]"]
+            ),
+            "text/event-stream",
+        )
+
+    def _send_injected_error(self) -> bool:
+        """Fail the request at the configured error rate, as 429 or 500."""
+        if random.random() >= self.server.error_rate:
+            return False
+        if random.random() < 0.5:
+            error = {"message": "Rate limit reached", "type": "requests"}
+            data = json.dumps({"error": error}).encode("utf-8")
+            self.send_response(429)
+            self.send_header("retry-after-ms", "10")
+        else:
+            error = {"message": "The server had an error", "type": "server_error"}
+            data = json.dumps({"error": error}).encode("utf-8")
+            self.send_response(500)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        return True
+
+    def _create_images(self, body: Dict[str, Any], prompt: str):
+        """Return solid-colour PNGs, inline or by URL on this server."""
+        width, height = (int(n) for n in body.get("size", "256x256").split("x"))
+        # Keep fake images small whatever size was requested
+        width, height = min(width, 64), min(height, 64)
+        data = []
+        for n in range(int(body.get("n") or 1)):
+            png = _png(width, height, f"{prompt}#{n}")
+            if body.get("response_format") == "b64_json":
+                data.append({"b64_json": base64.b64encode(png).decode("ascii")})
+                continue
+            name = f"img-{uuid.uuid4().hex[:24]}.png"
+            with self.server.state_lock:
+                self.server.images[name] = png
+            host = self.headers.get("Host", "127.0.0.1")
+            data.append({"url": f"http://{host}/images/{name}"})
+        self._send_json({"created": int(time.time()), "data": data})
+
+    def _send_not_found(self, path: str):
+        error = {
+            "message": f"Unknown endpoint {path}",
+            "type": "invalid_request_error",
+        }
+        self._send_json({"error": error}, status=404)
+
+    def _create_file(self, data: bytes):
+        fields = _parse_multipart(self.headers.get("Content-Type", ""), data)
+        filename, content = fields.get("file", (None, b""))
+        purpose = fields.get("purpose", (None, b"batch"))[1].decode("utf-8")
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        stored = {
+            "content": content,
+            "filename": filename or "upload",
+            "purpose": purpose,
+            "created_at": int(time.time()),
+        }
+        with self.server.state_lock:
+            self.server.files[file_id] = stored
+        self._send_json(_file_object(file_id, stored))
+
+    def _store_output(self, lines: List[Dict[str, Any]], purpose: str) -> str:
+        file_id = f"file-{uuid.uuid4().hex[:24]}"
+        self.server.files[file_id] = {
+            "content": "".join(json.dumps(line) + "\n" for line in lines).encode(),
+            "filename": f"{purpose}.jsonl",
+            "purpose": purpose,
+            "created_at": int(time.time()),
+        }
+        return file_id
+
+    def _create_batch(self, body: Dict[str, Any]):
+        with self.server.state_lock:
+            if body.get("input_file_id") not in self.server.files:
+                error = {
+                    "message": "Input file not found",
+                    "type": "invalid_request_error",
+                }
+                self._send_json({"error": error}, status=400)
+                return
+            batch = {
+                "id": f"batch_{uuid.uuid4().hex[:24]}",
+                "object": "batch",
+                "endpoint": body.get("endpoint"),
+                "input_file_id": body["input_file_id"],
+                "completion_window": body.get("completion_window", "24h"),
+                "status": BATCH_STATUSES[0],
+                "created_at": int(time.time()),
+                "metadata": body.get("metadata"),
+                "request_counts": {"total": 0, "completed": 0, "failed": 0},
+            }
+            self.server.batches[batch["id"]] = batch
+        self._send_json(batch)
+
+    def _advance_batch(self, batch: Dict[str, Any]):
+        """Move a batch one status further, running it when it completes."""
+        position = BATCH_STATUSES.index(batch["status"])
+        if position == len(BATCH_STATUSES) - 1:
+            return
+        batch["status"] = BATCH_STATUSES[position + 1]
+        if batch["status"] != "completed":
+            return
+        outputs, errors = [], []
+        content = self.server.files[batch["input_file_id"]]["content"]
+        for line in content.decode("utf-8").splitlines():
+            if line.strip():
+                ok, output = _batch_line(json.loads(line))
+                (outputs if ok else errors).append(output)
+        batch["completed_at"] = int(time.time())
+        batch["request_counts"] = {
+            "total": len(outputs) + len(errors),
+            "completed": len(outputs),
+            "failed": len(errors),
+        }
+        if outputs:
+            batch["output_file_id"] = self._store_output(outputs, "batch_output")
+        if errors:
+            batch["error_file_id"] = self._store_output(errors, "batch_error")
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Serve file contents and batch status."""
+        path = self.path.split("?")[0].rstrip("/")
+        parts = path.split("/")
+        with self.server.state_lock:
+            if len(parts) >= 2 and parts[-2] == "images":
+                image = self.server.images.get(parts[-1])
+                if image is not None:
+                    self._send_bytes(image, "image/png")
+                    return
+            if len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content":
+                stored = self.server.files.get(parts[-2])
+                if stored is not None:
+                    self._send_bytes(stored["content"], "application/octet-stream")
+                    return
+            elif len(parts) >= 2 and parts[-2] == "files":
+                stored = self.server.files.get(parts[-1])
+                if stored is not None:
+                    self._send_json(_file_object(parts[-1], stored))
+                    return
+            elif len(parts) >= 2 and parts[-2] == "batches":
+                batch = self.server.batches.get(parts[-1])
+                if batch is not None:
+                    self._advance_batch(batch)
+                    self._send_json(batch)
+                    return
+        self._send_not_found(path)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Dispatch POST requests to the fake endpoints."""
+        data = self._read_body()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self._send_injected_error():
+            return
+
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/files"):
+            self._create_file(data)
+            return
+        if path.endswith("/images/edits"):
+            fields = _parse_multipart(self.headers.get("Content-Type", ""), data)
+            body = {
+                name: value.decode("utf-8")
+                for name, (filename, value) in fields.items()
+                if filename is None
+            }
+            self._create_images(body, body.get("prompt", ""))
+            return
+        if path.endswith("/audio/transcriptions"):
+            fields = _parse_multipart(self.headers.get("Content-Type", ""), data)
+            response_format = fields.get("response_format", (None, b"json"))[1]
+            self._send_bytes(
+                *_transcription(
+                    fields.get("file", (None, b""))[1], response_format.decode()
+                )
+            )
+            return
+        body = json.loads(data) if data else {}
+        if path.endswith("/chat/completions"):
+            completion = _chat_completion(body)
+            if body.get("stream"):
+                include_usage = (body.get("stream_options") or {}).get("include_usage")
+                self._send_event_stream(
+                    _chat_completion_chunks(completion, bool(include_usage))
+                )
+            else:
+                self._send_json(completion)
+        elif path.endswith("/embeddings"):
+            self._send_json(_embeddings(body))
+        elif path.endswith("/moderations"):
+            self._send_json(_moderations(body))
+        elif path.endswith("/images/generations"):
+            self._create_images(body, str(body.get("prompt", "")))
+        elif path.endswith("/audio/speech"):
+            self._send_chunked(_speech_frames(body), "audio/mpeg")
+        elif path.endswith("/batches"):
+            self._create_batch(body)
+        else:
+            self._send_not_found(path)
+
+
+def start_server(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    latency: float = 0.0,
+    token_latency: float = 0.0,
+    error_rate: float = 0.0,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the stub server in a daemon thread.
+
+    Args:
+        host (str): Interface to bind to
+        port (int): Port to bind to, 0 picks a free port
+        latency (float): Artificial delay in seconds added to each request
+        token_latency (float): Delay in seconds between streamed chunks
+        error_rate (float): Fraction of POST requests failing with 429 or 500
+
+    Returns:
+        Tuple[ThreadingHTTPServer, str]: The running server and its base URL
+    """
+    server = ThreadingHTTPServer((host, port), MockOpenAIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.token_latency = token_latency
+    server.error_rate = error_rate
+    server.images = {}
+    server.files = {}
+    server.batches = {}
+    server.state_lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    bound_host, bound_port = server.server_address[:2]
+    return server, f"http://{bound_host}:{bound_port}/v1"
+
+
+def main():
+    """Run the stub server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local OpenAI API stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--token-latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, base_url = start_server(
+        args.host, args.port, args.latency, args.token_latency, args.error_rate
+    )
+    print(f"Mock OpenAI server listening on {base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,27 +7,386 @@ and compliance with content guidelines.
 
 Dependencies:
     - openai: The official OpenAI Python client library
+    - numpy: Compact score arrays
     - Environment variable OPENAI_API_KEY must be set
 
 Features:
     - Detect potentially harmful content
     - Check for various content categories (violence, hate, etc.)
     - Real-time content moderation
-    - Batch processing of multiple texts
+    - Batch processing of multiple texts, many per request and several
+      requests at once under the moderation rate limiter
+    - Mixed text and image inputs for omni-moderation-latest
+    - Verdicts cached by input hash, in memory or in SQLite
+    - Per-category float32 score matrices for threshold tuning
 
 Example:
     $ export OPENAI_API_KEY='your-api-key'
     $ python moderation.py
+
+    from moderation import image_input, moderate
+
+    results = moderate(["first comment", image_input(url, "caption")])
+    print(results.flagged, results.category("violence"))
+    print(results.flagged_at({"violence": 0.3}))
 """
 
-import os
-from openai import OpenAI
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from openai import AsyncOpenAI, OpenAIError
+
+from openai_client import close_async_client, get_async_client
+from rate_limiter import RateLimiter
+
+MODEL = "omni-moderation-latest"
+MAX_INPUTS_PER_REQUEST = 32
+MAX_CONCURRENCY = 4
+MODERATION_REQUESTS_PER_MINUTE = 1000
+
+CATEGORIES = [
+    "harassment", "harassment/threatening", "hate", "hate/threatening",
+    "illicit", "illicit/violent", "self-harm", "self-harm/instructions",
+    "self-harm/intent", "sexual", "sexual/minors", "violence", "violence/graphic",
+]  # fmt: skip
+
+# Moderation has its own request quota and does not use chat tokens per minute
+moderation_limiter = RateLimiter(requests_per_minute=MODERATION_REQUESTS_PER_MINUTE)
+
+# A text, or the parts of one mixed input (text and image_url objects)
+ModerationInput = Union[str, List[Dict[str, Any]]]
+
+
+def image_input(url: str, text: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Build a mixed input of an image, optionally with accompanying text.
+
+    Args:
+        url (str): Image URL or data: URL
+        text (Optional[str]): Text moderated together with the image
+
+    Returns:
+        List[Dict[str, Any]]: Input parts, moderated as a single item
+    """
+    parts: List[Dict[str, Any]] = []
+    if text:
+        parts.append({"type": "text", "text": text})
+    parts.append({"type": "image_url", "image_url": {"url": url}})
+    return parts
+
+
+def input_digest(item: ModerationInput) -> bytes:
+    """Return the SHA-256 digest identifying a moderation input."""
+    if not isinstance(item, str):
+        item = json.dumps(item, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(item.encode("utf-8")).digest()
+
+
+class VerdictCache:
+    """
+    Moderation verdicts keyed by model and input digest.
+
+    Verdicts are stored as a flag and a float32 score row, so the default
+    in-memory database stays compact; pass a file path to keep verdicts
+    across runs.
+
+    Args:
+        path (str): SQLite database file, ":memory:" for a per-process cache
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts (model TEXT NOT NULL, "
+            "digest BLOB NOT NULL, flagged INTEGER NOT NULL, scores BLOB NOT NULL, "
+            "PRIMARY KEY (model, digest))"
+        )
+        self._conn.commit()
+
+    def get(
+        self, model: str, digests: Sequence[bytes]
+    ) -> Dict[bytes, Tuple[bool, np.ndarray]]:
+        """
+        Look up cached verdicts.
+
+        Args:
+            model (str): Moderation model
+            digests (Sequence[bytes]): Digests from input_digest
+
+        Returns:
+            Dict[bytes, Tuple[bool, np.ndarray]]: Flag and scores per found digest
+        """
+        found = {}
+        with self._lock:
+            for digest in digests:
+                row = self._conn.execute(
+                    "SELECT flagged, scores FROM verdicts WHERE model = ? AND digest = ?",
+                    (model, digest),
+                ).fetchone()
+                if row is not None:
+                    found[digest] = (bool(row[0]), np.frombuffer(row[1], np.float32))
+            self.hits += len(found)
+            self.misses += len(digests) - len(found)
+        return found
+
+    def set(
+        self,
+        model: str,
+        digests: Sequence[bytes],
+        flagged: np.ndarray,
+        scores: np.ndarray,
+    ):
+        """
+        Store verdicts.
+
+        Args:
+            model (str): Moderation model
+            digests (Sequence[bytes]): Digests from input_digest
+            flagged (np.ndarray): One flag per digest
+            scores (np.ndarray): One float32 score row per digest
+        """
+        rows = [
+            (model, digest, int(flag), np.asarray(row, np.float32).tobytes())
+            for digest, flag, row in zip(digests, flagged, scores)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit and miss counters and the hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+@dataclass
+class ModerationResults:
+    """
+    Verdicts for a list of inputs.
+
+    Attributes:
+        flagged (np.ndarray): Whether the API flagged each input, shape (n,)
+        scores (np.ndarray): float32 category scores, shape (n, len(CATEGORIES))
+    """
+
+    flagged: np.ndarray
+    scores: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.flagged)
+
+    def category(self, name: str) -> np.ndarray:
+        """Return the scores of one category for every input."""
+        return self.scores[:, CATEGORIES.index(name)]
+
+    def flagged_at(self, thresholds: Dict[str, float]) -> np.ndarray:
+        """
+        Flag inputs with custom per-category thresholds.
+
+        Args:
+            thresholds (Dict[str, float]): Minimum score per category;
+                categories without a threshold are ignored
+
+        Returns:
+            np.ndarray: Whether any category reaches its threshold, shape (n,)
+        """
+        limits = np.full(len(CATEGORIES), np.inf, dtype=np.float32)
+        for name, threshold in thresholds.items():
+            limits[CATEGORIES.index(name)] = threshold
+        return (self.scores >= limits).any(axis=1)
+
+
+def _scores_row(result) -> np.ndarray:
+    scores = result.category_scores.model_dump(by_alias=True)
+    return np.array([scores.get(name) or 0.0 for name in CATEGORIES], np.float32)
+
+
+def _batches(inputs: Sequence[ModerationInput], max_inputs: int) -> List[List[int]]:
+    """Group text inputs into requests; every mixed input gets its own request."""
+    batches: List[List[int]] = []
+    texts: List[int] = []
+    for position, item in enumerate(inputs):
+        if isinstance(item, str):
+            texts.append(position)
+            if len(texts) == max_inputs:
+                batches.append(texts)
+                texts = []
+        else:
+            batches.append([position])
+    if texts:
+        batches.append(texts)
+    return batches
+
+
+async def _moderate_batches(
+    inputs: Sequence[ModerationInput],
+    model: str,
+    max_inputs: int,
+    max_concurrency: int,
+    client: AsyncOpenAI,
+) -> Tuple[np.ndarray, np.ndarray]:
+    create = client.with_options(max_retries=0).moderations.with_raw_response.create
+    semaphore = asyncio.Semaphore(max_concurrency)
+    flagged = np.zeros(len(inputs), dtype=bool)
+    scores = np.zeros((len(inputs), len(CATEGORIES)), dtype=np.float32)
+
+    async def run(positions: List[int]):
+        items = [inputs[position] for position in positions]
+        request_input = items[0] if not isinstance(items[0], str) else items
+        async with semaphore:
+            response = await moderation_limiter.call_async(
+                create, model=model, input=request_input
+            )
+        for position, result in zip(positions, response.results):
+            flagged[position] = result.flagged
+            scores[position] = _scores_row(result)
+
+    await asyncio.gather(*(run(batch) for batch in _batches(inputs, max_inputs)))
+    return flagged, scores
+
+
+async def moderate_async(
+    inputs: Sequence[ModerationInput],
+    model: str = MODEL,
+    max_inputs: int = MAX_INPUTS_PER_REQUEST,
+    max_concurrency: int = MAX_CONCURRENCY,
+    client: Optional[AsyncOpenAI] = None,
+    cache: Optional[VerdictCache] = None,
+) -> ModerationResults:
+    """
+    Moderate many inputs with batched, concurrent requests.
+
+    Texts are sent up to max_inputs per request; mixed text and image inputs
+    are sent one per request, as the API scores them as a single item.
+    Repeated inputs are moderated once, and cached verdicts are not
+    requested again.
+
+    Args:
+        inputs (Sequence[ModerationInput]): Texts and mixed inputs
+        model (str): Moderation model to use
+        max_inputs (int): Maximum number of texts per request
+        max_concurrency (int): Maximum number of requests in flight
+        client (Optional[AsyncOpenAI]): Client to use, defaults to the shared client
+        cache (Optional[VerdictCache]): Cache of earlier verdicts
+
+    Returns:
+        ModerationResults: Flags and scores in input order
+
+    Raises:
+        ValueError: If max_inputs or max_concurrency is not positive
+        OpenAIError: If API call fails
+    """
+    if max_inputs <= 0 or max_concurrency <= 0:
+        raise ValueError("max_inputs and max_concurrency must be positive numbers")
+
+    # Deduplicate: unique[i] is the first input with digests[i]
+    first_seen: Dict[bytes, int] = {}
+    inverse = np.empty(len(inputs), dtype=np.intp)
+    for position, item in enumerate(inputs):
+        inverse[position] = first_seen.setdefault(input_digest(item), len(first_seen))
+    digests = list(first_seen)
+    unique = np.empty(len(digests), dtype=np.intp)
+    unique[inverse] = np.arange(len(inputs))
+
+    flagged = np.zeros(len(digests), dtype=bool)
+    scores = np.zeros((len(digests), len(CATEGORIES)), dtype=np.float32)
+    missing = list(range(len(digests)))
+    if cache is not None:
+        found = cache.get(model, digests)
+        missing = [i for i in missing if digests[i] not in found]
+        for i, digest in enumerate(digests):
+            if digest in found:
+                flagged[i], scores[i] = found[digest]
+
+    if missing:
+        fresh_flagged, fresh_scores = await _moderate_batches(
+            [inputs[unique[i]] for i in missing],
+            model,
+            max_inputs,
+            max_concurrency,
+            client or get_async_client(),
+        )
+        flagged[missing] = fresh_flagged
+        scores[missing] = fresh_scores
+        if cache is not None:
+            cache.set(model, [digests[i] for i in missing], fresh_flagged, fresh_scores)
+
+    return ModerationResults(flagged[inverse], scores[inverse])
+
+
+def moderate(
+    inputs: Sequence[ModerationInput],
+    model: str = MODEL,
+    max_inputs: int = MAX_INPUTS_PER_REQUEST,
+    max_concurrency: int = MAX_CONCURRENCY,
+    cache: Optional[VerdictCache] = None,
+) -> ModerationResults:
+    """
+    Moderate many inputs; synchronous wrapper around moderate_async.
+
+    Args:
+        inputs (Sequence[ModerationInput]): Texts and mixed inputs
+        model (str): Moderation model to use
+        max_inputs (int): Maximum number of texts per request
+        max_concurrency (int): Maximum number of requests in flight
+        cache (Optional[VerdictCache]): Cache of earlier verdicts
+
+    Returns:
+        ModerationResults: Flags and scores in input order
+    """
+
+    async def run() -> ModerationResults:
+        try:
+            return await moderate_async(
+                inputs, model, max_inputs, max_concurrency, cache=cache
+            )
+        finally:
+            await close_async_client()
+
+    return asyncio.run(run())
+
+
+def main():
+    """Moderate a few texts and an image."""
+    texts = [
+        "I want to kill my neighbour.",
+        "What a lovely day for a picnic.",
+        "I want to kill my neighbour.",
+    ]
+    image = image_input(
+        "https://upload.wikimedia.org/wikipedia/commons/f/f0/Ophiopteris_antipodum.JPG",
+        "Look at this starfish",
+    )
+    try:
+        results = moderate(texts + [image], cache=VerdictCache())
+    except OpenAIError as e:
+        print(f"OpenAI API error occurred: {str(e)}")
+        return
+    except ValueError as e:
+        print(f"Configuration error: {str(e)}")
+        return
 
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
+    for text, flagged, violence in zip(
+        texts + ["<image>"], results.flagged, results.category("violence")
+    ):
+        print(f"{'FLAGGED' if flagged else 'ok':7}  violence={violence:.3f}  {text}")
 
-response = client.moderations.create(
-    model="omni-moderation-latest", input="I want to kill my neighbour."
-)
 
-print(response.results[0])
+if __name__ == "__main__":
+    main()
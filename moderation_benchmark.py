@@ -0,0 +1,118 @@
+"""
+Bulk Moderation Throughput Benchmark
+
+This script measures how many inputs per second moderation.py screens
+against the local stub server, for several batch sizes and concurrency
+levels, and how much a warm verdict cache saves on repeated content.
+
+Dependencies:
+    - openai: The official OpenAI Python client library
+    - numpy: Score arrays
+
+Features:
+    - Starts mock_openai_server.py in-process with artificial latency
+    - Synthetic comment stream with a configurable share of repeats
+    - Inputs per second and request count per configuration
+    - Cold and warm verdict cache runs
+
+Example:
+    $ python moderation_benchmark.py --inputs 2000 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List
+
+from mock_openai_server import start_server
+from moderation import VerdictCache, moderate_async
+from openai_client import close_async_client, configure
+
+WORDS = (
+    "great video thanks for sharing I totally disagree with this take "
+    "the sound is too quiet can you kill the background music please "
+    "first time watching and already subscribed love it"
+).split()
+
+
+def make_comments(count: int, repeat_share: float, seed: int = 0) -> List[str]:
+    """
+    Build a synthetic stream of user comments.
+
+    Args:
+        count (int): Number of comments
+        repeat_share (float): Fraction of comments repeating an earlier one
+        seed (int): Random seed for reproducible streams
+
+    Returns:
+        List[str]: Comments in stream order
+    """
+    rng = random.Random(seed)
+    comments: List[str] = []
+    for _ in range(count):
+        if comments and rng.random() < repeat_share:
+            comments.append(rng.choice(comments))
+        else:
+            comments.append(" ".join(rng.choices(WORDS, k=rng.randint(4, 20))))
+    return comments
+
+
+def run_once(
+    comments: List[str], max_inputs: int, max_concurrency: int, cache: VerdictCache
+) -> Dict[str, float]:
+    """Moderate every comment once and time it."""
+
+    async def run():
+        try:
+            return await moderate_async(
+                comments, max_inputs=max_inputs, max_concurrency=max_concurrency,
+                cache=cache,
+            )  # fmt: skip
+        finally:
+            await close_async_client()
+
+    start = time.perf_counter()
+    results = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    return {
+        "seconds": elapsed,
+        "inputs_per_second": len(comments) / elapsed,
+        "flagged": int(results.flagged.sum()),
+    }
+
+
+def main():
+    """Run the benchmark and print a table."""
+    parser = argparse.ArgumentParser(description="Benchmark bulk moderation")
+    parser.add_argument("--inputs", type=int, default=1000)
+    parser.add_argument("--repeat-share", type=float, default=0.3)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    server, base_url = start_server(latency=args.latency)
+    configure(base_url=base_url, api_key="benchmark")
+    comments = make_comments(args.inputs, args.repeat_share)
+    unique = len(set(comments))
+    print(f"{args.inputs} comments, {unique} unique, {args.latency}s latency")
+    print(f"{'batch':>6} {'conc':>5} {'requests':>9} {'cold/s':>10} {'warm/s':>12}")
+    try:
+        for batch_size in args.batch_sizes:
+            for concurrency in args.concurrency:
+                cache = VerdictCache()
+                cold = run_once(comments, batch_size, concurrency, cache)
+                warm = run_once(comments, batch_size, concurrency, cache)
+                requests = -(-unique // batch_size)
+                print(
+                    f"{batch_size:>6} {concurrency:>5} {requests:>9} "
+                    f"{cold['inputs_per_second']:>10.0f} "
+                    f"{warm['inputs_per_second']:>12.0f}"
+                )
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+"""
+Parallel Moderation Guard
+
+This module screens the input of a generation request with the moderation
+API while the completion is already being generated, instead of in a
+serial round-trip in front of it. On the happy path the verdict arrives
+before the completion finishes and the check adds no latency; when the
+input is flagged, the completion is cancelled if it is still running and
+discarded otherwise.
+
+Dependencies:
+    - openai: The official OpenAI Python client library
+    - Environment variable OPENAI_API_KEY must be set
+
+Features:
+    - Moderation and completion sent at the same time
+    - Blocking, streaming and asyncio interfaces
+    - Streams held back until the verdict arrives and closed when flagged
+    - Async completions cancelled as soon as the input is flagged
+    - Fail-closed by default when the moderation call itself fails
+    - Metrics: flag rate, cancellations and added-latency percentiles
+
+Example:
+    from moderation_guard import FlaggedInputError, ModerationGuard
+
+    guard = ModerationGuard()
+    try:
+        article = guard.run(prompt, lambda: ask_chatgpt(messages))
+    except FlaggedInputError as e:
+        print(f"Rejected: {', '.join(e.categories)}")
+    print(guard.metrics.snapshot())
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from openai import AsyncOpenAI, OpenAI, OpenAIError
+
+from moderation import moderation_limiter
+from openai_client import get_async_client, get_client
+
+MODEL = "omni-moderation-latest"
+MAX_WORKERS = 8
+LATENCY_SAMPLES = 10000
+
+T = TypeVar("T")
+
+
+class FlaggedInputError(ValueError):
+    """
+    Raised when the moderation API flags the input of a request.
+
+    Attributes:
+        categories (List[str]): Categories the input was flagged for
+    """
+
+    def __init__(self, categories: List[str]):
+        self.categories = categories
+        super().__init__(f"Input flagged by moderation: {', '.join(categories)}")
+
+
+@dataclass
+class Verdict:
+    """Moderation outcome of one input."""
+
+    flagged: bool
+    categories: List[str] = field(default_factory=list)
+
+
+def input_text(messages: Sequence[Dict[str, Any]]) -> str:
+    """
+    Collect the user-supplied text of a conversation for moderation.
+
+    Args:
+        messages (Sequence[Dict[str, Any]]): Chat messages
+
+    Returns:
+        str: Text content of the user messages, one per line
+    """
+    parts = []
+    for message in messages:
+        if not isinstance(message, dict) or message.get("role") != "user":
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(p.get("text", "") for p in content if p.get("type") == "text")
+    return "\n".join(parts)
+
+
+def _verdict(response) -> Verdict:
+    result = response.results[0]
+    categories = result.categories.model_dump(by_alias=True)
+    return Verdict(result.flagged, [name for name, hit in categories.items() if hit])
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted samples."""
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class GuardMetrics:
+    """
+    Counters and latency samples of a guard, safe to share between threads.
+
+    Added latency is the time a request spent waiting for the verdict after
+    its completion was ready; it is zero whenever moderation finished first.
+    """
+
+    def __init__(self, max_samples: int = LATENCY_SAMPLES):
+        self.checks = 0
+        self.flagged = 0
+        self.cancelled = 0
+        self.discarded = 0
+        self.errors = 0
+        self._added_latency: "deque[float]" = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def record(self, verdict: Optional[Verdict], added_latency: float):
+        """Record one finished check; verdict is None when moderation failed."""
+        with self._lock:
+            self.checks += 1
+            if verdict is None:
+                self.errors += 1
+            elif verdict.flagged:
+                self.flagged += 1
+            self._added_latency.append(max(0.0, added_latency))
+
+    def record_rejection(self, cancelled: bool):
+        """Record that a flagged request's completion was cancelled or discarded."""
+        with self._lock:
+            if cancelled:
+                self.cancelled += 1
+            else:
+                self.discarded += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        Return the current metrics.
+
+        Returns:
+            Dict[str, float]: Counters, flag rate, and p50/p95/p99 and maximum
+            added latency in seconds
+        """
+        with self._lock:
+            samples = sorted(self._added_latency)
+            checks = self.checks
+            return {
+                "checks": checks,
+                "flagged": self.flagged,
+                "flag_rate": self.flagged / checks if checks else 0.0,
+                "cancelled": self.cancelled,
+                "discarded": self.discarded,
+                "errors": self.errors,
+                "added_latency_p50": _percentile(samples, 0.50),
+                "added_latency_p95": _percentile(samples, 0.95),
+                "added_latency_p99": _percentile(samples, 0.99),
+                "added_latency_max": samples[-1] if samples else 0.0,
+            }
+
+
+class GuardCheck:
+    """
+    A moderation request running in the background.
+
+    Created by ModerationGuard.start; call wait once the guarded work is
+    ready to be released.
+    """
+
+    def __init__(self, guard: "ModerationGuard", future: Future):
+        self.guard = guard
+        self.future = future
+        self._verdict: Optional[Verdict] = None
+        self._rejected = False
+
+    def done(self) -> bool:
+        """Whether the verdict has arrived."""
+        return self.future.done()
+
+    def wait(self, cancelled: bool = False) -> Verdict:
+        """
+        Wait for the verdict, recording how long the caller was held up.
+
+        Args:
+            cancelled (bool): Whether the guarded work is abandoned unfinished
+                if the input is flagged, rather than discarded once complete
+
+        Returns:
+            Verdict: The verdict of a clean input
+
+        Raises:
+            FlaggedInputError: If the input was flagged
+            OpenAIError: If moderation failed and the guard fails closed
+        """
+        if self._verdict is None:
+            waiting = time.perf_counter()
+            try:
+                verdict = self.future.result()
+            except Exception as e:  # pylint: disable=broad-except
+                self.guard.metrics.record(None, time.perf_counter() - waiting)
+                verdict = self.guard.on_error(e)
+            else:
+                self.guard.metrics.record(verdict, time.perf_counter() - waiting)
+            self._verdict = verdict
+        if self._verdict.flagged:
+            if not self._rejected:
+                self.guard.metrics.record_rejection(cancelled)
+                self._rejected = True
+            raise FlaggedInputError(self._verdict.categories)
+        return self._verdict
+
+
+class ModerationGuard:
+    """
+    Runs the moderation check of a request concurrently with its completion.
+
+    Args:
+        model (str): Moderation model to use
+        fail_open (bool): Let requests through when the moderation call fails
+        metrics (Optional[GuardMetrics]): Metrics to update, a new set by default
+        client (Optional[OpenAI]): Client for blocking checks, defaults to the
+            shared client
+        max_workers (int): Moderation requests in flight for blocking checks
+    """
+
+    def __init__(
+        self,
+        model: str = MODEL,
+        fail_open: bool = False,
+        metrics: Optional[GuardMetrics] = None,
+        client: Optional[OpenAI] = None,
+        max_workers: int = MAX_WORKERS,
+    ):
+        self.model = model
+        self.fail_open = fail_open
+        self.metrics = metrics or GuardMetrics()
+        self.client = client
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def check(self, text: str) -> Verdict:
+        """
+        Moderate one input, blocking until the verdict arrives.
+
+        Args:
+            text (str): Input to moderate
+
+        Returns:
+            Verdict: Whether and why the input was flagged
+
+        Raises:
+            OpenAIError: If API call fails
+        """
+        client = self.client or get_client()
+        create = client.with_options(max_retries=0).moderations.with_raw_response
+        response = moderation_limiter.call(create.create, model=self.model, input=text)
+        return _verdict(response)
+
+    async def check_async(
+        self, text: str, client: Optional[AsyncOpenAI] = None
+    ) -> Verdict:
+        """Asynchronous variant of check."""
+        client = client or get_async_client()
+        create = client.with_options(max_retries=0).moderations.with_raw_response
+        response = await moderation_limiter.call_async(
+            create.create, model=self.model, input=text
+        )
+        return _verdict(response)
+
+    def on_error(self, error: BaseException) -> Verdict:
+        """
+        Decide what to do when the moderation call itself fails.
+
+        Args:
+            error (BaseException): Error raised by the moderation call
+
+        Returns:
+            Verdict: A clean verdict when the guard fails open
+
+        Raises:
+            OpenAIError: If the guard fails closed
+        """
+        if not self.fail_open:
+            raise OpenAIError(f"Moderation check failed: {str(error)}") from error
+        return Verdict(False)
+
+    def start(self, text: str) -> GuardCheck:
+        """
+        Send the moderation request in the background.
+
+        Args:
+            text (str): Input to moderate
+
+        Returns:
+            GuardCheck: Handle to wait on before releasing the output
+        """
+        return GuardCheck(self, self.executor.submit(self.check, text))
+
+    def run(self, text: str, call: Callable[[], T]) -> T:
+        """
+        Run a blocking call while its input is moderated.
+
+        The result of a flagged call is discarded.
+
+        Args:
+            text (str): Input to moderate
+            call (Callable[[], T]): Produces the completion
+
+        Returns:
+            T: Result of call, once the input is known to be clean
+
+        Raises:
+            FlaggedInputError: If the input was flagged
+            OpenAIError: If moderation failed and the guard fails closed
+        """
+        check = self.start(text)
+        try:
+            result = call()
+        except BaseException:
+            check.future.cancel()
+            raise
+        check.wait()
+        return result
+
+    def stream(self, text: str, deltas: Iterator[str]) -> Iterator[str]:
+        """
+        Hold back a stream of deltas until its input is known to be clean.
+
+        Deltas arriving before the verdict are buffered; when the input is
+        flagged, the underlying stream is closed so generation stops.
+
+        Args:
+            text (str): Input to moderate
+            deltas (Iterator[str]): Content deltas, e.g. iter(ChatStream(...))
+
+        Yields:
+            str: The deltas, unchanged
+
+        Raises:
+            FlaggedInputError: If the input was flagged
+            OpenAIError: If moderation failed and the guard fails closed
+        """
+        check = self.start(text)
+        buffered: Optional[List[str]] = []
+        released = False
+        try:
+            for delta in deltas:
+                if buffered is not None and check.done():
+                    check.wait(cancelled=True)
+                    yield from buffered
+                    buffered = None
+                if buffered is None:
+                    yield delta
+                else:
+                    buffered.append(delta)
+            if buffered is not None:
+                check.wait()
+                yield from buffered
+            released = True
+        finally:
+            if not released:
+                check.future.cancel()
+                if hasattr(deltas, "close"):
+                    deltas.close()
+
+    async def run_async(self, text: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await a completion while its input is moderated.
+
+        A completion still running when the input is flagged is cancelled.
+
+        Args:
+            text (str): Input to moderate
+            call (Callable[[], Awaitable[T]]): Produces the completion
+
+        Returns:
+            T: Result of call, once the input is known to be clean
+
+        Raises:
+            FlaggedInputError: If the input was flagged
+            OpenAIError: If moderation failed and the guard fails closed
+        """
+        moderation = asyncio.ensure_future(self.check_async(text))
+        completion = asyncio.ensure_future(call())
+        try:
+            await asyncio.wait(
+                {moderation, completion}, return_when=asyncio.FIRST_COMPLETED
+            )
+            waiting = time.perf_counter()
+            try:
+                verdict = await moderation
+            except Exception as e:  # pylint: disable=broad-except
+                self.metrics.record(None, self._added(completion, waiting))
+                verdict = self.on_error(e)
+            else:
+                self.metrics.record(verdict, self._added(completion, waiting))
+            if verdict.flagged:
+                self.metrics.record_rejection(cancelled=not completion.done())
+                raise FlaggedInputError(verdict.categories)
+            return await completion
+        finally:
+            for task in (moderation, completion):
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _added(completion: "asyncio.Future", waiting: float) -> float:
+        # Only time spent waiting on moderation after the completion was ready
+        return time.perf_counter() - waiting if completion.done() else 0.0
+
+    async def stream_async(
+        self, text: str, deltas: AsyncIterator[str]
+    ) -> AsyncIterator[str]:
+        """Asynchronous variant of stream, e.g. over an AsyncChatStream."""
+        moderation = asyncio.ensure_future(self.check_async(text))
+        iterator = deltas.__aiter__()
+        buffered: Optional[List[str]] = []
+        released = False
+        try:
+            async for delta in iterator:
+                if buffered is not None and moderation.done():
+                    await self._release_async(moderation, False)
+                    for held in buffered:
+                        yield held
+                    buffered = None
+                if buffered is None:
+                    yield delta
+                else:
+                    buffered.append(delta)
+            if buffered is not None:
+                await self._release_async(moderation, True)
+                for held in buffered:
+                    yield held
+            released = True
+        finally:
+            if not moderation.done():
+                moderation.cancel()
+            if not released and hasattr(iterator, "aclose"):
+                await iterator.aclose()
+
+    async def _release_async(self, moderation: "asyncio.Future", stream_done: bool):
+        waiting = time.perf_counter()
+        try:
+            verdict = await moderation
+        except Exception as e:  # pylint: disable=broad-except
+            self.metrics.record(None, time.perf_counter() - waiting)
+            verdict = self.on_error(e)
+        else:
+            self.metrics.record(verdict, time.perf_counter() - waiting)
+        if verdict.flagged:
+            self.metrics.record_rejection(cancelled=not stream_done)
+            raise FlaggedInputError(verdict.categories)
+
+
+_default_guard: Optional[ModerationGuard] = None
+_default_guard_lock = threading.Lock()
+
+
+def get_default_guard() -> ModerationGuard:
+    """Return the guard shared by the example scripts."""
+    global _default_guard  # pylint: disable=global-statement
+    with _default_guard_lock:
+        if _default_guard is None:
+            _default_guard = ModerationGuard()
+        return _default_guard
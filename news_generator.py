@@ -12,35 +12,80 @@ Features:
     - Generates news articles based on given facts
     - Customizable tone and style
     - Error handling and rate limiting
+    - Optional on-disk response cache (set OPENAI_RESPONSE_CACHE)
+    - Streaming article drafts with latency instrumentation
+    - Reply length budgeted in tokens from the target word count
+    - Optional moderation guard screening the facts in parallel with
+      generation
+    - Many articles generated concurrently, returned as they finish, with
+      the static role in a shared system message for provider prompt caching
     - Type-safe interfaces
 
 Example:
     $ export OPENAI_API_KEY='your-api-key'
     $ python news_generator.py
+
+    from news_generator import ArticleSpec, assist_journalist_many_async
+
+    specs = [ArticleSpec(facts, tone, 300, "formal") for tone in tones]
+    async for result in assist_journalist_many_async(specs):
+        print(result.index, result.article or result.error)
 """
 
-import os
+import asyncio
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, List, Dict, Iterable, Optional
+from openai import AsyncOpenAI, OpenAIError
+from moderation_guard import ModerationGuard, get_default_guard
+from openai_client import close_async_client, get_async_client, get_client
+from response_cache import cached_chat_completion, cached_chat_completion_async
+from streaming import ChatStream
+from token_budget import fit_max_tokens, max_tokens_for_words, usage
 
-from typing import List, Dict
-from openai import OpenAI, OpenAIError
+# Sent unchanged as the system message of every request, so the provider
+# can reuse its cached prefix across articles
+PROMPT_ROLE = (
+    "You are an assistant for journalists. Your task is to write articles, "
+    "based on the FACTS that are given to you.\n"
+    "You should respect the instructions: the TONE, LENGTH and STYLE."
+)
+MAX_CONCURRENCY = 16
 
-# Initialize OpenAI client
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
 
-PROMPT_ROLE = """
-You are an assistant for journalists. Your task is to write articles, based on the FACTS that are given to you. 
-You should respect the instructions: the TONE, LENGTH and STYLE.
-"""
+@dataclass
+class ArticleSpec:
+    """Facts and style preferences of one article."""
+
+    facts: List[str]
+    tone: str
+    length_words: int
+    style: str
+
 
+@dataclass
+class ArticleResult:
+    """Outcome of one article of a batch; index is the spec's position."""
 
-def ask_chatgpt(messages: List[Dict[str, str]], model: str = "gpt-4") -> str:
+    index: int
+    spec: ArticleSpec
+    article: Optional[str] = None
+    error: Optional[str] = None
+
+
+def ask_chatgpt(
+    messages: List[Dict[str, str]],
+    model: str = "gpt-4",
+    bypass_cache: bool = False,
+    max_tokens: Optional[int] = None,
+) -> str:
     """
     Send a request to ChatGPT and get the response.
 
     Args:
         messages (List[Dict[str, str]]): List of message dictionaries for the conversation
         model (str): OpenAI model to use
+        bypass_cache (bool): Always request a fresh completion
+        max_tokens (Optional[int]): Most tokens the reply may use
 
     Returns:
         str: The response content from ChatGPT
@@ -49,78 +94,348 @@ def ask_chatgpt(messages: List[Dict[str, str]], model: str = "gpt-4") -> str:
         OpenAIError: If API call fails
         ValueError: If API key is not set
     """
-    if not client.api_key:
-        raise ValueError("OpenAI API key not found in environment variables")
+    client = get_client()
+    limits = {"max_tokens": max_tokens} if max_tokens else {}
 
     try:
-        response = client.chat.completions.create(
+        response = cached_chat_completion(
+            client,
+            bypass=bypass_cache,
             model=model,
             messages=messages,
+            **limits,
         )
         return response.choices[0].message.content
     except OpenAIError as e:
         raise OpenAIError(f"Failed to get response from ChatGPT: {str(e)}") from e
 
 
+def ask_chatgpt_stream(
+    messages: List[Dict[str, str]],
+    model: str = "gpt-4",
+    max_tokens: Optional[int] = None,
+) -> ChatStream:
+    """
+    Stream a response from ChatGPT as it is generated.
+
+    Args:
+        messages (List[Dict[str, str]]): List of message dictionaries for the conversation
+        model (str): OpenAI model to use
+        max_tokens (Optional[int]): Most tokens the reply may use
+
+    Returns:
+        ChatStream: Iterator over content deltas; holds the full text and timing
+        statistics once consumed
+
+    Raises:
+        ValueError: If API key is not set
+    """
+    limits = {"max_tokens": max_tokens} if max_tokens else {}
+    return ChatStream(get_client(), model=model, messages=messages, **limits)
+
+
+def build_prompt(facts: List[str], tone: str, length_words: int, style: str) -> str:
+    """
+    Build the article instructions, sent after PROMPT_ROLE as the user message.
+
+    Args:
+        facts (List[str]): List of factual statements to include
+        tone (str): Desired tone of the article
+        length_words (int): Target word count
+        style (str): Writing style to use
+
+    Returns:
+        str: Prompt for the model
+
+    Raises:
+        ValueError: If input parameters are invalid
+    """
+    if not facts:
+        raise ValueError("At least one fact must be provided")
+    if length_words <= 0:
+        raise ValueError("Length must be a positive number")
+
+    facts_str = ", ".join(facts)
+    return (
+        f"FACTS: {facts_str}\n"
+        f"TONE: {tone}\n"
+        f"LENGTH: {length_words}\n"
+        f"STYLE: {style}"
+    )
+
+
+def build_messages(
+    facts: List[str], tone: str, length_words: int, style: str
+) -> List[Dict[str, str]]:
+    """
+    Build the article request: PROMPT_ROLE as the system message and the
+    article's instructions as the user message.
+
+    Args:
+        facts (List[str]): List of factual statements to include
+        tone (str): Desired tone of the article
+        length_words (int): Target word count
+        style (str): Writing style to use
+
+    Returns:
+        List[Dict[str, str]]: Chat messages
+
+    Raises:
+        ValueError: If input parameters are invalid
+    """
+    return [
+        {"role": "system", "content": PROMPT_ROLE},
+        {"role": "user", "content": build_prompt(facts, tone, length_words, style)},
+    ]
+
+
 def assist_journalist(
     facts: List[str],
     tone: str,
     length_words: int,
     style: str,
     model: str = "gpt-4",
+    guard: Optional[ModerationGuard] = None,
 ) -> str:
     """
     Generate a news article based on provided facts and style preferences.
 
+    max_tokens is derived from length_words, with headroom so the article
+    is not cut short.
+
     Args:
         facts (List[str]): List of factual statements to include
         tone (str): Desired tone of the article (e.g., "informative", "casual")
         length_words (int): Target word count
         style (str): Writing style to use (e.g., "formal", "conversational")
         model (str): OpenAI model to use
+        guard (Optional[ModerationGuard]): Moderates the prompt while the
+            article is generated
 
     Returns:
         str: Generated news article
 
     Raises:
         ValueError: If input parameters are invalid
+        ContextOverflowError: If the prompt leaves no room for the article
+        FlaggedInputError: If the guard flags the prompt
         OpenAIError: If API call fails
     """
-    if not facts:
-        raise ValueError("At least one fact must be provided")
-    if length_words <= 0:
-        raise ValueError("Length must be a positive number")
+    messages = build_messages(facts, tone, length_words, style)
+    max_tokens = fit_max_tokens(messages, model, max_tokens_for_words(length_words))
 
     try:
-        facts_str = ", ".join(facts)
-        prompt = f"{PROMPT_ROLE} \
-         FACTS: {facts_str} \
-         TONE: {tone} \
-         LENGTH: {length_words} \
-         STYLE: {style} \
-        "
-
-        return ask_chatgpt([{"role": "user", "content": prompt}], model)
+        if guard is not None:
+            return guard.run(
+                messages[-1]["content"],
+                lambda: ask_chatgpt(messages, model, max_tokens=max_tokens),
+            )
+        return ask_chatgpt(messages, model, max_tokens=max_tokens)
     except (ValueError, OpenAIError):
         raise
     except Exception as e:
         raise RuntimeError(f"Failed to generate article: {str(e)}") from e
 
 
+async def ask_chatgpt_async(
+    messages: List[Dict[str, str]],
+    model: str = "gpt-4",
+    bypass_cache: bool = False,
+    max_tokens: Optional[int] = None,
+    client: Optional[AsyncOpenAI] = None,
+) -> str:
+    """
+    Asynchronous variant of ask_chatgpt.
+
+    Args:
+        messages (List[Dict[str, str]]): List of message dictionaries for the conversation
+        model (str): OpenAI model to use
+        bypass_cache (bool): Always request a fresh completion
+        max_tokens (Optional[int]): Most tokens the reply may use
+        client (Optional[AsyncOpenAI]): Client to use, defaults to the shared client
+
+    Returns:
+        str: The response content from ChatGPT
+
+    Raises:
+        OpenAIError: If API call fails
+    """
+    limits = {"max_tokens": max_tokens} if max_tokens else {}
+
+    try:
+        response = await cached_chat_completion_async(
+            client or get_async_client(),
+            bypass=bypass_cache,
+            model=model,
+            messages=messages,
+            **limits,
+        )
+        return response.choices[0].message.content
+    except OpenAIError as e:
+        raise OpenAIError(f"Failed to get response from ChatGPT: {str(e)}") from e
+
+
+async def assist_journalist_async(
+    spec: ArticleSpec,
+    model: str = "gpt-4",
+    guard: Optional[ModerationGuard] = None,
+    bypass_cache: bool = False,
+    client: Optional[AsyncOpenAI] = None,
+) -> str:
+    """
+    Asynchronous variant of assist_journalist for one article spec.
+
+    Args:
+        spec (ArticleSpec): Facts and style preferences of the article
+        model (str): OpenAI model to use
+        guard (Optional[ModerationGuard]): Moderates the prompt while the
+            article is generated
+        bypass_cache (bool): Always request a fresh article
+        client (Optional[AsyncOpenAI]): Client to use, defaults to the shared client
+
+    Returns:
+        str: Generated news article
+
+    Raises:
+        ValueError: If input parameters are invalid
+        ContextOverflowError: If the prompt leaves no room for the article
+        FlaggedInputError: If the guard flags the prompt
+        OpenAIError: If API call fails
+    """
+    messages = build_messages(spec.facts, spec.tone, spec.length_words, spec.style)
+    max_tokens = fit_max_tokens(
+        messages, model, max_tokens_for_words(spec.length_words)
+    )
+
+    def call() -> Awaitable[str]:
+        return ask_chatgpt_async(messages, model, bypass_cache, max_tokens, client)
+
+    if guard is not None:
+        return await guard.run_async(messages[-1]["content"], call)
+    return await call()
+
+
+async def assist_journalist_many_async(
+    specs: Iterable[ArticleSpec],
+    model: str = "gpt-4",
+    max_concurrency: int = MAX_CONCURRENCY,
+    guard: Optional[ModerationGuard] = None,
+    bypass_cache: bool = False,
+    client: Optional[AsyncOpenAI] = None,
+) -> AsyncIterator[ArticleResult]:
+    """
+    Generate many articles concurrently, yielding each as soon as it is done.
+
+    Every request shares the same PROMPT_ROLE system message, so the
+    provider can serve that prefix from its prompt cache. A failed article
+    is reported in its result instead of stopping the others. Articles
+    still running when the iteration is abandoned are cancelled.
+
+    Args:
+        specs (Iterable[ArticleSpec]): Articles to write
+        model (str): OpenAI model to use
+        max_concurrency (int): Maximum number of articles in flight
+        guard (Optional[ModerationGuard]): Moderates every prompt while its
+            article is generated
+        bypass_cache (bool): Always request fresh articles, e.g. to sample
+            several variants of the same spec
+        client (Optional[AsyncOpenAI]): Client to use, defaults to the shared client
+
+    Yields:
+        ArticleResult: One per spec, in completion order
+
+    Raises:
+        ValueError: If max_concurrency is not positive
+    """
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be a positive number")
+    semaphore = asyncio.Semaphore(max_concurrency)
+    client = client or get_async_client()
+
+    async def write(index: int, spec: ArticleSpec) -> ArticleResult:
+        async with semaphore:
+            try:
+                article = await assist_journalist_async(
+                    spec, model, guard, bypass_cache, client
+                )
+            except (ValueError, OpenAIError) as e:
+                return ArticleResult(index, spec, error=str(e))
+        return ArticleResult(index, spec, article)
+
+    tasks = [
+        asyncio.ensure_future(write(index, spec)) for index, spec in enumerate(specs)
+    ]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def assist_journalist_many(
+    specs: Iterable[ArticleSpec],
+    model: str = "gpt-4",
+    max_concurrency: int = MAX_CONCURRENCY,
+    guard: Optional[ModerationGuard] = None,
+    bypass_cache: bool = False,
+) -> List[ArticleResult]:
+    """
+    Synchronous wrapper around assist_journalist_many_async.
+
+    Args:
+        specs (Iterable[ArticleSpec]): Articles to write
+        model (str): OpenAI model to use
+        max_concurrency (int): Maximum number of articles in flight
+        guard (Optional[ModerationGuard]): Moderates every prompt while its
+            article is generated
+        bypass_cache (bool): Always request fresh articles
+
+    Returns:
+        List[ArticleResult]: One per spec, in spec order
+
+    Raises:
+        ValueError: If max_concurrency is not positive
+    """
+
+    async def run() -> List[ArticleResult]:
+        try:
+            return [
+                result
+                async for result in assist_journalist_many_async(
+                    specs, model, max_concurrency, guard, bypass_cache
+                )
+            ]
+        finally:
+            await close_async_client()
+
+    return sorted(asyncio.run(run()), key=lambda result: result.index)
+
+
 def main():
-    """Main function to demonstrate article generation."""
+    """Main function to demonstrate streamed article generation."""
     try:
-        article = assist_journalist(
+        length_words = 100
+        messages = build_messages(
             facts=[
                 "Mindfulness is easy",
-                "Mindfulness helps with stress, anxiety & depression"
+                "Mindfulness helps with stress, anxiety & depression",
             ],
             tone="informative",
-            length_words=100,
+            length_words=length_words,
             style="formal",
         )
         print("\nGenerated Article:")
-        print(article)
+        guard = get_default_guard()
+        max_tokens = fit_max_tokens(
+            messages, max_tokens=max_tokens_for_words(length_words)
+        )
+        stream = ask_chatgpt_stream(messages, max_tokens=max_tokens)
+        for delta in guard.stream(messages[-1]["content"], iter(stream)):
+            print(delta, end="", flush=True)
+        print(f"\n\n[{stream.stats}]")
+        print(f"[moderation {guard.metrics.snapshot()}]")
+        print(f"[usage {usage.snapshot()}]")
 
     except (ValueError, OpenAIError, RuntimeError) as e:
         print(f"Error: {str(e)}")
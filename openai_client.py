@@ -0,0 +1,183 @@
+"""
+Shared OpenAI Clients
+
+This module hands out one lazily created OpenAI client per process and one
+AsyncOpenAI client per event loop, so every feature reuses the same warm
+connection pool instead of building its own client at import time.
+
+Dependencies:
+    - openai: The official OpenAI Python client library
+    - httpx: HTTP transport with connection pooling
+    - h2 (optional): Enables HTTP/2 when installed
+    - Environment variable OPENAI_API_KEY must be set
+    - Environment variable OPENAI_BASE_URL optionally points at another server
+
+Features:
+    - Nothing is created or connected until the first call
+    - Tuned connection limits and keep-alive shared by all modules
+    - HTTP/2 multiplexing when the h2 package is available
+    - Configurable timeouts, base URL and pool size
+
+Example:
+    from openai_client import configure, get_client
+
+    configure(timeout=30.0, max_connections=50)
+    response = get_client().chat.completions.create(model="gpt-4o", messages=messages)
+"""
+
+import asyncio
+import importlib.util
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+DEFAULT_TIMEOUT = 60.0
+CONNECT_TIMEOUT = 5.0
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30.0
+
+_config: Dict[str, Any] = {
+    "api_key": None,
+    "base_url": None,
+    "timeout": DEFAULT_TIMEOUT,
+    "connect_timeout": CONNECT_TIMEOUT,
+    "max_connections": MAX_CONNECTIONS,
+    "max_keepalive_connections": MAX_KEEPALIVE_CONNECTIONS,
+    "http2": None,
+}
+_client: Optional[OpenAI] = None
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = (
+    weakref.WeakKeyDictionary()
+)
+_lock = threading.Lock()
+
+
+def configure(**settings):
+    """
+    Change how clients are created; existing clients are replaced on next use.
+
+    Replaced async clients are closed on their own event loop: scheduled
+    there when the loop is running, run to completion when it is idle. A
+    client whose loop has already closed can no longer be closed cleanly, so
+    callers should await close_async_client before their loop ends.
+
+    Args:
+        **settings: Any of api_key, base_url, timeout, connect_timeout,
+            max_connections, max_keepalive_connections and http2
+    """
+    global _client  # pylint: disable=global-statement
+    unknown = set(settings) - set(_config)
+    if unknown:
+        raise ValueError(f"Unknown client settings: {', '.join(sorted(unknown))}")
+    with _lock:
+        _config.update(settings)
+        if _client is not None:
+            _client.close()
+        _client = None
+        async_clients = list(_async_clients.items())
+        _async_clients.clear()
+    for loop, client in async_clients:
+        _close_on_loop(loop, client)
+
+
+def _close_on_loop(loop: asyncio.AbstractEventLoop, client: AsyncOpenAI):
+    # Pooled connections belong to the loop that opened them, close them there
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.close(), loop)
+        return
+    if loop.is_closed():
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        loop.run_until_complete(client.close())
+    else:
+        # Another loop runs in this thread, so the idle one cannot be run here
+        loop.call_soon(lambda: loop.create_task(client.close()))
+
+
+def _client_options() -> Dict[str, Any]:
+    api_key = _config["api_key"] or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OpenAI API key not found in environment variables")
+    return {
+        "api_key": api_key,
+        "base_url": _config["base_url"] or os.getenv("OPENAI_BASE_URL"),
+    }
+
+
+def _transport_options() -> Dict[str, Any]:
+    http2 = _config["http2"]
+    if http2 is None:
+        http2 = importlib.util.find_spec("h2") is not None
+    return {
+        "http2": http2,
+        "timeout": httpx.Timeout(
+            _config["timeout"], connect=_config["connect_timeout"]
+        ),
+        "limits": httpx.Limits(
+            max_connections=_config["max_connections"],
+            max_keepalive_connections=_config["max_keepalive_connections"],
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        "follow_redirects": True,
+    }
+
+
+def get_client() -> OpenAI:
+    """
+    Get the shared synchronous client, creating it on first use.
+
+    Returns:
+        OpenAI: Client shared by every module of the process
+
+    Raises:
+        ValueError: If no API key is configured
+    """
+    global _client  # pylint: disable=global-statement
+    with _lock:
+        if _client is None:
+            options = _client_options()
+            _client = OpenAI(
+                **options, http_client=httpx.Client(**_transport_options())
+            )
+        return _client
+
+
+def get_async_client() -> AsyncOpenAI:
+    """
+    Get the asynchronous client of the running event loop.
+
+    Pooled connections belong to the loop that opened them, so every loop
+    gets its own client.
+
+    Returns:
+        AsyncOpenAI: Client shared by every coroutine of the running loop
+
+    Raises:
+        ValueError: If no API key is configured
+        RuntimeError: If called outside a running event loop
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            options = _client_options()
+            client = AsyncOpenAI(
+                **options, http_client=httpx.AsyncClient(**_transport_options())
+            )
+            _async_clients[loop] = client
+        return client
+
+
+async def close_async_client():
+    """Close the client of the running event loop, e.g. before it shuts down."""
+    with _lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
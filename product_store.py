@@ -0,0 +1,262 @@
+"""
+Product Catalogue Store
+
+This module backs the find_product tool with an embedded SQLite catalogue,
+so the tool-calling example runs real queries against realistic data
+instead of returning hard-coded rows.
+
+Dependencies:
+    - Python standard library only
+
+Features:
+    - Synthetic catalogue generation up to millions of rows
+    - Indexes on name, color and price
+    - Pool of read-only connections shared across threads
+    - Model-written SQL restricted to SELECT statements, time-limited and
+      capped in result size before it is sent back to the model
+    - Parameterized structured search
+
+Example:
+    $ python product_store.py --rows 1000000 --queries 1000
+
+    from product_store import ProductStore
+
+    store = ProductStore("products.sqlite")
+    rows = store.query("SELECT * FROM products WHERE price < ?", (1.0,))
+"""
+
+import argparse
+import os
+import queue
+import random
+import sqlite3
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+DEFAULT_PATH = "products.sqlite"
+DEFAULT_ROWS = 10000
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_MAX_ROWS = 50
+
+# Number of SQLite virtual machine steps between timeout checks
+PROGRESS_STEPS = 10000
+
+PRODUCT_NAMES = [
+    "pen", "pencil", "marker", "notebook", "stapler", "eraser", "ruler",
+    "highlighter", "folder", "scissors", "tape", "envelope", "binder", "calculator",
+]  # fmt: skip
+PRODUCT_COLORS = [
+    "blue", "black", "white", "red", "green", "yellow", "orange", "purple",
+    "pink", "grey", "brown", "silver",
+]  # fmt: skip
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS products_name_price ON products (name, price);
+CREATE INDEX IF NOT EXISTS products_color_price ON products (color, price);
+CREATE INDEX IF NOT EXISTS products_price ON products (price);
+"""
+
+_ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION}
+
+
+def create_catalogue(path: str = DEFAULT_PATH, rows: int = DEFAULT_ROWS, seed: int = 0):
+    """
+    Create a synthetic product catalogue.
+
+    Args:
+        path (str): SQLite database file; an existing catalogue is replaced
+        rows (int): Number of products to generate
+        seed (int): Random seed for reproducible catalogues
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+            "color TEXT NOT NULL, price REAL NOT NULL)"
+        )
+        conn.executemany(
+            "INSERT INTO products (name, color, price) VALUES (?, ?, ?)",
+            (
+                (
+                    rng.choice(PRODUCT_NAMES),
+                    rng.choice(PRODUCT_COLORS),
+                    round(rng.uniform(0.1, 100.0), 2),
+                )
+                for _ in range(rows)
+            ),
+        )
+        # Indexes are cheaper to build once after the bulk insert
+        conn.executescript(INDEXES)
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _authorizer(action: int, *_args) -> int:
+    return sqlite3.SQLITE_OK if action in _ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+
+class ProductStore:
+    """
+    Read-only, pooled access to a product catalogue.
+
+    Args:
+        path (str): SQLite database file
+        pool_size (int): Number of read-only connections
+        timeout (float): Seconds a query may run before it is interrupted
+        max_rows (int): Maximum number of rows returned by a query
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_rows: int = DEFAULT_MAX_ROWS,
+    ):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Product catalogue not found: {path}")
+        self.path = path
+        self.timeout = timeout
+        self.max_rows = max_rows
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only=ON")
+        conn.set_authorizer(_authorizer)
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            conn.set_progress_handler(None, 0)
+            self._pool.put(conn)
+
+    def query(self, sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+        """
+        Run a single read-only SELECT statement.
+
+        Args:
+            sql (str): SELECT statement, with ? placeholders for params
+            params (Sequence[Any]): Values bound to the placeholders
+
+        Returns:
+            List[Dict[str, Any]]: At most max_rows result rows
+
+        Raises:
+            ValueError: If the statement is not allowed, invalid or too slow
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._connection() as conn:
+            conn.set_progress_handler(
+                lambda: int(time.monotonic() > deadline), PROGRESS_STEPS
+            )
+            try:
+                cursor = conn.execute(sql, params)
+                rows = cursor.fetchmany(self.max_rows)
+            except sqlite3.DatabaseError as e:
+                if time.monotonic() > deadline:
+                    raise ValueError(
+                        f"Query exceeded the {self.timeout} second time limit"
+                    ) from e
+                raise ValueError(f"Invalid product query: {str(e)}") from e
+            except sqlite3.Warning as e:
+                raise ValueError(f"Invalid product query: {str(e)}") from e
+        return [dict(row) for row in rows]
+
+    def find_products(
+        self,
+        name: Optional[str] = None,
+        color: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search products by exact name and color and by price range.
+
+        Args:
+            name (Optional[str]): Product name
+            color (Optional[str]): Product color
+            min_price (Optional[float]): Lowest price, inclusive
+            max_price (Optional[float]): Highest price, inclusive
+            limit (Optional[int]): Maximum number of rows, capped at max_rows
+
+        Returns:
+            List[Dict[str, Any]]: Matching products, cheapest first
+        """
+        clauses = []
+        params: List[Any] = []
+        for clause, value in (
+            ("name = ?", name),
+            ("color = ?", color),
+            ("price >= ?", min_price),
+            ("price <= ?", max_price),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(min(limit or self.max_rows, self.max_rows))
+        return self.query(
+            f"SELECT name, color, price FROM products {where} ORDER BY price LIMIT ?",
+            params,
+        )
+
+    def close(self):
+        """Close every pooled connection."""
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+def main():
+    """Build a catalogue and measure query latency against it."""
+    parser = argparse.ArgumentParser(description="Product catalogue benchmark")
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    create_catalogue(args.path, args.rows)
+    print(f"Built {args.rows} products in {time.perf_counter() - started:.1f}s")
+
+    store = ProductStore(args.path)
+    rng = random.Random(1)
+    latencies = []
+    for _ in range(args.queries):
+        sql = (
+            "SELECT name, color, price FROM products "
+            "WHERE name = ? AND price < ? ORDER BY price LIMIT 2"
+        )
+        params = (rng.choice(PRODUCT_NAMES), rng.uniform(1, 100))
+        started = time.perf_counter()
+        store.query(sql, params)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"p50 {statistics.median(latencies):.3f}ms, p95 {p95:.3f}ms")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""
+Adaptive Rate Limiting for the OpenAI API
+
+This module provides a token-bucket rate limiter shared by all example
+scripts. It paces requests to stay under the account's requests-per-minute
+and tokens-per-minute limits, learns the real limits from the API's
+rate-limit response headers, and retries failed calls with jittered
+exponential backoff that honors Retry-After.
+
+Dependencies:
+    - openai: The official OpenAI Python client library
+
+Features:
+    - Token buckets for requests per minute and tokens per minute
+    - Limits synchronized from x-ratelimit-* response headers
+    - Jittered exponential backoff honoring Retry-After
+    - Sync and asyncio interfaces sharing one limiter
+    - Prompt tokens counted with the model's tokenizer, and the usage of
+      every chat completion recorded in token_budget.usage
+
+Example:
+    from openai_client import get_client
+    from rate_limiter import create_chat_completion
+
+    response = create_chat_completion(
+        get_client(), model="gpt-4", messages=[{"role": "user", "content": "Hi"}]
+    )
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional
+
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    OpenAI,
+    RateLimitError,
+)
+
+from token_budget import DEFAULT_MODEL, estimate_message_tokens, usage
+
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 30000
+DEFAULT_MAX_TOKENS_ESTIMATE = 512
+MAX_POLL_INTERVAL = 1.0
+
+RETRYABLE_ERRORS = (
+    RateLimitError,
+    APIConnectionError,
+    APITimeoutError,
+    InternalServerError,
+)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """
+    Parse a rate-limit reset duration such as "6m0s", "1.5s" or "20ms".
+
+    Args:
+        value (str): Duration string from an x-ratelimit-reset-* header
+
+    Returns:
+        Optional[float]: Duration in seconds, or None if it cannot be parsed
+    """
+    parts = _DURATION_PART.findall(value or "")
+    if not parts:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """
+    Token bucket that refills continuously up to its capacity.
+
+    The bucket itself is not locked; RateLimiter serializes access so that
+    the request and token buckets are always checked and drawn together.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.level = min(self.capacity, self.level + elapsed * self.refill_per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        Compute how long until amount is available.
+
+        Args:
+            amount (float): Capacity wanted; capped at the bucket's capacity
+
+        Returns:
+            float: Seconds to wait, 0 if the amount is available now
+        """
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.refill_per_second)
+
+    def take(self, amount: float):
+        """Consume amount, capped at the bucket's capacity."""
+        self.level -= min(amount, self.capacity)
+
+    def sync(
+        self, limit: Optional[float], remaining: Optional[float], reset: Optional[float]
+    ):
+        """
+        Align the bucket with limits reported by the server.
+
+        Args:
+            limit (Optional[float]): Capacity per minute reported by the server
+            remaining (Optional[float]): Capacity the server says is left
+            reset (Optional[float]): Seconds until the server's window is full again
+        """
+        self._refill()
+        if limit:
+            self.capacity = float(limit)
+            self.refill_per_second = float(limit) / 60.0
+        if remaining is not None:
+            # Trust the server only when it is more pessimistic than us;
+            # our own estimate already accounts for requests in flight.
+            self.level = min(self.level, float(remaining))
+            if reset and remaining <= 0:
+                self.level = min(self.level, -reset * self.refill_per_second)
+
+
+def _header_float(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Read the Retry-After delay from a failed API call.
+
+    Args:
+        error (Exception): Exception raised by the OpenAI client
+
+    Returns:
+        Optional[float]: Requested delay in seconds, or None if not provided
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    retry_after_ms = _header_float(headers, "retry-after-ms")
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000.0
+    return _header_float(headers, "retry-after")
+
+
+def estimate_prompt_tokens(request: Dict[str, Any]) -> int:
+    """
+    Estimate the prompt tokens of a chat completion request.
+
+    Args:
+        request (Dict[str, Any]): Keyword arguments of chat.completions.create
+
+    Returns:
+        int: Estimated prompt tokens
+    """
+    return estimate_message_tokens(
+        request.get("messages", []),
+        request.get("model") or DEFAULT_MODEL,
+        request.get("tools"),
+    )
+
+
+def estimate_request_tokens(
+    request: Dict[str, Any], prompt_tokens: Optional[int] = None
+) -> int:
+    """
+    Estimate the tokens a chat completion request will consume.
+
+    Args:
+        request (Dict[str, Any]): Keyword arguments of chat.completions.create
+        prompt_tokens (Optional[int]): Prompt estimate, if already computed
+
+    Returns:
+        int: Estimated prompt plus completion tokens
+    """
+    if prompt_tokens is None:
+        prompt_tokens = estimate_prompt_tokens(request)
+    max_tokens = request.get("max_tokens") or DEFAULT_MAX_TOKENS_ESTIMATE
+    return prompt_tokens + max_tokens * request.get("n", 1)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limiter with retry scheduling.
+
+    Args:
+        requests_per_minute (float): Initial request budget per minute
+        tokens_per_minute (float): Initial token budget per minute
+        max_retries (int): Retries for rate limit and transient errors
+        base_delay (float): Backoff delay before the first retry in seconds
+        max_delay (float): Upper bound of a single backoff delay in seconds
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = DEFAULT_TOKENS_PER_MINUTE,
+        max_retries: int = 6,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ):
+        self.requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0)
+        self.tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0)
+        self.lock = threading.Lock()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _try_acquire(self, tokens: int) -> float:
+        # Waits are re-checked at least every MAX_POLL_INTERVAL seconds so
+        # that limits learned from headers in the meantime take effect.
+        with self.lock:
+            delay = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+            if delay == 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+            return min(delay, MAX_POLL_INTERVAL)
+
+    def acquire(self, tokens: int = 0):
+        """Block until a request using the given tokens may be sent."""
+        while True:
+            delay = self._try_acquire(tokens)
+            if not delay:
+                return
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: int = 0):
+        """Wait without blocking the event loop until a request may be sent."""
+        while True:
+            delay = self._try_acquire(tokens)
+            if not delay:
+                return
+            await asyncio.sleep(delay)
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """
+        Adapt the buckets to the x-ratelimit-* headers of an API response.
+
+        Args:
+            headers (Mapping[str, str]): Response headers
+        """
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            reset = headers.get(f"x-ratelimit-reset-{kind}")
+            with self.lock:
+                bucket.sync(
+                    _header_float(headers, f"x-ratelimit-limit-{kind}"),
+                    _header_float(headers, f"x-ratelimit-remaining-{kind}"),
+                    parse_duration(reset) if reset else None,
+                )
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """
+        Compute the delay before a retry using full-jitter exponential backoff.
+
+        Args:
+            attempt (int): Zero-based retry attempt
+            retry_after (Optional[float]): Delay requested by the server
+
+        Returns:
+            float: Seconds to wait
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _after_failure(self, error: Exception, attempt: int) -> float:
+        response = getattr(error, "response", None)
+        if response is not None:
+            self.update_from_headers(response.headers)
+        delay = self.backoff_delay(attempt, retry_after_seconds(error))
+        print(f"{type(error).__name__}: retrying in {delay:.1f} seconds...")
+        return delay
+
+    def _unwrap(self, result: Any) -> Any:
+        # Raw responses expose the headers needed to learn the real limits
+        if hasattr(result, "headers") and hasattr(result, "parse"):
+            self.update_from_headers(result.headers)
+            return result.parse()
+        return result
+
+    def call(
+        self, func: Callable[..., Any], *args, estimated_tokens: int = 0, **kwargs
+    ) -> Any:
+        """
+        Call an API method under the rate limits, retrying transient failures.
+
+        Pass a with_raw_response method to let the limiter read the rate-limit
+        headers; the parsed response is returned either way.
+
+        Args:
+            func (Callable[..., Any]): API method to call
+            estimated_tokens (int): Tokens the call is expected to consume
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Any: The (parsed) API response
+
+        Raises:
+            OpenAIError: If the call still fails after max_retries retries
+        """
+        for attempt in range(self.max_retries + 1):
+            self.acquire(estimated_tokens)
+            try:
+                return self._unwrap(func(*args, **kwargs))
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._after_failure(e, attempt))
+        raise AssertionError("unreachable")
+
+    async def call_async(
+        self,
+        func: Callable[..., Awaitable[Any]],
+        *args,
+        estimated_tokens: int = 0,
+        **kwargs,
+    ) -> Any:
+        """
+        Asynchronous variant of call for AsyncOpenAI methods.
+
+        Args:
+            func (Callable[..., Awaitable[Any]]): Async API method to call
+            estimated_tokens (int): Tokens the call is expected to consume
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Any: The (parsed) API response
+
+        Raises:
+            OpenAIError: If the call still fails after max_retries retries
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.acquire_async(estimated_tokens)
+            try:
+                return self._unwrap(await func(*args, **kwargs))
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._after_failure(e, attempt))
+        raise AssertionError("unreachable")
+
+
+# Limiter shared by every script in the process
+default_limiter = RateLimiter()
+
+
+def create_chat_completion(
+    client: OpenAI, limiter: Optional[RateLimiter] = None, **request
+) -> Any:
+    """
+    Create a chat completion under the shared rate limiter.
+
+    The client's own retries are disabled so the limiter alone schedules them.
+    The usage reported in the response is recorded in token_budget.usage.
+
+    Args:
+        client (OpenAI): Client to send the request with
+        limiter (Optional[RateLimiter]): Limiter to use, defaults to the shared one
+        **request: Keyword arguments of chat.completions.create
+
+    Returns:
+        ChatCompletion: The parsed completion
+    """
+    limiter = limiter or default_limiter
+    create = client.with_options(
+        max_retries=0
+    ).chat.completions.with_raw_response.create
+    prompt_tokens = estimate_prompt_tokens(request)
+    response = limiter.call(
+        create,
+        estimated_tokens=estimate_request_tokens(request, prompt_tokens),
+        **request,
+    )
+    usage.record_response(response, prompt_tokens)
+    return response
+
+
+async def create_chat_completion_async(
+    client: AsyncOpenAI, limiter: Optional[RateLimiter] = None, **request
+) -> Any:
+    """
+    Asynchronous variant of create_chat_completion.
+
+    Args:
+        client (AsyncOpenAI): Client to send the request with
+        limiter (Optional[RateLimiter]): Limiter to use, defaults to the shared one
+        **request: Keyword arguments of chat.completions.create
+
+    Returns:
+        ChatCompletion: The parsed completion
+    """
+    limiter = limiter or default_limiter
+    create = client.with_options(
+        max_retries=0
+    ).chat.completions.with_raw_response.create
+    prompt_tokens = estimate_prompt_tokens(request)
+    response = await limiter.call_async(
+        create,
+        estimated_tokens=estimate_request_tokens(request, prompt_tokens),
+        **request,
+    )
+    usage.record_response(response, prompt_tokens)
+    return response
@@ -0,0 +1,302 @@
+"""
+Persistent Chat Completion Cache
+
+This module provides an opt-in, on-disk cache for chat completions backed by
+SQLite. Responses are stored under a stable hash of the request, so rerunning
+a job with the same prompts returns the stored completions in milliseconds
+instead of paying for them again.
+
+Dependencies:
+    - openai: The official OpenAI Python client library
+    - Environment variable OPENAI_RESPONSE_CACHE enables the shared cache
+
+Features:
+    - Content-addressed keys over model, messages, tools, response_format,
+      temperature and every other request parameter
+    - Time-to-live expiry and size-bounded LRU eviction
+    - Per-call bypass for non-deterministic sampling
+    - Hit and miss counters
+
+Example:
+    $ export OPENAI_RESPONSE_CACHE='.openai_cache.sqlite'
+    $ python news_generator.py
+
+    Or explicitly:
+
+    from response_cache import ResponseCache, cached_chat_completion
+
+    cache = ResponseCache("cache.sqlite", ttl=86400, max_entries=50000)
+    response = cached_chat_completion(client, cache=cache, model="gpt-4", messages=messages)
+    print(cache.stats())
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+from openai import AsyncOpenAI, OpenAI
+from openai.types.chat import ChatCompletion
+
+from rate_limiter import create_chat_completion, create_chat_completion_async
+
+CACHE_ENV_VAR = "OPENAI_RESPONSE_CACHE"
+DEFAULT_MAX_ENTRIES = 100000
+
+# Evict at most once per this many writes to keep inserts cheap
+EVICT_EVERY = 64
+
+
+def _to_jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(exclude_none=True)
+    raise TypeError(f"Cannot serialize {type(value).__name__} for the cache key")
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    """
+    Compute the stable cache key of a chat completion request.
+
+    Args:
+        request (Dict[str, Any]): Keyword arguments of chat.completions.create
+
+    Returns:
+        str: Hex SHA-256 digest of the canonical JSON form of the request
+    """
+    canonical = json.dumps(
+        request, sort_keys=True, separators=(",", ":"), default=_to_jsonable
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of chat completions with TTL and LRU eviction.
+
+    Args:
+        path (str): SQLite database file
+        ttl (Optional[float]): Seconds an entry stays valid, None keeps entries forever
+        max_entries (int): Number of entries kept before least recently used ones
+            are evicted
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be a positive number")
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._conn.commit()
+        self.evict()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached value and mark it as recently used.
+
+        Args:
+            key (str): Cache key from request_key
+
+        Returns:
+            Optional[str]: The cached value, or None on a miss or expired entry
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl is not None and row[1] + self.ttl < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return zlib.decompress(row[0]).decode("utf-8")
+
+    def set(self, key: str, value: str):
+        """
+        Store a value, evicting least recently used entries when full.
+
+        Args:
+            key (str): Cache key from request_key
+            value (str): Value to store
+        """
+        now = time.time()
+        data = zlib.compress(value.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, data, now, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+            should_evict = self._writes % EVICT_EVERY == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """Remove expired entries and trim the cache to max_entries."""
+        with self._lock:
+            if self.ttl is not None:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,)
+                )
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def get_or_create(
+        self, create: Callable[[], ChatCompletion], request: Dict[str, Any]
+    ) -> ChatCompletion:
+        """
+        Return the cached completion for a request, creating it on a miss.
+
+        Args:
+            create (Callable[[], ChatCompletion]): Sends the request to the API
+            request (Dict[str, Any]): Keyword arguments of chat.completions.create
+
+        Returns:
+            ChatCompletion: Cached or freshly created completion
+        """
+        key = request_key(request)
+        cached = self.get(key)
+        if cached is not None:
+            return ChatCompletion.model_validate_json(cached)
+        response = create()
+        self.set(key, response.model_dump_json())
+        return response
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit and miss counters and the hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        """Remove every entry and reset the counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.hits = self.misses = 0
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[ResponseCache]:
+    """
+    Get the process-wide cache configured through OPENAI_RESPONSE_CACHE.
+
+    Returns:
+        Optional[ResponseCache]: The shared cache, or None if caching is disabled
+    """
+    global _default_cache  # pylint: disable=global-statement
+    path = os.getenv(CACHE_ENV_VAR)
+    if not path:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None or _default_cache.path != path:
+            _default_cache = ResponseCache(path)
+        return _default_cache
+
+
+def cached_chat_completion(
+    client: OpenAI,
+    cache: Optional[ResponseCache] = None,
+    bypass: bool = False,
+    **request,
+) -> ChatCompletion:
+    """
+    Create a chat completion through the response cache and rate limiter.
+
+    Args:
+        client (OpenAI): Client to send the request with
+        cache (Optional[ResponseCache]): Cache to use, defaults to the shared one
+        bypass (bool): Skip the cache, e.g. when fresh samples are wanted
+        **request: Keyword arguments of chat.completions.create
+
+    Returns:
+        ChatCompletion: Cached or freshly created completion
+    """
+    cache = cache or get_default_cache()
+    if cache is None or bypass:
+        return create_chat_completion(client, **request)
+    return cache.get_or_create(
+        lambda: create_chat_completion(client, **request), request
+    )
+
+
+async def cached_chat_completion_async(
+    client: AsyncOpenAI,
+    cache: Optional[ResponseCache] = None,
+    bypass: bool = False,
+    **request,
+) -> ChatCompletion:
+    """
+    Asynchronous variant of cached_chat_completion.
+
+    Cache reads and writes are SQLite calls, so they run in a worker thread
+    instead of stalling the event loop.
+
+    Args:
+        client (AsyncOpenAI): Client to send the request with
+        cache (Optional[ResponseCache]): Cache to use, defaults to the shared one
+        bypass (bool): Skip the cache, e.g. when fresh samples are wanted
+        **request: Keyword arguments of chat.completions.create
+
+    Returns:
+        ChatCompletion: Cached or freshly created completion
+    """
+    cache = cache or get_default_cache()
+    if cache is None or bypass:
+        return await create_chat_completion_async(client, **request)
+
+    key = request_key(request)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        return ChatCompletion.model_validate_json(cached)
+    response = await create_chat_completion_async(client, **request)
+    await asyncio.to_thread(cache.set, key, response.model_dump_json())
+    return response
@@ -11,28 +11,60 @@ Dependencies:
 
 Features:
     - Handle different response formats (JSON, text)
-    - Parse and validate structured responses
+    - Parse and validate structured responses into pydantic models
     - Error handling for malformed responses
-    - Support for custom response schemas
+    - Support for custom response schemas in strict json_schema mode
+    - Stream list items as soon as each one is complete
 
 Example:
     $ export OPENAI_API_KEY='your-api-key'
     $ python response_format.py
 """
 
-import os
-from openai import OpenAI
-
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
+from typing import List, Optional
+from pydantic import BaseModel
+from openai import OpenAIError
+from openai_client import get_client
+from structured_output import SchemaValidationError, parse_structured, stream_structured
 
 MODEL = "gpt-4o"
+STREAM = True
 messages = [
     {"role": "user", "content": "List the hierarchy of human species in JSON format."},
 ]
 
-output = client.chat.completions.create(
-    model=MODEL, messages=messages, response_format={"type": "json_object"}
-)
 
-print(output)
+class Species(BaseModel):
+    """One species and the species it descends from."""
+
+    name: str
+    period: str
+    ancestor: Optional[str]
+
+
+class Hierarchy(BaseModel):
+    """Human species from oldest to most recent."""
+
+    species: List[Species]
+
+
+try:
+    if STREAM:
+        # Species are printed as soon as each one is complete
+        for index, species in stream_structured(
+            get_client(), Hierarchy, ("species",), model=MODEL, messages=messages
+        ):
+            print(f"{index + 1}. {species['name']} ({species['period']})")
+    else:
+        hierarchy = parse_structured(
+            get_client(), Hierarchy, model=MODEL, messages=messages
+        )
+        for species in hierarchy.species:
+            print(f"{species.name} ({species.period}) <- {species.ancestor}")
+
+except SchemaValidationError as e:
+    print(f"Invalid structured response: {str(e)}")
+except OpenAIError as e:
+    print(f"OpenAI API error occurred: {str(e)}")
+except ValueError as e:
+    print(f"Configuration error: {str(e)}")
@@ -6,25 +6,433 @@ It provides a simple interface for transcribing speech from various audio format
 
 Dependencies:
     - openai: The official OpenAI Python client library
+    - ffmpeg and ffprobe (optional): Splitting long recordings; without
+      them only files under the upload limit can be transcribed
     - Environment variable OPENAI_API_KEY must be set
 
 Features:
     - Transcribe audio files to text using OpenAI's Whisper model
     - Support for multiple audio formats (MP3, WAV, etc.)
     - Handles API authentication and error responses
+    - Long recordings split at silences, with a small overlap, into
+      segments below the upload limit
+    - Segments cut from disk by ffmpeg and transcribed concurrently
+    - Transcripts stitched back with timestamps offset to the full recording
 
 Example:
     $ export OPENAI_API_KEY='your-api-key'
     $ python speech_to_text.py
+    $ python speech_to_text.py lecture.mp3 --timestamps
+
+    from speech_to_text import transcribe
+
+    transcription = transcribe("lecture.mp3")
+    for segment in transcription.segments:
+        print(f"[{segment.start:8.1f}] {segment.text}")
 """
 
+import argparse
 import os
-from openai import OpenAI
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from openai import OpenAI, OpenAIError
+
+from openai_client import get_client
+from rate_limiter import RateLimiter
+
+MODEL = "whisper-1"
+MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+TARGET_SEGMENT_SECONDS = 300.0
+MAX_SEGMENT_SECONDS = 600.0
+OVERLAP_SECONDS = 0.25
+SILENCE_NOISE_DB = -35.0
+MIN_SILENCE_SECONDS = 0.5
+MAX_CONCURRENCY = 16
+TRANSCRIPTION_REQUESTS_PER_MINUTE = 50
+
+# Transcription is limited in requests per minute, separately from chat tokens
+transcription_limiter = RateLimiter(
+    requests_per_minute=TRANSCRIPTION_REQUESTS_PER_MINUTE
+)
+
+SILENCE_LINE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+
+
+@dataclass
+class Segment:
+    """
+    A slice of the recording to transcribe.
+
+    The segment owns [own_start, own_end) of the recording; start and end
+    extend that range by the overlap so words at a cut are heard whole.
+    Transcribed text is kept by the segment owning its midpoint. Cuts at
+    silences leave no speech in the overlap; at a forced cut, words inside
+    the overlap may appear in both neighbouring segments.
+    """
+
+    index: int
+    start: float
+    end: float
+    own_start: float
+    own_end: float
+
+
+@dataclass
+class TranscriptSegment:
+    """Transcribed text with times in seconds from the start of the recording."""
+
+    start: float
+    end: float
+    text: str
+
+
+@dataclass
+class Transcription:
+    """Transcript of a whole recording."""
+
+    text: str
+    segments: List[TranscriptSegment]
+    duration: float
+
+
+def _run(command: Sequence[str]) -> subprocess.CompletedProcess:
+    try:
+        return subprocess.run(command, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        raise ValueError(f"{command[0]} failed: {e.stderr.strip()}") from e
+
+
+def ffmpeg_available() -> bool:
+    """Whether ffmpeg and ffprobe are on the PATH."""
+    return bool(shutil.which("ffmpeg") and shutil.which("ffprobe"))
+
+
+def probe_duration(path: str) -> float:
+    """
+    Read the duration of an audio file with ffprobe.
+
+    Args:
+        path (str): Audio file
+
+    Returns:
+        float: Duration in seconds
+
+    Raises:
+        ValueError: If ffprobe cannot read the file
+    """
+    result = _run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", path]
+    )  # fmt: skip
+    return float(result.stdout.strip())
+
+
+def detect_silences(
+    path: str,
+    noise_db: float = SILENCE_NOISE_DB,
+    min_silence: float = MIN_SILENCE_SECONDS,
+) -> List[Tuple[float, float]]:
+    """
+    Find silent stretches with ffmpeg's silencedetect filter.
+
+    The filter output is parsed line by line as ffmpeg decodes the file,
+    so the audio itself is never held in memory.
+
+    Args:
+        path (str): Audio file
+        noise_db (float): Level in dB below which audio counts as silence
+        min_silence (float): Shortest silence to report, in seconds
+
+    Returns:
+        List[Tuple[float, float]]: Start and end of each silence, in seconds
+
+    Raises:
+        ValueError: If ffmpeg cannot decode the file
+    """
+    command = [
+        "ffmpeg", "-nostdin", "-hide_banner", "-i", path, "-vn",
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}",
+        "-f", "null", "-",
+    ]  # fmt: skip
+    silences: List[Tuple[float, float]] = []
+    start: Optional[float] = None
+    with subprocess.Popen(
+        command, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True
+    ) as process:
+        for line in process.stderr:
+            match = SILENCE_LINE.search(line)
+            if match is None:
+                continue
+            if match.group(1) == "start":
+                start = max(0.0, float(match.group(2)))
+            elif start is not None:
+                silences.append((start, float(match.group(2))))
+                start = None
+    if process.returncode != 0:
+        raise ValueError(f"ffmpeg could not decode {path}")
+    return silences
+
+
+def plan_segments(
+    duration: float,
+    silences: Sequence[Tuple[float, float]],
+    target_seconds: float = TARGET_SEGMENT_SECONDS,
+    max_seconds: float = MAX_SEGMENT_SECONDS,
+    overlap: float = OVERLAP_SECONDS,
+) -> List[Segment]:
+    """
+    Choose cut points, preferring silences close to the target length.
+
+    Each cut is placed in the middle of the silence nearest to target_seconds
+    after the previous cut, among silences that leave segments between half
+    the target and max_seconds long; without such a silence the audio is
+    cut at max_seconds.
+
+    Args:
+        duration (float): Length of the recording in seconds
+        silences (Sequence[Tuple[float, float]]): Output of detect_silences
+        target_seconds (float): Preferred segment length
+        max_seconds (float): Longest allowed segment, excluding overlap
+        overlap (float): Seconds added on both sides of every cut
+
+    Returns:
+        List[Segment]: Segments covering the recording in order
+
+    Raises:
+        ValueError: If the lengths are inconsistent
+    """
+    if not 0 < target_seconds <= max_seconds:
+        raise ValueError("Segment lengths must satisfy 0 < target <= max")
+    midpoints = sorted((start + end) / 2 for start, end in silences)
+    cuts = [0.0]
+    while duration - cuts[-1] > target_seconds:
+        position = cuts[-1]
+        low = position + target_seconds / 2
+        high = min(position + max_seconds, duration - target_seconds / 4)
+        candidates = [m for m in midpoints if low <= m <= high]
+        if candidates:
+            ideal = position + target_seconds
+            cuts.append(min(candidates, key=lambda m: abs(m - ideal)))
+        elif duration - position > max_seconds:
+            cuts.append(position + max_seconds)
+        else:
+            break
+    cuts.append(duration)
+    return [
+        Segment(
+            index,
+            max(0.0, own_start - overlap),
+            min(duration, own_end + overlap),
+            own_start,
+            own_end,
+        )
+        for index, (own_start, own_end) in enumerate(zip(cuts, cuts[1:]))
+    ]
+
+
+def cut_segment(path: str, segment: Segment, output_path: str):
+    """
+    Copy a slice of an audio file without re-encoding it.
+
+    Args:
+        path (str): Source audio file
+        segment (Segment): Slice to copy
+        output_path (str): Destination, with the same extension as path
+
+    Raises:
+        ValueError: If ffmpeg fails
+    """
+    _run(
+        ["ffmpeg", "-nostdin", "-v", "error", "-y",
+         "-ss", f"{segment.start:.3f}", "-i", path,
+         "-t", f"{segment.end - segment.start:.3f}",
+         "-vn", "-map", "0:a", "-c", "copy", output_path]
+    )  # fmt: skip
+
+
+def transcribe_file(
+    path: str,
+    offset: float = 0.0,
+    model: str = MODEL,
+    language: Optional[str] = None,
+    prompt: Optional[str] = None,
+    client: Optional[OpenAI] = None,
+) -> Tuple[List[TranscriptSegment], float]:
+    """
+    Transcribe one file with segment timestamps.
+
+    Args:
+        path (str): Audio file below the upload limit
+        offset (float): Seconds added to every timestamp
+        model (str): Transcription model to use
+        language (Optional[str]): ISO-639-1 language of the audio
+        prompt (Optional[str]): Text guiding spelling and style
+        client (Optional[OpenAI]): Client to use, defaults to the shared client
+
+    Returns:
+        Tuple[List[TranscriptSegment], float]: Timed text and audio duration
+
+    Raises:
+        OpenAIError: If API call fails
+    """
+    client = client or get_client()
+    options: Dict[str, Any] = {}
+    if language:
+        options["language"] = language
+    if prompt:
+        options["prompt"] = prompt
+    create = client.with_options(max_retries=0).audio.transcriptions
+    # A Path is re-read on every attempt, so retries upload the whole file
+    response = transcription_limiter.call(
+        create.with_raw_response.create,
+        model=model,
+        file=Path(path),
+        response_format="verbose_json",
+        timestamp_granularities=["segment"],
+        **options,
+    )
+    segments = [
+        TranscriptSegment(offset + part.start, offset + part.end, part.text.strip())
+        for part in response.segments or []
+    ]
+    if not segments and response.text:
+        segments = [
+            TranscriptSegment(offset, offset + response.duration, response.text)
+        ]
+    return segments, response.duration
+
+
+def _owned(
+    parts: List[TranscriptSegment], segment: Segment, last: bool
+) -> List[TranscriptSegment]:
+    """Keep the text whose midpoint lies in the segment's own range."""
+    own_end = float("inf") if last else segment.own_end
+    return [
+        part
+        for part in parts
+        if segment.own_start <= (part.start + part.end) / 2 < own_end
+    ]
+
+
+def transcribe(
+    path: str,
+    model: str = MODEL,
+    language: Optional[str] = None,
+    prompt: Optional[str] = None,
+    max_concurrency: int = MAX_CONCURRENCY,
+    target_seconds: float = TARGET_SEGMENT_SECONDS,
+    overlap: float = OVERLAP_SECONDS,
+    client: Optional[OpenAI] = None,
+) -> Transcription:
+    """
+    Transcribe a recording of any length.
+
+    Recordings longer than target_seconds are split at silences and their
+    segments transcribed concurrently, so the wall time is close to that of
+    the slowest segment. Without ffmpeg, files under the upload limit are
+    sent whole.
+
+    Args:
+        path (str): Audio file
+        model (str): Transcription model to use
+        language (Optional[str]): ISO-639-1 language of the audio
+        prompt (Optional[str]): Text guiding spelling and style
+        max_concurrency (int): Maximum number of segments in flight
+        target_seconds (float): Preferred segment length
+        overlap (float): Seconds of audio shared by neighbouring segments
+        client (Optional[OpenAI]): Client to use, defaults to the shared client
+
+    Returns:
+        Transcription: Stitched text and segments timed from the recording start
+
+    Raises:
+        ValueError: If the file cannot be split or read
+        OpenAIError: If API call fails
+    """
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be a positive number")
+    size = os.path.getsize(path)
+    client = client or get_client()
+
+    if not ffmpeg_available():
+        if size > MAX_UPLOAD_BYTES:
+            raise ValueError(
+                f"ffmpeg is required to split files over {MAX_UPLOAD_BYTES} bytes"
+            )
+        segments, duration = transcribe_file(path, 0.0, model, language, prompt, client)
+        return Transcription(" ".join(s.text for s in segments), segments, duration)
+
+    duration = probe_duration(path)
+    # Copied slices keep the source bitrate, which bounds their length
+    seconds_limit = MAX_UPLOAD_BYTES * 0.95 / max(size / max(duration, 1e-9), 1.0)
+    max_seconds = min(MAX_SEGMENT_SECONDS, seconds_limit - 2 * overlap)
+    target = min(target_seconds, max_seconds)
+    if duration <= target and size <= MAX_UPLOAD_BYTES:
+        plan = [Segment(0, 0.0, duration, 0.0, duration)]
+    else:
+        silences = detect_silences(path)
+        plan = plan_segments(duration, silences, target, max_seconds, overlap)
+
+    suffix = os.path.splitext(path)[1]
+    with tempfile.TemporaryDirectory(prefix="transcribe-") as directory:
+
+        def run(segment: Segment) -> List[TranscriptSegment]:
+            if len(plan) == 1:
+                return transcribe_file(path, 0.0, model, language, prompt, client)[0]
+            segment_path = os.path.join(directory, f"{segment.index:05d}{suffix}")
+            cut_segment(path, segment, segment_path)
+            try:
+                parts, _ = transcribe_file(
+                    segment_path, segment.start, model, language, prompt, client
+                )
+            finally:
+                os.remove(segment_path)
+            return _owned(parts, segment, segment.index == len(plan) - 1)
+
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(plan))) as pool:
+            results = list(pool.map(run, plan))
+
+    segments = [part for parts in results for part in parts]
+    return Transcription(" ".join(s.text for s in segments), segments, duration)
+
+
+def main():
+    """Transcribe an audio file given on the command line."""
+    parser = argparse.ArgumentParser(description="Transcribe speech to text")
+    parser.add_argument("path", nargs="?", default="output.mp3")
+    parser.add_argument("--language")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--segment-seconds", type=float, default=TARGET_SEGMENT_SECONDS)
+    parser.add_argument("--timestamps", action="store_true")
+    args = parser.parse_args()
+
+    try:
+        transcription = transcribe(
+            args.path,
+            language=args.language,
+            max_concurrency=args.concurrency,
+            target_seconds=args.segment_seconds,
+        )
+    except OpenAIError as e:
+        print(f"OpenAI API error occurred: {str(e)}")
+        return
+    except (ValueError, OSError) as e:
+        print(f"Error: {str(e)}")
+        return
 
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
+    if args.timestamps:
+        for segment in transcription.segments:
+            print(f"[{segment.start:8.2f} - {segment.end:8.2f}] {segment.text}")
+    else:
+        print(transcription.text)
 
-with open("output.mp3", "rb") as audio_file:
-    transcript = client.audio.transcriptions.create(model="whisper-1", file=audio_file)
 
-print(transcript.text)
+if __name__ == "__main__":
+    main()
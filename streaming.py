@@ -0,0 +1,190 @@
+"""
+Streaming Chat Completions
+
+This module streams chat completions token by token and measures how the
+response arrives: time to first token, generation speed and total latency.
+Streaming lets interactive tools show text as soon as the model produces it
+instead of after the whole completion is done.
+
+Dependencies:
+    - openai: The official OpenAI Python client library
+
+Features:
+    - Generator and async iterator interfaces over content deltas
+    - Final message assembled from collected parts in linear time
+    - Time-to-first-token, tokens/sec and total latency per call
+    - Requests paced by the shared rate limiter
+    - Reported usage recorded in token_budget.usage
+
+Example:
+    from openai_client import get_client
+    from streaming import ChatStream
+
+    stream = ChatStream(get_client(), model="gpt-4o", messages=messages)
+    for delta in stream:
+        print(delta, end="", flush=True)
+    print(stream.stats)
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Iterator, List, Optional
+
+from openai import AsyncOpenAI, OpenAI
+
+from rate_limiter import create_chat_completion, create_chat_completion_async
+from token_budget import usage
+
+
+@dataclass
+class StreamStats:
+    """Timing of one streamed completion, in seconds since the request started."""
+
+    started: float = field(default_factory=time.perf_counter)
+    first_token: Optional[float] = None
+    finished: Optional[float] = None
+    completion_tokens: int = 0
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Seconds from sending the request to the first content delta."""
+        if self.first_token is None:
+            return None
+        return self.first_token - self.started
+
+    @property
+    def total_latency(self) -> Optional[float]:
+        """Seconds from sending the request to the end of the stream."""
+        if self.finished is None:
+            return None
+        return self.finished - self.started
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Generation speed after the first token."""
+        if self.first_token is None or self.finished is None:
+            return None
+        elapsed = self.finished - self.first_token
+        return self.completion_tokens / elapsed if elapsed > 0 else None
+
+    def __str__(self) -> str:
+        def fmt(value: Optional[float], unit: str) -> str:
+            return "n/a" if value is None else f"{value:.3f}{unit}"
+
+        return (
+            f"TTFT {fmt(self.time_to_first_token, 's')}, "
+            f"{fmt(self.tokens_per_second, ' tok/s')}, "
+            f"total {fmt(self.total_latency, 's')}, "
+            f"{self.completion_tokens} tokens"
+        )
+
+
+class _StreamState:
+    """Collects deltas and stats shared by the sync and async streams."""
+
+    def __init__(self, request: dict):
+        request.setdefault("stream_options", {"include_usage": True})
+        self.request = dict(request, stream=True)
+        self.parts: List[str] = []
+        self.stats = StreamStats()
+        self.finish_reason: Optional[str] = None
+        self._usage_seen = False
+
+    def handle(self, chunk) -> Optional[str]:
+        if chunk.usage is not None:
+            self.stats.completion_tokens = chunk.usage.completion_tokens
+            self._usage_seen = True
+            usage.record(
+                chunk.model or self.request.get("model", "unknown"),
+                chunk.usage,
+                self.finish_reason,
+            )
+        if not chunk.choices:
+            return None
+        choice = chunk.choices[0]
+        if choice.finish_reason:
+            self.finish_reason = choice.finish_reason
+        delta = choice.delta.content if choice.delta else None
+        if not delta:
+            return None
+        if self.stats.first_token is None:
+            self.stats.first_token = time.perf_counter()
+        if not self._usage_seen:
+            self.stats.completion_tokens += 1  # one delta is roughly one token
+        self.parts.append(delta)
+        return delta
+
+    def finish(self):
+        self.stats.finished = time.perf_counter()
+
+    @property
+    def text(self) -> str:
+        """The message assembled from the deltas received so far."""
+        return "".join(self.parts)
+
+
+class ChatStream(_StreamState):
+    """
+    Iterator over the content deltas of a streamed chat completion.
+
+    The request is sent when iteration starts. After iteration, text holds
+    the full message and stats the timing of the call.
+
+    Args:
+        client (OpenAI): Client to send the request with
+        **request: Keyword arguments of chat.completions.create
+    """
+
+    def __init__(self, client: OpenAI, **request):
+        super().__init__(request)
+        self.client = client
+
+    def __iter__(self) -> Iterator[str]:
+        self.stats.started = time.perf_counter()
+        stream = create_chat_completion(self.client, **self.request)
+        try:
+            for chunk in stream:
+                delta = self.handle(chunk)
+                if delta:
+                    yield delta
+        finally:
+            stream.close()
+            self.finish()
+
+    def collect(self) -> str:
+        """Consume the whole stream and return the assembled message."""
+        for _ in self:
+            pass
+        return self.text
+
+
+class AsyncChatStream(_StreamState):
+    """
+    Async iterator over the content deltas of a streamed chat completion.
+
+    Args:
+        client (AsyncOpenAI): Client to send the request with
+        **request: Keyword arguments of chat.completions.create
+    """
+
+    def __init__(self, client: AsyncOpenAI, **request):
+        super().__init__(request)
+        self.client = client
+
+    async def __aiter__(self) -> AsyncIterator[str]:
+        self.stats.started = time.perf_counter()
+        stream = await create_chat_completion_async(self.client, **self.request)
+        try:
+            async for chunk in stream:
+                delta = self.handle(chunk)
+                if delta:
+                    yield delta
+        finally:
+            await stream.close()
+            self.finish()
+
+    async def collect(self) -> str:
+        """Consume the whole stream and return the assembled message."""
+        async for _ in self:
+            pass
+        return self.text
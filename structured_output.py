@@ -0,0 +1,464 @@
+"""
+Structured Outputs
+
+This module turns chat completions into typed, validated data. A JSON Schema
+or pydantic model is sent as a strict json_schema response_format, replies
+are validated before they reach the caller, and streamed replies can be
+consumed element by element while the model is still generating.
+
+Dependencies:
+    - openai: The official OpenAI Python client library
+    - pydantic (optional): Models as schemas and as parse targets
+
+Features:
+    - Strict-mode schemas built from dict schemas or pydantic models
+    - Small JSON Schema validator for the keywords strict mode supports
+    - Incremental JSON parser yielding completed array items or object
+      fields from partial text, in linear time
+    - Streaming helper that yields validated items as they arrive
+
+Example:
+    from openai_client import get_client
+    from structured_output import parse_structured, stream_structured
+
+    species = parse_structured(get_client(), Hierarchy, model="gpt-4o", messages=messages)
+
+    for index, item in stream_structured(
+        get_client(), HIERARCHY_SCHEMA, ("species",), model="gpt-4o", messages=messages
+    ):
+        print(index, item["name"])
+"""
+
+import copy
+import json
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from openai import OpenAI
+
+from rate_limiter import create_chat_completion
+from streaming import ChatStream
+
+Schema = Dict[str, Any]
+Path = Tuple[Union[str, int], ...]
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "boolean": bool,
+    "null": type(None),
+}
+
+
+class SchemaValidationError(ValueError):
+    """Raised when a value does not match its schema."""
+
+
+def _is_model(schema: Any) -> bool:
+    return isinstance(schema, type) and hasattr(schema, "model_json_schema")
+
+
+def strict_schema(schema: Schema) -> Schema:
+    """
+    Adapt a JSON Schema to the rules of strict structured outputs.
+
+    Every object gets additionalProperties false and lists all of its
+    properties as required, so the model always fills in optional fields.
+    Defaults, which strict mode rejects, are dropped.
+
+    Args:
+        schema (Schema): JSON Schema
+
+    Returns:
+        Schema: Strict copy of the schema
+    """
+    schema = copy.deepcopy(schema)
+
+    def visit(node: Schema):
+        node.pop("default", None)
+        if node.get("type") == "object" or "properties" in node:
+            properties = node.setdefault("properties", {})
+            for value in properties.values():
+                visit(value)
+            node["required"] = list(properties)
+            node["additionalProperties"] = False
+        if isinstance(node.get("items"), dict):
+            visit(node["items"])
+        for option in node.get("anyOf", []):
+            visit(option)
+        for definition in node.get("$defs", {}).values():
+            visit(definition)
+
+    visit(schema)
+    return schema
+
+
+def json_schema(schema: Union[Schema, type]) -> Schema:
+    """
+    Get the strict JSON Schema of a dict schema or pydantic model.
+
+    Args:
+        schema (Union[Schema, type]): JSON Schema or pydantic model class
+
+    Returns:
+        Schema: Strict JSON Schema
+    """
+    if _is_model(schema):
+        schema = schema.model_json_schema()
+    return strict_schema(schema)
+
+
+def response_format(
+    schema: Union[Schema, type], name: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Build a strict json_schema response_format.
+
+    Args:
+        schema (Union[Schema, type]): JSON Schema or pydantic model class
+        name (Optional[str]): Schema name, defaults to the model or schema title
+
+    Returns:
+        Dict[str, Any]: Value for the response_format request parameter
+    """
+    strict = json_schema(schema)
+    if name is None:
+        name = schema.__name__ if _is_model(schema) else strict.get("title", "output")
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": strict},
+    }
+
+
+def _resolve(schema: Schema, root: Schema) -> Schema:
+    while "$ref" in schema:
+        schema = root["$defs"][schema["$ref"].split("/")[-1]]
+    return schema
+
+
+def _matches_type(value: Any, kind: str) -> bool:
+    if kind == "integer":
+        return isinstance(value, int) and not isinstance(value, bool)
+    if kind == "number":
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return isinstance(value, _TYPES[kind])
+
+
+def validate(value: Any, schema: Schema, root: Optional[Schema] = None, path="$"):
+    """
+    Check a value against a JSON Schema.
+
+    Supports type, enum, const, anyOf, $ref/$defs, properties, required,
+    additionalProperties, items, minItems, maxItems, minimum and maximum.
+
+    Args:
+        value (Any): Decoded JSON value
+        schema (Schema): Schema to check against
+        root (Optional[Schema]): Document holding $defs, defaults to schema
+        path (str): Location of the value, used in error messages
+
+    Raises:
+        SchemaValidationError: If the value does not match
+    """
+    root = schema if root is None else root
+    schema = _resolve(schema, root)
+
+    if "anyOf" in schema:
+        for option in schema["anyOf"]:
+            try:
+                validate(value, option, root, path)
+                break
+            except SchemaValidationError:
+                continue
+        else:
+            raise SchemaValidationError(f"{path}: matches none of the allowed schemas")
+    if "enum" in schema and value not in schema["enum"]:
+        raise SchemaValidationError(f"{path}: {value!r} is not one of {schema['enum']}")
+    if "const" in schema and value != schema["const"]:
+        raise SchemaValidationError(f"{path}: expected {schema['const']!r}")
+
+    kind = schema.get("type")
+    if kind is not None:
+        kinds = kind if isinstance(kind, list) else [kind]
+        if not any(_matches_type(value, k) for k in kinds):
+            raise SchemaValidationError(f"{path}: expected {' or '.join(kinds)}")
+
+    if isinstance(value, dict):
+        properties = schema.get("properties", {})
+        for name in schema.get("required", []):
+            if name not in value:
+                raise SchemaValidationError(f"{path}: missing property {name!r}")
+        for name, item in value.items():
+            if name in properties:
+                validate(item, properties[name], root, f"{path}.{name}")
+            elif schema.get("additionalProperties") is False:
+                raise SchemaValidationError(f"{path}: unexpected property {name!r}")
+    elif isinstance(value, list):
+        if len(value) < schema.get("minItems", 0):
+            raise SchemaValidationError(f"{path}: too few items")
+        if "maxItems" in schema and len(value) > schema["maxItems"]:
+            raise SchemaValidationError(f"{path}: too many items")
+        if isinstance(schema.get("items"), dict):
+            for index, item in enumerate(value):
+                validate(item, schema["items"], root, f"{path}[{index}]")
+    elif _matches_type(value, "number"):
+        if "minimum" in schema and value < schema["minimum"]:
+            raise SchemaValidationError(f"{path}: below {schema['minimum']}")
+        if "maximum" in schema and value > schema["maximum"]:
+            raise SchemaValidationError(f"{path}: above {schema['maximum']}")
+
+
+def subschema(schema: Schema, path: Path) -> Schema:
+    """
+    Find the schema of the container at a path, e.g. ("questions",).
+
+    Args:
+        schema (Schema): Schema of the whole document
+        path (Path): Object keys and array indexes from the root
+
+    Returns:
+        Schema: Schema of the value at the path
+    """
+    node = _resolve(schema, schema)
+    for step in path:
+        if isinstance(step, int):
+            node = node.get("items", {})
+        else:
+            node = node.get("properties", {}).get(step, {})
+        node = _resolve(node, schema)
+        # Nullable containers are written as anyOf [container, null]
+        options = [o for o in node.get("anyOf", []) if o.get("type") != "null"]
+        if len(options) == 1:
+            node = _resolve(options[0], schema)
+    return node
+
+
+def parse_json(text: str, schema: Union[Schema, type]) -> Any:
+    """
+    Decode and validate a JSON reply.
+
+    Args:
+        text (str): JSON text
+        schema (Union[Schema, type]): JSON Schema or pydantic model class
+
+    Returns:
+        Any: Model instance for pydantic models, otherwise the decoded value
+
+    Raises:
+        SchemaValidationError: If the reply is not valid JSON for the schema
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise SchemaValidationError(f"Reply is not valid JSON: {str(e)}") from e
+    if _is_model(schema):
+        try:
+            return schema.model_validate(data)
+        except ValueError as e:
+            raise SchemaValidationError(str(e)) from e
+    validate(data, schema)
+    return data
+
+
+def parse_structured(
+    client: OpenAI, schema: Union[Schema, type], name: Optional[str] = None, **request
+) -> Any:
+    """
+    Request a completion in strict structured-output mode and validate it.
+
+    Args:
+        client (OpenAI): Client to send the request with
+        schema (Union[Schema, type]): JSON Schema or pydantic model class
+        name (Optional[str]): Schema name sent to the API
+        **request: Keyword arguments of chat.completions.create
+
+    Returns:
+        Any: Model instance for pydantic models, otherwise the decoded value
+
+    Raises:
+        SchemaValidationError: If the model refused or replied with invalid data
+        OpenAIError: If API call fails
+    """
+    response = create_chat_completion(
+        client, response_format=response_format(schema, name), **request
+    )
+    message = response.choices[0].message
+    if getattr(message, "refusal", None):
+        raise SchemaValidationError(f"Model refused to answer: {message.refusal}")
+    return parse_json(message.content, schema)
+
+
+class _Frame:
+    """An open object or array while scanning."""
+
+    __slots__ = ("kind", "path", "key", "index", "expect_key", "value_start")
+
+    def __init__(self, kind: str, path: Path):
+        self.kind = kind
+        self.path = path
+        self.key: Optional[str] = None
+        self.index = 0
+        self.expect_key = kind == "{"
+        self.value_start: Optional[int] = None
+
+    @property
+    def child(self) -> Union[str, int]:
+        return self.key if self.kind == "{" else self.index
+
+
+class IncrementalJsonParser:
+    """
+    Extract completed values from JSON text that is still arriving.
+
+    Text is fed in arbitrary pieces. Whenever a direct child of the container
+    at path is complete (an array item or an object field), it is decoded
+    and returned. Every character is scanned once, and only the text of the
+    value currently being completed is kept in memory; callers that need
+    the whole document join the fed pieces themselves (ChatStream.text).
+
+    Args:
+        path (Sequence[Union[str, int]]): Keys and indexes of the container
+            whose children are wanted; () means the root object or array
+    """
+
+    def __init__(self, path: Sequence[Union[str, int]] = ()):
+        self.path: Path = tuple(path)
+        self._text = ""  # Unconsumed text, starting at absolute _offset
+        self._offset = 0
+        self._position = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+
+    def feed(self, text: str) -> List[Tuple[Union[str, int], Any]]:
+        """
+        Add more text.
+
+        Args:
+            text (str): Next piece of the JSON document
+
+        Returns:
+            List[Tuple[Union[str, int], Any]]: (key or index, value) of every
+            child of the target container completed by this piece
+        """
+        self._text += text
+        completed: List[Tuple[Union[str, int], Any]] = []
+        for position in range(self._position, self._offset + len(self._text)):
+            char = self._text[position - self._offset]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._end_string(position, completed)
+                continue
+
+            frame = self._stack[-1] if self._stack else None
+            target = frame is not None and frame.path == self.path
+            if char in " \t\r\n":
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = position
+                if target and not frame.expect_key:
+                    frame.value_start = position
+            elif char in "{[":
+                if frame is None:
+                    path: Path = ()
+                else:
+                    path = frame.path + (frame.child,)
+                    if target:
+                        frame.value_start = position
+                self._stack.append(_Frame(char, path))
+            elif char in "}]":
+                if target:
+                    self._emit(frame, position, completed)
+                self._stack.pop()
+                parent = self._stack[-1] if self._stack else None
+                if parent is not None and parent.path == self.path:
+                    self._emit(parent, position + 1, completed)
+            elif char == ",":
+                if target:
+                    self._emit(frame, position, completed)
+                if frame.kind == "[":
+                    frame.index += 1
+                else:
+                    frame.expect_key = True
+            elif char == ":":
+                frame.expect_key = False
+            elif target and frame.value_start is None:
+                frame.value_start = position  # number, true, false or null
+        self._position = self._offset + len(self._text)
+        self._trim()
+        return completed
+
+    def _slice(self, start: int, end: int) -> str:
+        return self._text[start - self._offset : end - self._offset]
+
+    def _emit(self, frame: _Frame, end: int, completed: list):
+        if frame.value_start is None:
+            return
+        completed.append((frame.child, json.loads(self._slice(frame.value_start, end))))
+        frame.value_start = None
+
+    def _end_string(self, end: int, completed: list):
+        frame = self._stack[-1]
+        if frame.kind == "{" and frame.expect_key:
+            frame.key = json.loads(self._slice(self._string_start, end + 1))
+        elif frame.path == self.path:
+            self._emit(frame, end + 1, completed)
+
+    def _trim(self):
+        """Drop text that no pending value or key can refer to any more."""
+        keep = self._position
+        if self._in_string:
+            keep = min(keep, self._string_start)
+        for frame in self._stack:
+            if frame.value_start is not None:
+                keep = min(keep, frame.value_start)
+        self._text = self._slice(keep, self._position)
+        self._offset = keep
+
+
+def stream_structured(
+    client: OpenAI,
+    schema: Union[Schema, type],
+    path: Sequence[Union[str, int]] = (),
+    name: Optional[str] = None,
+    **request,
+) -> Iterator[Tuple[Union[str, int], Any]]:
+    """
+    Stream a structured completion, yielding validated values as they complete.
+
+    Args:
+        client (OpenAI): Client to send the request with
+        schema (Union[Schema, type]): JSON Schema or pydantic model class
+        path (Sequence[Union[str, int]]): Container whose items or fields to
+            yield, e.g. ("questions",) for the items of a questions array
+        name (Optional[str]): Schema name sent to the API
+        **request: Keyword arguments of chat.completions.create
+
+    Yields:
+        Tuple[Union[str, int], Any]: Array index or field name, and its value
+
+    Raises:
+        SchemaValidationError: If a value does not match its schema
+        OpenAIError: If API call fails
+    """
+    strict = json_schema(schema)
+    container = subschema(strict, tuple(path))
+    parser = IncrementalJsonParser(path)
+    stream = ChatStream(
+        client, response_format=response_format(schema, name), **request
+    )
+    for delta in stream:
+        for key, value in parser.feed(delta):
+            if isinstance(key, int):
+                item_schema = container.get("items", {})
+            else:
+                item_schema = container.get("properties", {}).get(key, {})
+            validate(value, item_schema, strict, f"$.{key}")
+            yield key, value
@@ -0,0 +1,298 @@
+"""
+Token-Aware Text Chunking
+
+This module splits long texts, such as video transcripts, into chunks measured
+in model tokens rather than characters, so every chunk uses the context window
+as fully as possible without overflowing it.
+
+Dependencies:
+    - tiktoken: OpenAI's tokenizer library, through token_budget
+
+Features:
+    - Chunk sizes measured with the model's real tokenizer
+    - Configurable token overlap between consecutive chunks
+    - Chunks described by character offsets into the original string
+    - Streaming chunks from a generator of transcript entries
+
+Example:
+    from text_chunking import chunk_text, iter_chunk_spans
+
+    chunks = chunk_text(text, max_tokens=1000, overlap=50)
+
+    for span in iter_chunk_spans(text, max_tokens=1000):
+        print(span.start, span.end, span.token_count)
+"""
+
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple
+
+import tiktoken
+
+from token_budget import (  # pylint: disable=unused-import
+    DEFAULT_MODEL,
+    count_tokens,
+    get_encoding,
+)
+
+DEFAULT_MAX_TOKENS = 1000
+
+# How far back (as a fraction of the chunk) to look for a word boundary
+BOUNDARY_LOOKBACK = 0.25
+
+
+class Chunk(NamedTuple):
+    """A chunk of a source string, described by character offsets."""
+
+    start: int
+    end: int
+    token_count: int
+
+    def text(self, source: str) -> str:
+        """Return the chunk's text from the string it was computed on."""
+        return source[self.start : self.end]
+
+
+def _validate(max_tokens: int, overlap: int):
+    if max_tokens <= 0:
+        raise ValueError("max_tokens must be a positive number")
+    if overlap < 0 or overlap >= max_tokens:
+        raise ValueError("overlap must be between 0 and max_tokens - 1")
+
+
+class _CharCursor:
+    """
+    Convert UTF-8 byte offsets of a string into character offsets.
+
+    Only the bytes between consecutive lookups are decoded, so converting all
+    chunk boundaries costs a single pass over the text.
+    """
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.byte_pos = 0
+        self.char_pos = 0
+
+    def to_char(self, byte_pos: int) -> int:
+        # Token boundaries may fall inside a multi-byte character; the
+        # character then belongs to the token where it starts.
+        while 0 < byte_pos < len(self.data) and self.data[byte_pos] & 0xC0 == 0x80:
+            byte_pos -= 1
+        self.char_pos = self.peek(byte_pos)
+        self.byte_pos = byte_pos
+        return self.char_pos
+
+    def peek(self, byte_pos: int) -> int:
+        """Character offset of a byte offset on a character boundary."""
+        if byte_pos >= self.byte_pos:
+            return self.char_pos + len(
+                self.data[self.byte_pos : byte_pos].decode("utf-8")
+            )
+        return self.char_pos - len(self.data[byte_pos : self.byte_pos].decode("utf-8"))
+
+
+def _word_end(
+    encoding: tiktoken.Encoding,
+    tokens: List[int],
+    start: int,
+    max_tokens: int,
+    lookback: int,
+) -> int:
+    """End index of a chunk, moved back to a word boundary if one is near."""
+    end = min(start + max_tokens, len(tokens))
+    if end < len(tokens):
+        for candidate in range(end, max(start + 1, end - lookback) - 1, -1):
+            if encoding.decode_single_token_bytes(tokens[candidate])[:1].isspace():
+                return candidate
+    return end
+
+
+def iter_chunk_spans(
+    text: str,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    overlap: int = 0,
+    model: str = DEFAULT_MODEL,
+) -> Iterator[Chunk]:
+    """
+    Split text into token-bounded chunks without copying it.
+
+    Chunk ends are moved back to the nearest word boundary when one exists in
+    the last quarter of the chunk, so words are not cut in half.
+
+    Args:
+        text (str): The input text to be chunked
+        max_tokens (int): Maximum size of each chunk in tokens
+        overlap (int): Number of tokens shared by consecutive chunks
+        model (str): OpenAI model whose tokenizer is used
+
+    Yields:
+        Chunk: Character offsets and token count of each chunk
+
+    Raises:
+        ValueError: If max_tokens or overlap are out of range
+    """
+    _validate(max_tokens, overlap)
+    encoding = get_encoding(model)
+    tokens = encoding.encode_ordinary(text)
+    total = len(tokens)
+    lookback = int(max_tokens * BOUNDARY_LOOKBACK)
+
+    if text.isascii():
+        # Byte offsets are character offsets and every token boundary is a
+        # character boundary
+        start = 0
+        start_byte = 0
+        while start < total:
+            end = _word_end(encoding, tokens, start, max_tokens, lookback)
+            end_byte = start_byte + len(encoding.decode_bytes(tokens[start:end]))
+            yield Chunk(start_byte, end_byte, end - start)
+            if end >= total:
+                break
+            next_start = max(end - overlap, start + 1)
+            start_byte += len(encoding.decode_bytes(tokens[start:next_start]))
+            start = next_start
+        return
+
+    # A multi-byte character may be split across tokens. Chunks then start
+    # and end only at token indexes that fall on character boundaries, and
+    # are re-counted, so the character span never holds more than max_tokens
+    data = text.encode("utf-8")
+    offsets = [0]
+    for token in tokens:
+        offsets.append(offsets[-1] + len(encoding.decode_single_token_bytes(token)))
+
+    def boundary(index: int) -> bool:
+        return offsets[index] == len(data) or data[offsets[index]] & 0xC0 != 0x80
+
+    def snap(index: int, low: int, high: int) -> int:
+        # Nearest boundary at or below index, above low; else above index
+        for candidate in range(index, low, -1):
+            if boundary(candidate):
+                return candidate
+        for candidate in range(index + 1, high + 1):
+            if boundary(candidate):
+                return candidate
+        return high
+
+    starts, ends = _CharCursor(data), _CharCursor(data)
+    start = 0
+    while start < total:
+        end = snap(
+            _word_end(encoding, tokens, start, max_tokens, lookback), start, total
+        )
+        start_char = starts.to_char(offsets[start])
+        count = len(
+            encoding.encode_ordinary(text[start_char : ends.peek(offsets[end])])
+        )
+        while count > max_tokens:
+            shorter = snap(end - 1, start, end - 1)
+            if shorter >= end or not boundary(shorter):
+                break  # A single character longer than max_tokens
+            end = shorter
+            count = len(
+                encoding.encode_ordinary(text[start_char : ends.peek(offsets[end])])
+            )
+        yield Chunk(start_char, ends.to_char(offsets[end]), count)
+        if end >= total:
+            break
+        start = snap(max(end - overlap, start + 1), start, end)
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    overlap: int = 0,
+    model: str = DEFAULT_MODEL,
+) -> List[str]:
+    """
+    Split text into smaller chunks of at most max_tokens tokens.
+
+    Args:
+        text (str): The input text to be chunked
+        max_tokens (int): Maximum size of each chunk in tokens
+        overlap (int): Number of tokens shared by consecutive chunks
+        model (str): OpenAI model whose tokenizer is used
+
+    Returns:
+        List[str]: List of text chunks
+    """
+    return [
+        text[span.start : span.end].strip()
+        for span in iter_chunk_spans(text, max_tokens, overlap, model)
+    ]
+
+
+def iter_transcript_chunks(
+    entries: Iterable[Dict[str, Any]],
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    overlap: int = 0,
+    model: str = DEFAULT_MODEL,
+) -> Iterator[str]:
+    """
+    Stream token-bounded chunks from transcript entries.
+
+    Entries are consumed lazily, so the full transcript never has to be joined
+    into one string. Chunks break between entries; an entry longer than
+    max_tokens on its own is split with iter_chunk_spans.
+
+    Args:
+        entries (Iterable[Dict[str, Any]]): Transcript entries with a "text" key
+        max_tokens (int): Maximum size of each chunk in tokens
+        overlap (int): Approximate number of tokens shared by consecutive chunks
+        model (str): OpenAI model whose tokenizer is used
+
+    Yields:
+        str: Text chunks in transcript order
+
+    Raises:
+        ValueError: If max_tokens or overlap are out of range
+    """
+    _validate(max_tokens, overlap)
+    encoding = get_encoding(model)
+    # (text, tokens with the joining space, tokens alone) of the current chunk
+    buffer: deque = deque()
+    buffer_tokens = 0  # Sum of the sizes with the joining space
+
+    def chunk_tokens() -> int:
+        # The first entry of a chunk is joined without the leading space
+        if not buffer:
+            return 0
+        _, joined, alone = buffer[0]
+        return buffer_tokens - joined + alone
+
+    def join() -> str:
+        return " ".join(item for item, _, _ in buffer)
+
+    for entry in entries:
+        text = entry["text"].strip()
+        if not text:
+            continue
+        # Measure with the joining space, which merges into the first token
+        size = len(encoding.encode_ordinary(" " + text))
+        alone = len(encoding.encode_ordinary(text))
+
+        if alone > max_tokens:
+            if buffer:
+                yield join()
+                buffer.clear()
+                buffer_tokens = 0
+            yield from chunk_text(text, max_tokens, overlap, model)
+            continue
+
+        if buffer and chunk_tokens() + size > max_tokens:
+            yield join()
+            # Keep trailing entries as overlap for the next chunk
+            kept: deque = deque()
+            kept_tokens = 0
+            while buffer and kept_tokens + buffer[-1][1] <= overlap:
+                item = buffer.pop()
+                kept.appendleft(item)
+                kept_tokens += item[1]
+            buffer, buffer_tokens = kept, kept_tokens
+            while buffer and chunk_tokens() + size > max_tokens:
+                buffer_tokens -= buffer.popleft()[1]
+
+        buffer.append((text, size, alone))
+        buffer_tokens += size
+
+    if buffer:
+        yield join()
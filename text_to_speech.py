@@ -13,21 +13,361 @@ Features:
     - Support for multiple voice options
     - Adjustable speech parameters (speed, pitch)
     - Save audio output to MP3 files
+    - Streaming mode for long texts: the text is split on sentence
+      boundaries, upcoming segments are synthesized concurrently, and audio
+      is written to a file or pipe in order as it arrives, with bounded memory
+    - Requests paced and retried by a speech rate limiter, separate from the
+      chat token limits
 
 Example:
     $ export OPENAI_API_KEY='your-api-key'
     $ python text_to_speech.py
+    $ python text_to_speech.py --input chapter.txt --output chapter.mp3
+    $ python text_to_speech.py --input chapter.txt --output - | mpv -
+
+    from text_to_speech import stream_speech
+
+    with open("chapter.mp3", "wb") as audio_file:
+        stats = stream_speech(long_text, audio_file)
+    print(stats)
 """
 
-import os
-from openai import OpenAI
+import argparse
+import queue
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import closing
+from dataclasses import dataclass, field
+from typing import BinaryIO, List, Optional
+
+from openai import OpenAI, OpenAIError
+
+from openai_client import get_client
+from rate_limiter import RateLimiter
+
+MODEL = "tts-1"
+VOICE = "alloy"
+RESPONSE_FORMAT = "mp3"
+MAX_INPUT_CHARS = 4096  # API limit per request
+SEGMENT_CHARS = 600
+MAX_CONCURRENCY = 3
+CHUNK_SIZE = 1 << 14
+BUFFERED_CHUNKS = 64  # per segment in flight
+SPEECH_REQUESTS_PER_MINUTE = 500
+
+# Speech has its own request quota, separate from chat tokens per minute
+speech_limiter = RateLimiter(requests_per_minute=SPEECH_REQUESTS_PER_MINUTE)
+
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"')\]])\s+")
+
+# Sentinel marking the end of a segment's audio in its queue
+_END = object()
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split text into sentences on terminal punctuation.
+
+    Args:
+        text (str): Text to split
+
+    Returns:
+        List[str]: Non-empty sentences in order, whitespace-normalized
+    """
+    return [
+        " ".join(sentence.split())
+        for sentence in SENTENCE_END.split(text)
+        if sentence.strip()
+    ]
+
+
+def segment_text(
+    text: str, segment_chars: int = SEGMENT_CHARS, max_chars: int = MAX_INPUT_CHARS
+) -> List[str]:
+    """
+    Group sentences into synthesis segments.
+
+    The first sentence forms a segment of its own so audio starts as soon
+    as possible; later sentences are packed up to segment_chars. Sentences
+    longer than max_chars are split between words.
+
+    Args:
+        text (str): Text to synthesize
+        segment_chars (int): Target segment length in characters
+        max_chars (int): Hard limit of one synthesis request
+
+    Returns:
+        List[str]: Segments in reading order
+
+    Raises:
+        ValueError: If the text is empty or a single word exceeds max_chars
+    """
+    sentences: List[str] = []
+    for sentence in split_sentences(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars + 1)
+            if cut <= 0:
+                raise ValueError(f"Text has a word longer than {max_chars} characters")
+            sentences.append(sentence[:cut])
+            sentence = sentence[cut + 1 :]
+        sentences.append(sentence)
+    if not sentences:
+        raise ValueError("Text cannot be empty")
+
+    segments = [sentences[0]]
+    current = ""
+    for sentence in sentences[1:]:
+        if current and len(current) + 1 + len(sentence) > segment_chars:
+            segments.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        segments.append(current)
+    return segments
+
+
+@dataclass
+class SpeechStats:
+    """Timing of one streamed synthesis, in seconds since it started."""
+
+    started: float = field(default_factory=time.perf_counter)
+    first_byte: Optional[float] = None
+    finished: Optional[float] = None
+    segments: int = 0
+    bytes_written: int = 0
+
+    @property
+    def time_to_first_byte(self) -> Optional[float]:
+        """Seconds until the first audio byte was written."""
+        return None if self.first_byte is None else self.first_byte - self.started
+
+    @property
+    def total_latency(self) -> Optional[float]:
+        """Seconds until the last audio byte was written."""
+        return None if self.finished is None else self.finished - self.started
+
+    def __str__(self) -> str:
+        def fmt(value: Optional[float]) -> str:
+            return "n/a" if value is None else f"{value:.3f}s"
+
+        return (
+            f"{self.segments} segments, {self.bytes_written} bytes, "
+            f"first audio {fmt(self.time_to_first_byte)}, "
+            f"total {fmt(self.total_latency)}"
+        )
+
+
+def _open_speech(client: OpenAI, **request) -> "closing":
+    # The request is sent and its status checked here, so the limiter can
+    # retry it before any audio has been read. The response is wrapped so
+    # the limiter passes it through instead of reading the whole body.
+    speech = client.with_options(max_retries=0).audio.speech.with_streaming_response
+    response = speech.create(**request).__enter__()
+    speech_limiter.update_from_headers(response.headers)
+    return closing(response)
+
+
+def open_speech(client: OpenAI, **request) -> "closing":
+    """
+    Start a speech request under the speech rate limiter.
+
+    Rate limit and transient errors are retried before any audio is read.
+
+    Args:
+        client (OpenAI): Client to send the request with
+        **request: Keyword arguments of audio.speech.create
+
+    Returns:
+        closing: Context manager yielding the streaming response
+
+    Raises:
+        OpenAIError: If the request still fails after the limiter's retries
+    """
+    return speech_limiter.call(_open_speech, client, **request)
+
+
+class _SegmentWorker(threading.Thread):
+    """Synthesizes one segment, passing its audio through a bounded queue."""
+
+    def __init__(self, client: OpenAI, segment: str, stop: threading.Event, **request):
+        super().__init__(daemon=True)
+        self.client = client
+        self.segment = segment
+        self.stop = stop
+        self.request = request
+        self.chunks: "queue.Queue" = queue.Queue(maxsize=BUFFERED_CHUNKS)
+
+    def _put(self, item) -> bool:
+        # Block while the queue is full, but give up once the run is stopped
+        while not self.stop.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self):
+        try:
+            with open_speech(
+                self.client, input=self.segment, **self.request
+            ) as response:
+                for chunk in response.iter_bytes(CHUNK_SIZE):
+                    if not self._put(chunk):
+                        return
+            self._put(_END)
+        except Exception as e:  # pylint: disable=broad-except
+            self._put(e)
+
+
+def stream_speech(
+    text: str,
+    output: BinaryIO,
+    model: str = MODEL,
+    voice: str = VOICE,
+    response_format: str = RESPONSE_FORMAT,
+    max_concurrency: int = MAX_CONCURRENCY,
+    segment_chars: int = SEGMENT_CHARS,
+    client: Optional[OpenAI] = None,
+) -> SpeechStats:
+    """
+    Synthesize long text segment by segment, writing audio as it arrives.
+
+    Up to max_concurrency segments are synthesized at once; the audio of
+    the current segment is written while the following ones download.
+    Memory use is bounded by max_concurrency * BUFFERED_CHUNKS * CHUNK_SIZE.
+    Use a format whose segments can be concatenated, such as mp3, aac,
+    opus or pcm.
+
+    Args:
+        text (str): Text to synthesize
+        output (BinaryIO): File or pipe receiving the audio
+        model (str): Speech model to use
+        voice (str): Voice to use
+        response_format (str): Audio format
+        max_concurrency (int): Maximum number of segments in flight
+        segment_chars (int): Target segment length in characters
+        client (Optional[OpenAI]): Client to use, defaults to the shared client
+
+    Returns:
+        SpeechStats: Segment count, bytes written and timing
+
+    Raises:
+        ValueError: If the text is empty or max_concurrency is not positive
+        OpenAIError: If API call fails
+    """
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be a positive number")
+    segments = segment_text(text, segment_chars)
+    client = client or get_client()
+    stats = SpeechStats(segments=len(segments))
+    stop = threading.Event()
+    pending: "deque[_SegmentWorker]" = deque()
+    upcoming = iter(segments)
+
+    def start_next():
+        segment = next(upcoming, None)
+        if segment is not None:
+            worker = _SegmentWorker(
+                client,
+                segment,
+                stop,
+                model=model,
+                voice=voice,
+                response_format=response_format,
+            )
+            worker.start()
+            pending.append(worker)
+
+    try:
+        for _ in range(max_concurrency):
+            start_next()
+        while pending:
+            worker = pending.popleft()
+            while True:
+                item = worker.chunks.get()
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                output.write(item)
+                if stats.first_byte is None:
+                    output.flush()
+                    stats.first_byte = time.perf_counter()
+                stats.bytes_written += len(item)
+            start_next()
+        output.flush()
+    finally:
+        stop.set()
+    stats.finished = time.perf_counter()
+    return stats
+
+
+def synthesize(
+    text: str,
+    path: str,
+    model: str = MODEL,
+    voice: str = VOICE,
+    client: Optional[OpenAI] = None,
+):
+    """
+    Synthesize short text with a single request and save it to a file.
+
+    Args:
+        text (str): Text to synthesize, at most MAX_INPUT_CHARS characters
+        path (str): Output file
+        model (str): Speech model to use
+        voice (str): Voice to use
+        client (Optional[OpenAI]): Client to use, defaults to the shared client
+
+    Raises:
+        OpenAIError: If API call fails
+    """
+    with open_speech(
+        client or get_client(), model=model, input=text, voice=voice
+    ) as response:
+        response.stream_to_file(path)
+
+
+def main():
+    """Synthesize the example sentence, or a text file in streaming mode."""
+    parser = argparse.ArgumentParser(description="Convert text to speech")
+    parser.add_argument("--input", help="Text file to read; enables streaming")
+    parser.add_argument("--output", default="output.mp3", help="File, or - for stdout")
+    parser.add_argument("--voice", default=VOICE)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    args = parser.parse_args()
 
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
+    try:
+        if args.input is None:
+            synthesize(
+                "A man is walking down the street.", args.output, voice=args.voice
+            )
+            return
+        with open(args.input, "r", encoding="utf-8") as text_file:
+            text = text_file.read()
+        if args.output == "-":
+            stats = stream_speech(
+                text,
+                sys.stdout.buffer,
+                voice=args.voice,
+                max_concurrency=args.concurrency,
+            )
+        else:
+            with open(args.output, "wb") as audio_file:
+                stats = stream_speech(
+                    text, audio_file, voice=args.voice, max_concurrency=args.concurrency
+                )
+        print(stats, file=sys.stderr)
+    except OpenAIError as e:
+        print(f"OpenAI API error occurred: {str(e)}", file=sys.stderr)
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
 
-response = client.audio.speech.create(
-    model="tts-1", input="A man is walking down the street.", voice="alloy"
-)
 
-with open("output.mp3", "wb") as file:
-    file.write(response.content)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+"""
+Token Counting and Context Budgeting
+
+This module is the one place that knows how many tokens a chat request
+uses. It counts prompt tokens with the model's tokenizer before a request
+is sent, derives max_tokens from a target word count, checks requests
+against each model's context window and keeps account of the tokens the
+API reports back in response usage.
+
+Dependencies:
+    - tiktoken: OpenAI's tokenizer library
+
+Features:
+    - Tokenizer per model loaded once, with a cache of counts for short,
+      repeated texts such as system prompts
+    - Prompt token estimates for chat messages, including message framing,
+      multi-part content and tool calls
+    - max_tokens derived from a target word count
+    - Context window and output limits per model family, with the completion
+      budget fitted into the room the prompt leaves
+    - Usage accounting per model from response usage, including truncated
+      replies and the accuracy of the prompt estimates
+
+Example:
+    from token_budget import fit_max_tokens, max_tokens_for_words, usage
+
+    max_tokens = fit_max_tokens(messages, "gpt-4", max_tokens_for_words(300))
+    ...
+    print(usage.snapshot())
+"""
+
+import json
+import math
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional
+
+import tiktoken
+
+DEFAULT_MODEL = "gpt-4"
+DEFAULT_ENCODING = "cl100k_base"
+
+# Chat framing: every message costs a few tokens around its content, and
+# the reply is primed with a few more
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_NAME = 1
+REPLY_PRIMING_TOKENS = 3
+# Images cost a fixed amount at low detail and up to this much at high detail
+# for typical photos; see vision.image_tokens for the exact rule
+LOW_DETAIL_IMAGE_TOKENS = 85
+IMAGE_TOKENS_ESTIMATE = 765
+
+# English prose averages about 0.75 words per token; models also overshoot
+# word targets, so the budget leaves room instead of truncating the reply
+TOKENS_PER_WORD = 4 / 3
+WORD_BUDGET_MARGIN = 1.5
+
+# Only short texts are kept in the count cache, long ones are counted anew
+CACHED_TEXT_CHARS = 4096
+
+# Longest matching prefix wins, so specific models go before their families
+CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+}
+MAX_OUTPUT_TOKENS = {
+    "gpt-4o": 16384,
+    "gpt-4-turbo": 4096,
+    "gpt-4-32k": 32768,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 4096,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+class ContextOverflowError(ValueError):
+    """Raised when a request does not fit into the model's context window."""
+
+    def __init__(self, message: str, prompt_tokens: int, context_window: int):
+        super().__init__(message)
+        self.prompt_tokens = prompt_tokens
+        self.context_window = context_window
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = DEFAULT_MODEL) -> tiktoken.Encoding:
+    """
+    Get the tokenizer used by a model.
+
+    Args:
+        model (str): OpenAI model name
+
+    Returns:
+        tiktoken.Encoding: The model's encoding, or cl100k_base for unknown models
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding(DEFAULT_ENCODING)
+
+
+@lru_cache(maxsize=8192)
+def _cached_count(text: str, model: str) -> int:
+    return len(get_encoding(model).encode_ordinary(text))
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """
+    Count the tokens of a text.
+
+    Args:
+        text (str): Text to measure
+        model (str): OpenAI model whose tokenizer is used
+
+    Returns:
+        int: Number of tokens
+    """
+    if len(text) <= CACHED_TEXT_CHARS:
+        return _cached_count(text, model)
+    return len(get_encoding(model).encode_ordinary(text))
+
+
+_tokenizer_unavailable = False
+
+
+def estimate_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """
+    Count the tokens of a text, never failing.
+
+    Uses the tokenizer when it can be loaded and otherwise falls back to
+    four characters per token, so budgeting never blocks a request when the
+    tokenizer's encoding files cannot be downloaded.
+
+    Args:
+        text (str): Text to measure
+        model (str): OpenAI model whose tokenizer is used
+
+    Returns:
+        int: Number of tokens
+    """
+    global _tokenizer_unavailable  # pylint: disable=global-statement
+    if not _tokenizer_unavailable:
+        try:
+            return count_tokens(text, model)
+        except (OSError, ValueError):
+            _tokenizer_unavailable = True
+    return (len(text) + 3) // 4
+
+
+def _field(item: Any, name: str) -> Any:
+    # Messages may be dicts or objects returned by the client
+    if isinstance(item, dict):
+        return item.get(name)
+    return getattr(item, name, None)
+
+
+def _content_tokens(content: Any, model: str) -> int:
+    if content is None:
+        return 0
+    if isinstance(content, str):
+        return estimate_tokens(content, model)
+    tokens = 0
+    for part in content:
+        kind = _field(part, "type")
+        if kind == "text":
+            tokens += estimate_tokens(_field(part, "text") or "", model)
+        elif kind == "image_url":
+            detail = _field(_field(part, "image_url") or {}, "detail")
+            tokens += (
+                LOW_DETAIL_IMAGE_TOKENS if detail == "low" else IMAGE_TOKENS_ESTIMATE
+            )
+    return tokens
+
+
+def estimate_message_tokens(
+    messages: Iterable[Any],
+    model: str = DEFAULT_MODEL,
+    tools: Optional[Iterable[Dict[str, Any]]] = None,
+) -> int:
+    """
+    Estimate the prompt tokens of a chat request before sending it.
+
+    Args:
+        messages (Iterable[Any]): Chat messages, as dicts or message objects
+        model (str): OpenAI model whose tokenizer is used
+        tools (Optional[Iterable[Dict[str, Any]]]): Tool definitions sent along
+
+    Returns:
+        int: Estimated prompt tokens
+    """
+    tokens = REPLY_PRIMING_TOKENS
+    for message in messages:
+        tokens += TOKENS_PER_MESSAGE
+        tokens += _content_tokens(_field(message, "content"), model)
+        if _field(message, "name"):
+            tokens += TOKENS_PER_NAME + estimate_tokens(_field(message, "name"), model)
+        for call in _field(message, "tool_calls") or ():
+            function = _field(call, "function")
+            tokens += estimate_tokens(_field(function, "name") or "", model)
+            tokens += estimate_tokens(_field(function, "arguments") or "", model)
+    if tools:
+        tokens += estimate_tokens(json.dumps(list(tools), sort_keys=True), model)
+    return tokens
+
+
+def _lookup(table: Dict[str, int], model: str) -> Optional[int]:
+    matches = [prefix for prefix in table if model.startswith(prefix)]
+    return table[max(matches, key=len)] if matches else None
+
+
+def context_window(model: str) -> int:
+    """Return the context window of a model in tokens."""
+    return _lookup(CONTEXT_WINDOWS, model) or DEFAULT_CONTEXT_WINDOW
+
+
+def max_output_tokens(model: str) -> int:
+    """Return the most tokens a model may generate in one reply."""
+    return _lookup(MAX_OUTPUT_TOKENS, model) or context_window(model)
+
+
+def max_tokens_for_words(words: int) -> int:
+    """
+    Derive max_tokens for a reply of about the given number of words.
+
+    Args:
+        words (int): Target word count
+
+    Returns:
+        int: Completion budget in tokens
+
+    Raises:
+        ValueError: If words is not positive
+    """
+    if words <= 0:
+        raise ValueError("Word count must be a positive number")
+    return math.ceil(words * TOKENS_PER_WORD * WORD_BUDGET_MARGIN)
+
+
+def fit_max_tokens(
+    messages: Iterable[Any],
+    model: str = DEFAULT_MODEL,
+    max_tokens: Optional[int] = None,
+    tools: Optional[Iterable[Dict[str, Any]]] = None,
+) -> int:
+    """
+    Fit a completion budget into the room the prompt leaves in the context.
+
+    Args:
+        messages (Iterable[Any]): Chat messages of the request
+        model (str): OpenAI model to use
+        max_tokens (Optional[int]): Wanted budget, defaults to the most the
+            model can generate
+        tools (Optional[Iterable[Dict[str, Any]]]): Tool definitions sent along
+
+    Returns:
+        int: max_tokens to send
+
+    Raises:
+        ContextOverflowError: If the prompt leaves no room for the wanted
+            budget; a reply cut short would only have to be requested again
+    """
+    prompt_tokens = estimate_message_tokens(messages, model, tools)
+    window = context_window(model)
+    wanted = min(max_tokens or max_output_tokens(model), max_output_tokens(model))
+    room = window - prompt_tokens
+    # An explicit budget must fit; the default one may shrink to the room left
+    needed = wanted if max_tokens else 1
+    if room < needed:
+        raise ContextOverflowError(
+            f"Prompt of about {prompt_tokens} tokens leaves {max(room, 0)} of "
+            f"{window} tokens for {model}, {needed} needed",
+            prompt_tokens,
+            window,
+        )
+    return min(wanted, room)
+
+
+class UsageTracker:
+    """
+    Thread-safe totals of the token usage reported by the API, per model.
+
+    Records prompt and completion tokens, replies cut short by max_tokens
+    and, when the request's estimate is given, how far estimates were off.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, int]] = {}
+
+    def record(
+        self,
+        model: str,
+        usage: Any,
+        finish_reason: Optional[str] = None,
+        estimated_prompt_tokens: Optional[int] = None,
+    ):
+        """
+        Add the usage of one response.
+
+        Args:
+            model (str): Model that served the request
+            usage (Any): The response's usage object
+            finish_reason (Optional[str]): Finish reason of the first choice
+            estimated_prompt_tokens (Optional[int]): Prompt estimate made
+                before the request was sent
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        with self._lock:
+            totals = self._models.setdefault(
+                model,
+                {
+                    "requests": 0,
+                    "prompt_tokens": 0,
+                    "completion_tokens": 0,
+                    "truncated": 0,
+                    "estimated_requests": 0,
+                    "estimate_error": 0,
+                },
+            )
+            totals["requests"] += 1
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["truncated"] += finish_reason == "length"
+            if estimated_prompt_tokens is not None and prompt_tokens:
+                totals["estimated_requests"] += 1
+                totals["estimate_error"] += abs(estimated_prompt_tokens - prompt_tokens)
+
+    def record_response(
+        self, response: Any, estimated_prompt_tokens: Optional[int] = None
+    ):
+        """
+        Add the usage of a chat completion; responses without usage are ignored.
+
+        Args:
+            response (Any): ChatCompletion returned by the API
+            estimated_prompt_tokens (Optional[int]): Prompt estimate made
+                before the request was sent
+        """
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        choices = getattr(response, "choices", None) or []
+        finish_reason = choices[0].finish_reason if choices else None
+        self.record(
+            getattr(response, "model", None) or "unknown",
+            usage,
+            finish_reason,
+            estimated_prompt_tokens,
+        )
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """
+        Return the totals per model.
+
+        Returns:
+            Dict[str, Dict[str, float]]: Requests, prompt, completion and
+            total tokens, truncated replies and the mean absolute error of
+            the prompt estimates
+        """
+        with self._lock:
+            report = {}
+            for model, totals in self._models.items():
+                estimated = totals["estimated_requests"]
+                report[model] = {
+                    "requests": totals["requests"],
+                    "prompt_tokens": totals["prompt_tokens"],
+                    "completion_tokens": totals["completion_tokens"],
+                    "total_tokens": totals["prompt_tokens"]
+                    + totals["completion_tokens"],
+                    "truncated": totals["truncated"],
+                    "estimate_error": (
+                        totals["estimate_error"] / estimated if estimated else 0.0
+                    ),
+                }
+            return report
+
+    def reset(self):
+        """Forget all recorded usage."""
+        with self._lock:
+            self._models.clear()
+
+
+# Usage of every chat completion sent through rate_limiter in the process
+usage = UsageTracker()
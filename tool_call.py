@@ -16,21 +16,183 @@ Features:
     - Support for multiple function definitions
     - Error handling and validation of function calls
     - Automatic parameter parsing and type checking
+    - Parallel tool calls executed concurrently, looping until the model
+      stops calling tools
+    - Product queries run against an indexed SQLite catalogue
+    - Optional moderation guard; the query is screened while the model
+      plans its first tool calls, and no tool runs on a flagged query
 
 Example:
     $ export OPENAI_API_KEY='your-api-key'
     $ python tool_call.py
 """
 
+import asyncio
+import inspect
 import os
 import json
-from typing import List, Dict, Any, Optional
-from openai import OpenAI, OpenAIError
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+from openai import OpenAIError
+from moderation_guard import FlaggedInputError, GuardCheck, ModerationGuard
+from openai_client import get_client
+from product_store import ProductStore, create_catalogue
+from response_cache import cached_chat_completion
 
 # Configuration
 MODEL = "gpt-4"
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
+MAX_ROUNDS = 5
+TOOL_TIMEOUT = 30.0
+PRODUCT_DB = os.getenv("PRODUCT_DB", "products.sqlite")
+
+
+class ToolRegistry:
+    """
+    Registry of functions the model may call, and their OpenAI definitions.
+
+    Synchronous tools run in a thread pool; coroutine tools run on the
+    registry's own event loop thread, so they never wait for a pool worker.
+    All tool calls of a model turn execute concurrently.
+
+    A synchronous tool that times out cannot be interrupted and keeps its
+    worker until it returns; coroutine tools are cancelled on timeout.
+
+    Args:
+        max_workers (int): Size of the thread pool for synchronous tools
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.functions: Dict[str, Callable[..., Any]] = {}
+        self.definitions: List[Dict[str, Any]] = []
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_lock = threading.Lock()
+
+    def register(self, definition: Dict[str, Any]) -> Callable:
+        """
+        Decorator registering a function under its OpenAI function definition.
+
+        Args:
+            definition (Dict[str, Any]): Function definition with name,
+                description and JSON Schema parameters
+
+        Returns:
+            Callable: Decorator returning the function unchanged
+        """
+
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            self.functions[definition["name"]] = func
+            self.definitions.append(definition)
+            return func
+
+        return decorator
+
+    @property
+    def tools(self) -> List[Dict[str, Any]]:
+        """Tool list for the chat completions tools parameter."""
+        return [{"type": "function", "function": d} for d in self.definitions]
+
+    def _prepare(self, tool_call) -> Callable[[], Any]:
+        func = self.functions.get(tool_call.function.name)
+        if func is None:
+            raise ValueError(f"Unknown tool: {tool_call.function.name}")
+        arguments = json.loads(tool_call.function.arguments or "{}")
+        return lambda: func(**arguments)
+
+    def _coroutine_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self._loop.run_forever, name="tool-coroutines", daemon=True
+                ).start()
+            return self._loop
+
+    @staticmethod
+    async def _run_coroutine(call: Callable[[], Any], timeout: float) -> Any:
+        return await asyncio.wait_for(call(), timeout)
+
+    def execute(
+        self, tool_calls, timeout: float = TOOL_TIMEOUT
+    ) -> List[Dict[str, Any]]:
+        """
+        Run every tool call of a model turn concurrently.
+
+        Failures, invalid arguments and timeouts are reported back to the
+        model as error results instead of aborting the conversation. A
+        synchronous tool that times out keeps its pool worker until it
+        returns.
+
+        Args:
+            tool_calls: Tool calls from an assistant message
+            timeout (float): Seconds each tool may run
+
+        Returns:
+            List[Dict[str, Any]]: One tool message per call, in call order
+        """
+        outcomes: Dict[str, Any] = {}
+        futures: Dict[str, Future] = {}
+
+        for tool_call in tool_calls:
+            try:
+                call = self._prepare(tool_call)
+            except (ValueError, json.JSONDecodeError) as e:
+                outcomes[tool_call.id] = e
+                continue
+            if inspect.iscoroutinefunction(self.functions[tool_call.function.name]):
+                futures[tool_call.id] = asyncio.run_coroutine_threadsafe(
+                    self._run_coroutine(call, timeout), self._coroutine_loop()
+                )
+            else:
+                futures[tool_call.id] = self.executor.submit(call)
+        deadline = time.monotonic() + timeout
+
+        for call_id, future in futures.items():
+            try:
+                outcomes[call_id] = future.result(max(0.0, deadline - time.monotonic()))
+            except Exception as e:  # pylint: disable=broad-except
+                future.cancel()
+                outcomes[call_id] = e
+
+        messages = []
+        for tool_call in tool_calls:
+            outcome = outcomes[tool_call.id]
+            if isinstance(outcome, BaseException):
+                reason = str(outcome) or type(outcome).__name__
+                if isinstance(outcome, TimeoutError):
+                    reason = f"Tool timed out after {timeout} seconds"
+                content = json.dumps({"error": reason})
+            else:
+                content = json.dumps(outcome, default=str)
+            messages.append(
+                {"role": "tool", "content": content, "tool_call_id": tool_call.id}
+            )
+        return messages
+
+
+registry = ToolRegistry()
+
+
+_product_store: Optional[ProductStore] = None
+_product_store_lock = threading.Lock()
+
+
+def get_product_store() -> ProductStore:
+    """
+    Open the product catalogue, generating a sample one if it does not exist.
+
+    Returns:
+        ProductStore: Shared read-only store for PRODUCT_DB
+    """
+    global _product_store  # pylint: disable=global-statement
+    with _product_store_lock:
+        if _product_store is None:
+            if not os.path.exists(PRODUCT_DB):
+                create_catalogue(PRODUCT_DB)
+            _product_store = ProductStore(PRODUCT_DB)
+        return _product_store
 
 
 def find_product(sql_query: str) -> List[Dict[str, Any]]:
@@ -42,101 +204,136 @@ def find_product(sql_query: str) -> List[Dict[str, Any]]:
 
     Returns:
         List[Dict[str, Any]]: List of product dictionaries with name, color, and price
+
+    Raises:
+        ValueError: If the query is not a valid, fast enough SELECT statement
     """
-    # Mock database results
-    results = [
-        {"name": "pen", "color": "blue", "price": 2.5},
-        {"name": "pen", "color": "black", "price": 1.5},
-        {"name": "pen", "color": "white", "price": 0.5},
-    ]
-    return results
+    return get_product_store().query(sql_query)
 
 
 # Function definition for OpenAI
 function_find_product = {
     "name": "find_product",
-    "description": "Get a list of products from a SQL query",
+    "description": (
+        "Get a list of products from a SQLite query on the table "
+        "products(id INTEGER, name TEXT, color TEXT, price REAL)"
+    ),
     "parameters": {
         "type": "object",
         "properties": {
             "sql_query": {
                 "type": "string",
-                "description": "A SQL query",
+                "description": "A single read-only SELECT statement",
             },
         },
         "required": ["sql_query"],
     },
 }
 
-tools = [{"type": "function", "function": function_find_product}]
+registry.register(function_find_product)(find_product)
+tools = registry.tools
 
 
-def process_product_query(user_query: str, model: str = MODEL) -> str:
+def run_tool_loop(
+    messages: List[Any],
+    tool_registry: ToolRegistry = registry,
+    model: str = MODEL,
+    max_rounds: int = MAX_ROUNDS,
+    tool_timeout: float = TOOL_TIMEOUT,
+    bypass_cache: bool = False,
+    check: Optional[GuardCheck] = None,
+) -> str:
     """
-    Process a user query to find and describe products.
+    Let the model call tools until it produces a final answer.
+
+    Every tool call of a turn is executed concurrently and all results are
+    sent back in the next request. After max_rounds tool turns the model is
+    asked to answer without tools.
 
     Args:
-        user_query (str): Natural language query about products
+        messages (List[Any]): Conversation so far; extended in place
+        tool_registry (ToolRegistry): Tools the model may call
         model (str): OpenAI model to use
+        max_rounds (int): Maximum number of tool-calling turns
+        tool_timeout (float): Seconds each tool may run
+        bypass_cache (bool): Always request fresh completions
+        check (Optional[GuardCheck]): Moderation of the conversation input,
+            awaited before any tool runs or the answer is returned
 
     Returns:
-        str: Generated response about the requested products
+        str: The model's final answer
 
     Raises:
-        ValueError: If API key is not set or query is empty
+        FlaggedInputError: If the moderation check flags the input
         OpenAIError: If API call fails
-        json.JSONDecodeError: If function arguments are invalid
     """
-    if not client.api_key:
-        raise ValueError("OpenAI API key not found in environment variables")
-    if not user_query.strip():
-        raise ValueError("Query cannot be empty")
-
-    try:
-        # Initial message
-        messages = [{"role": "user", "content": user_query}]
-
-        # First API call to get function call
-        response = client.chat.completions.create(
+    client = get_client()
+    for _ in range(max_rounds):
+        response = cached_chat_completion(
+            client,
+            bypass=bypass_cache,
             model=model,
             messages=messages,
-            tools=tools,
+            tools=tool_registry.tools,
         )
-
-        # Process tool calls
         response_message = response.choices[0].message
+        if check is not None:
+            check.wait(cancelled=bool(response_message.tool_calls))
         if not response_message.tool_calls:
-            return "No product query could be processed from your request."
-
-        tool_call = response_message.tool_calls[0]
-        function_args = json.loads(tool_call.function.arguments)
-
-        # Execute function and add result to messages
-        products = find_product(function_args["sql_query"])
-        if not products:
-            return "No products found matching your criteria."
+            return response_message.content
 
+        messages.append(response_message)
         messages.extend(
-            [
-                response_message,
-                {
-                    "role": "tool",
-                    "content": json.dumps(products),
-                    "tool_call_id": tool_call.id,
-                },
-            ]
+            tool_registry.execute(response_message.tool_calls, tool_timeout)
         )
 
-        # Final API call to generate response
-        final_response = client.chat.completions.create(
-            model=model,
-            messages=messages,
-        )
+    final_response = cached_chat_completion(
+        client,
+        bypass=bypass_cache,
+        model=model,
+        messages=messages,
+        tools=tool_registry.tools,
+        tool_choice="none",
+    )
+    return final_response.choices[0].message.content
+
+
+def process_product_query(
+    user_query: str,
+    model: str = MODEL,
+    bypass_cache: bool = False,
+    guard: Optional[ModerationGuard] = None,
+) -> str:
+    """
+    Process a user query to find and describe products.
 
-        return final_response.choices[0].message.content
+    Args:
+        user_query (str): Natural language query about products
+        model (str): OpenAI model to use
+        bypass_cache (bool): Always request fresh completions
+        guard (Optional[ModerationGuard]): Moderates the query while the
+            model handles it
 
-    except json.JSONDecodeError as e:
-        raise json.JSONDecodeError(f"Invalid function arguments: {str(e)}", e.doc, e.pos)
+    Returns:
+        str: Generated response about the requested products
+
+    Raises:
+        ValueError: If API key is not set or query is empty
+        FlaggedInputError: If the guard flags the query
+        OpenAIError: If API call fails
+    """
+    get_client()  # Fails early when no API key is configured
+    if not user_query.strip():
+        raise ValueError("Query cannot be empty")
+
+    check = guard.start(user_query) if guard is not None else None
+    try:
+        messages = [{"role": "user", "content": user_query}]
+        return run_tool_loop(
+            messages, model=model, bypass_cache=bypass_cache, check=check
+        )
+    except FlaggedInputError:
+        raise
     except OpenAIError as e:
         raise OpenAIError(f"OpenAI API error: {str(e)}")
     except Exception as e:
@@ -0,0 +1,317 @@
+"""
+Transcript Ingestion Pipeline
+
+This module fetches YouTube transcripts for many videos at once and feeds
+them to the summarization and MCQ scripts as a stream. Transcripts are
+fetched by a bounded worker pool, cached on disk so reruns do not hit
+YouTube again, and yielded one video at a time so memory stays flat no
+matter how long the URL list is.
+
+Dependencies:
+    - youtube_transcript_api: Fetching transcripts from YouTube
+
+Features:
+    - URL lists from Python or from a playlist file, one URL per line
+    - Concurrent fetching with a bounded number of videos in flight
+    - Gzip-compressed on-disk cache keyed by video id and language
+    - Pluggable transcript sources, including local fixture files for tests
+    - Generator stages from transcripts to token-bounded chunks
+
+Example:
+    $ python transcripts.py urls.txt --cache .transcripts
+
+    from transcripts import TranscriptCache, iter_transcripts, read_url_list
+
+    cache = TranscriptCache(".transcripts")
+    for transcript in iter_transcripts(read_url_list("urls.txt"), cache=cache):
+        print(transcript.video_id, len(transcript.entries or []))
+"""
+
+import argparse
+import gzip
+import json
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from text_chunking import DEFAULT_MAX_TOKENS, iter_transcript_chunks
+
+DEFAULT_LANGUAGE = "en"
+MAX_WORKERS = 4
+
+Entries = List[Dict[str, Any]]
+
+
+def extract_video_id(url: str) -> str:
+    """
+    Extract video ID from a YouTube URL.
+
+    Args:
+        url (str): YouTube video URL
+
+    Returns:
+        str: YouTube video ID
+
+    Raises:
+        ValueError: If URL format is invalid
+    """
+    try:
+        if "v=" not in url:
+            raise ValueError("Invalid YouTube URL format")
+        return url.split("v=")[1].split("&")[0]
+    except Exception as e:
+        raise ValueError(f"Failed to extract video ID: {str(e)}")
+
+
+def read_url_list(path: str) -> Iterator[str]:
+    """
+    Read video URLs from a playlist file.
+
+    Args:
+        path (str): Text file with one URL per line; blank lines and lines
+            starting with # are skipped
+
+    Yields:
+        str: Video URLs in file order
+    """
+    with open(path, "r", encoding="utf-8") as url_file:
+        for line in url_file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+class YouTubeSource:
+    """Fetches transcripts from YouTube."""
+
+    def fetch(self, video_id: str, language: str) -> Entries:
+        """
+        Fetch the transcript of a video.
+
+        Args:
+            video_id (str): YouTube video ID
+            language (str): Transcript language code
+
+        Returns:
+            Entries: Transcript entries with text, start and duration
+        """
+        if hasattr(YouTubeTranscriptApi, "get_transcript"):
+            return YouTubeTranscriptApi.get_transcript(video_id, languages=[language])
+        # youtube-transcript-api 1.x replaced the static helper with fetch
+        fetched = YouTubeTranscriptApi().fetch(video_id, languages=[language])
+        return fetched.to_raw_data()
+
+
+class FixtureSource:
+    """
+    Reads transcripts from local files, for tests and offline runs.
+
+    A video is read from <directory>/<video_id>.json, a list of entries,
+    or from <directory>/<video_id>.txt, one entry per line.
+
+    Args:
+        directory (str): Directory holding the fixture files
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch(self, video_id: str, language: str) -> Entries:
+        """
+        Read the transcript of a video; the language is ignored.
+
+        Raises:
+            FileNotFoundError: If there is no fixture for the video
+        """
+        path = os.path.join(self.directory, f"{video_id}.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as fixture_file:
+                return json.load(fixture_file)
+        path = os.path.join(self.directory, f"{video_id}.txt")
+        with open(path, "r", encoding="utf-8") as fixture_file:
+            return [
+                {"text": line.strip(), "start": float(position), "duration": 1.0}
+                for position, line in enumerate(fixture_file)
+                if line.strip()
+            ]
+
+
+class TranscriptCache:
+    """
+    Compressed on-disk transcript cache keyed by video id and language.
+
+    Entries are stored as gzip-compressed JSON rows of [text, start, duration].
+
+    Args:
+        directory (str): Directory holding the cached transcripts
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, video_id: str, language: str) -> str:
+        return os.path.join(self.directory, f"{video_id}.{language}.json.gz")
+
+    def get(self, video_id: str, language: str) -> Optional[Entries]:
+        """Return the cached transcript, or None if it is not cached."""
+        try:
+            with gzip.open(self._path(video_id, language), "rt", encoding="utf-8") as f:
+                rows = json.load(f)
+        except FileNotFoundError:
+            return None
+        return [
+            {"text": text, "start": start, "duration": duration}
+            for text, start, duration in rows
+        ]
+
+    def set(self, video_id: str, language: str, entries: Entries):
+        """Store a transcript, replacing any cached copy atomically."""
+        rows = [
+            [entry["text"], entry.get("start", 0.0), entry.get("duration", 0.0)]
+            for entry in entries
+        ]
+        path = self._path(video_id, language)
+        temporary = f"{path}.tmp"
+        with gzip.open(temporary, "wt", encoding="utf-8") as f:
+            json.dump(rows, f, separators=(",", ":"))
+        os.replace(temporary, path)
+
+
+@dataclass
+class Transcript:
+    """Transcript of one video, or the reason it could not be fetched."""
+
+    url: str
+    video_id: Optional[str]
+    language: str
+    entries: Optional[Entries] = None
+    error: Optional[str] = None
+
+
+def fetch_transcript(
+    url: str,
+    source: Any = None,
+    cache: Optional[TranscriptCache] = None,
+    language: str = DEFAULT_LANGUAGE,
+) -> Transcript:
+    """
+    Fetch one transcript, through the cache when one is given.
+
+    Args:
+        url (str): YouTube video URL
+        source (Any): Object with fetch(video_id, language), defaults to YouTube
+        cache (Optional[TranscriptCache]): On-disk transcript cache
+        language (str): Transcript language code
+
+    Returns:
+        Transcript: The transcript, with error set if it could not be fetched
+    """
+    try:
+        video_id = extract_video_id(url)
+    except ValueError as e:
+        return Transcript(url, None, language, error=str(e))
+    try:
+        entries = cache.get(video_id, language) if cache else None
+        if entries is None:
+            entries = (source or YouTubeSource()).fetch(video_id, language)
+            if cache:
+                cache.set(video_id, language, entries)
+        return Transcript(url, video_id, language, entries)
+    except Exception as e:  # pylint: disable=broad-except
+        return Transcript(url, video_id, language, error=str(e))
+
+
+def iter_transcripts(
+    urls: Iterable[str],
+    source: Any = None,
+    cache: Optional[TranscriptCache] = None,
+    language: str = DEFAULT_LANGUAGE,
+    max_workers: int = MAX_WORKERS,
+) -> Iterator[Transcript]:
+    """
+    Fetch transcripts concurrently and yield them in URL order.
+
+    At most max_workers transcripts are fetched or waiting to be consumed
+    at any time, so the URL list may be arbitrarily long.
+
+    Args:
+        urls (Iterable[str]): YouTube video URLs, consumed lazily
+        source (Any): Object with fetch(video_id, language), defaults to YouTube
+        cache (Optional[TranscriptCache]): On-disk transcript cache
+        language (str): Transcript language code
+        max_workers (int): Maximum number of concurrent fetches
+
+    Yields:
+        Transcript: One per URL; failed fetches have error set
+
+    Raises:
+        ValueError: If max_workers is not positive
+    """
+    if max_workers <= 0:
+        raise ValueError("max_workers must be a positive number")
+    source = source or YouTubeSource()
+    pending: "deque[Future]" = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for url in urls:
+            if len(pending) >= max_workers:
+                yield pending.popleft().result()
+            pending.append(
+                executor.submit(fetch_transcript, url, source, cache, language)
+            )
+        while pending:
+            yield pending.popleft().result()
+
+
+def iter_video_chunks(
+    transcripts: Iterable[Transcript], max_tokens: int = DEFAULT_MAX_TOKENS
+) -> Iterator[Tuple[Transcript, Iterator[str]]]:
+    """
+    Pair every fetched transcript with a lazy stream of its text chunks.
+
+    Transcripts that could not be fetched are reported and skipped.
+
+    Args:
+        transcripts (Iterable[Transcript]): Output of iter_transcripts
+        max_tokens (int): Maximum size of each chunk in tokens
+
+    Yields:
+        Tuple[Transcript, Iterator[str]]: Transcript and its chunks
+    """
+    for transcript in transcripts:
+        if transcript.error is not None:
+            print(f"Skipping {transcript.url}: {transcript.error}")
+            continue
+        yield transcript, iter_transcript_chunks(transcript.entries, max_tokens)
+
+
+def main():
+    """Fetch and cache the transcripts of a playlist file."""
+    parser = argparse.ArgumentParser(description="Fetch YouTube transcripts")
+    parser.add_argument("urls", help="File with one YouTube URL per line")
+    parser.add_argument("--cache", default=".transcripts")
+    parser.add_argument("--fixtures", help="Read transcripts from this directory")
+    parser.add_argument("--language", default=DEFAULT_LANGUAGE)
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    source = FixtureSource(args.fixtures) if args.fixtures else None
+    for transcript in iter_transcripts(
+        read_url_list(args.urls),
+        source,
+        TranscriptCache(args.cache),
+        args.language,
+        args.workers,
+    ):
+        if transcript.error is not None:
+            print(f"{transcript.url}: error: {transcript.error}")
+        else:
+            print(f"{transcript.video_id}: {len(transcript.entries)} entries")
+
+
+if __name__ == "__main__":
+    main()
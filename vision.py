@@ -7,6 +7,7 @@ extract information from visual content.
 
 Dependencies:
     - openai: The official OpenAI Python client library
+    - Pillow: Resizing and encoding local images
     - Environment variable OPENAI_API_KEY must be set
 
 Features:
@@ -14,44 +15,452 @@ Features:
     - Support for both image URLs and local files
     - Multiple analysis modes (description, detail extraction)
     - Handle various image formats (PNG, JPEG, etc.)
+    - Local images resized to what the model actually sees and encoded to
+      data URLs once, through an LRU cache keyed by file hash and mtime
+    - low/high detail chosen per image to bound token cost
+    - Whole directories answered concurrently, several images per request
 
 Example:
     $ export OPENAI_API_KEY='your-api-key'
     $ python vision.py
+    $ python vision.py photos/ --question "List the product category"
+
+    from vision import answer_each, ask_about_images
+
+    print(ask_about_images(["cat.jpg", IMAGE_URL], "What do these have in common?"))
+    print(answer_each(["a.jpg", "b.jpg"], "Name the animal"))
 """
 
+import argparse
+import base64
+import hashlib
+import io
+import math
 import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
 from openai import OpenAI, OpenAIError
+from PIL import Image
 
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
+from openai_client import get_client
+from rate_limiter import create_chat_completion
+from structured_output import parse_json, response_format
 
 MODEL = "gpt-4o"
 IMAGE_URL = (
     "https://upload.wikimedia.org/wikipedia/commons/f/f0/Ophiopteris_antipodum.JPG"
 )
-messages = [
-    {
-        "role": "user",
-        "content": [
-            {"type": "text", "text": "Give the name of the animal in the image"},
-            {
-                "type": "image_url",
-                "image_url": {"url": IMAGE_URL},
-            },
-        ],
+QUESTION = "Give the name of the animal in the image"
+
+# The model downsizes images to these bounds, so larger uploads are wasted
+LOW_DETAIL_SIDE = 512
+HIGH_DETAIL_LONG_SIDE = 2048
+HIGH_DETAIL_SHORT_SIDE = 768
+# Token cost: a base charge plus one charge per 512px tile in high detail
+BASE_IMAGE_TOKENS = 85
+TILE_TOKENS = 170
+MAX_IMAGE_TOKENS = 765
+JPEG_QUALITY = 85
+
+IMAGES_PER_REQUEST = 4
+MAX_CONCURRENCY = 8
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif")
+
+
+def _scaled(width: int, height: int, detail: str) -> Tuple[int, int]:
+    """Dimensions the model works with for an image at a detail level."""
+    if detail == "low":
+        limits = [LOW_DETAIL_SIDE / max(width, height)]
+    else:
+        limits = [
+            HIGH_DETAIL_LONG_SIDE / max(width, height),
+            HIGH_DETAIL_SHORT_SIDE / min(width, height),
+        ]
+    scale = min(1.0, *limits)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def image_tokens(width: int, height: int, detail: str) -> int:
+    """
+    Estimate the prompt tokens an image costs.
+
+    Args:
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        detail (str): "low" or "high"
+
+    Returns:
+        int: Estimated tokens
+    """
+    if detail == "low":
+        return BASE_IMAGE_TOKENS
+    width, height = _scaled(width, height, "high")
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return BASE_IMAGE_TOKENS + TILE_TOKENS * tiles
+
+
+def choose_detail(width: int, height: int, max_tokens: int = MAX_IMAGE_TOKENS) -> str:
+    """
+    Pick the detail level of an image for "auto".
+
+    Small images gain nothing from high detail; large ones use it while it
+    stays within max_tokens.
+
+    Args:
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        max_tokens (int): Most tokens one image may cost
+
+    Returns:
+        str: "low" or "high"
+    """
+    if max(width, height) <= LOW_DETAIL_SIDE:
+        return "low"
+    return "high" if image_tokens(width, height, "high") <= max_tokens else "low"
+
+
+@dataclass
+class EncodedImage:
+    """A local image prepared for a request."""
+
+    url: str
+    detail: str
+    width: int
+    height: int
+
+    @property
+    def tokens(self) -> int:
+        """Estimated prompt tokens of the image."""
+        return image_tokens(self.width, self.height, self.detail)
+
+
+class ImageEncoder:
+    """
+    Resizes local images and encodes them to data URLs, with an LRU cache.
+
+    Files are identified by their content hash, which is itself cached by
+    path, mtime and size, so unchanged files are never read twice and
+    identical files under different names share one entry.
+
+    Args:
+        max_bytes (int): Total size of cached data URLs
+        max_tokens (int): Token limit used when choosing "auto" detail
+    """
+
+    def __init__(
+        self, max_bytes: int = CACHE_MAX_BYTES, max_tokens: int = MAX_IMAGE_TOKENS
+    ):
+        self.max_bytes = max_bytes
+        self.max_tokens = max_tokens
+        self.hits = 0
+        self.misses = 0
+        self._size = 0
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._entries: "OrderedDict[Tuple[str, str], EncodedImage]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _file_hash(self, path: str) -> str:
+        status = os.stat(path)
+        identity = (os.path.abspath(path), status.st_mtime_ns, status.st_size)
+        with self._lock:
+            digest = self._hashes.get(identity)
+        if digest is None:
+            hasher = hashlib.sha256()
+            with open(path, "rb") as image_file:
+                for block in iter(lambda: image_file.read(1 << 20), b""):
+                    hasher.update(block)
+            digest = hasher.hexdigest()
+            with self._lock:
+                self._hashes[identity] = digest
+        return digest
+
+    @staticmethod
+    def _encode(path: str, detail: str, max_tokens: int) -> EncodedImage:
+        with Image.open(path) as image:
+            if detail == "auto":
+                detail = choose_detail(image.width, image.height, max_tokens)
+            size = _scaled(image.width, image.height, detail)
+            transparent = "A" in image.getbands() or "transparency" in image.info
+            image = image.convert("RGBA" if transparent else "RGB")
+            if size != image.size:
+                image = image.resize(size, Image.LANCZOS)
+            buffer = io.BytesIO()
+            if transparent:
+                image.save(buffer, format="PNG", optimize=True)
+                mime = "image/png"
+            else:
+                image.save(buffer, format="JPEG", quality=JPEG_QUALITY)
+                mime = "image/jpeg"
+        data = base64.b64encode(buffer.getvalue()).decode("ascii")
+        return EncodedImage(f"data:{mime};base64,{data}", detail, *size)
+
+    def encode(self, path: str, detail: str = "auto") -> EncodedImage:
+        """
+        Encode a local image, resized for the chosen detail level.
+
+        Args:
+            path (str): Image file
+            detail (str): "low", "high" or "auto"
+
+        Returns:
+            EncodedImage: Data URL, detail and dimensions sent to the model
+
+        Raises:
+            ValueError: If the file is not a readable image
+        """
+        key = (self._file_hash(path), detail)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+        try:
+            encoded = self._encode(path, detail, self.max_tokens)
+        except OSError as e:
+            raise ValueError(f"Cannot read image {path}: {str(e)}") from e
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = encoded
+                self._size += len(encoded.url)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.url)
+        return encoded
+
+
+default_encoder = ImageEncoder()
+
+
+def image_part(
+    source: str, detail: str = "auto", encoder: Optional[ImageEncoder] = None
+) -> Dict[str, Any]:
+    """
+    Build the image_url content part for a URL or a local file.
+
+    Args:
+        source (str): http(s) or data URL, or a local file path
+        detail (str): "low", "high" or "auto"
+        encoder (Optional[ImageEncoder]): Encoder for local files
+
+    Returns:
+        Dict[str, Any]: Content part for a chat message
+    """
+    if source.startswith(("http://", "https://", "data:")):
+        return {"type": "image_url", "image_url": {"url": source, "detail": detail}}
+    encoded = (encoder or default_encoder).encode(source, detail)
+    return {
+        "type": "image_url",
+        "image_url": {"url": encoded.url, "detail": encoded.detail},
     }
-]
 
-try:
-    if not client.api_key:
-        raise ValueError("OpenAI API key not found in environment variables")
 
-    response = client.chat.completions.create(model=MODEL, messages=messages)
+def ask_about_images(
+    sources: Sequence[str],
+    question: str = QUESTION,
+    detail: str = "auto",
+    model: str = MODEL,
+    client: Optional[OpenAI] = None,
+    encoder: Optional[ImageEncoder] = None,
+) -> str:
+    """
+    Ask one question about one or more images together.
+
+    Args:
+        sources (Sequence[str]): Image URLs or local files
+        question (str): Question about the images
+        detail (str): "low", "high" or "auto"
+        model (str): OpenAI model to use
+        client (Optional[OpenAI]): Client to use, defaults to the shared client
+        encoder (Optional[ImageEncoder]): Encoder for local files
+
+    Returns:
+        str: The model's answer
+
+    Raises:
+        ValueError: If a local image cannot be read
+        OpenAIError: If API call fails
+    """
+    content = [{"type": "text", "text": question}]
+    content.extend(image_part(source, detail, encoder) for source in sources)
+    response = create_chat_completion(
+        client or get_client(),
+        model=model,
+        messages=[{"role": "user", "content": content}],
+    )
+    return response.choices[0].message.content
+
+
+def answer_each(
+    sources: Sequence[str],
+    question: str = QUESTION,
+    detail: str = "auto",
+    model: str = MODEL,
+    client: Optional[OpenAI] = None,
+    encoder: Optional[ImageEncoder] = None,
+) -> List[str]:
+    """
+    Answer the same question separately for each image, in one request.
+
+    The images are labelled image_1, image_2, ... and the reply is a JSON
+    object with one answer per label. Suits questions each image answers on
+    its own, such as tagging or classification.
+
+    Args:
+        sources (Sequence[str]): Image URLs or local files
+        question (str): Question asked of every image
+        detail (str): "low", "high" or "auto"
+        model (str): OpenAI model to use
+        client (Optional[OpenAI]): Client to use, defaults to the shared client
+        encoder (Optional[ImageEncoder]): Encoder for local files
+
+    Returns:
+        List[str]: One answer per image, in order
+
+    Raises:
+        ValueError: If a local image cannot be read or the reply is invalid
+        OpenAIError: If API call fails
+    """
+    labels = [f"image_{n + 1}" for n in range(len(sources))]
+    schema = {
+        "type": "object",
+        "properties": {label: {"type": "string"} for label in labels},
+        "required": labels,
+    }
+    content: List[Dict[str, Any]] = [
+        {
+            "type": "text",
+            "text": f"{question}\nAnswer separately for each image, "
+            f"keyed by its label ({', '.join(labels)}).",
+        }
+    ]
+    for label, source in zip(labels, sources):
+        content.append({"type": "text", "text": label})
+        content.append(image_part(source, detail, encoder))
+    response = create_chat_completion(
+        client or get_client(),
+        model=model,
+        messages=[{"role": "user", "content": content}],
+        response_format=response_format(schema, "answers"),
+    )
+    answers = parse_json(response.choices[0].message.content, schema)
+    return [answers[label] for label in labels]
+
+
+@dataclass
+class VisionResult:
+    """Answer for one image of a directory run."""
+
+    path: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+
+
+def list_images(directory: str) -> Iterator[str]:
+    """Yield the image files of a directory tree in sorted order."""
+    for root, directories, files in os.walk(directory):
+        directories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def iter_directory_answers(
+    directory: str,
+    question: str = QUESTION,
+    images_per_request: int = IMAGES_PER_REQUEST,
+    max_concurrency: int = MAX_CONCURRENCY,
+    detail: str = "auto",
+    model: str = MODEL,
+) -> Iterator[VisionResult]:
+    """
+    Answer a question for every image in a directory tree.
+
+    Images are sent images_per_request at a time and up to max_concurrency
+    requests run at once; at most that many groups are held in memory, so
+    the directory may be arbitrarily large.
+
+    Args:
+        directory (str): Directory to scan
+        question (str): Question asked of every image
+        images_per_request (int): Images answered by one request
+        max_concurrency (int): Maximum number of requests in flight
+        detail (str): "low", "high" or "auto"
+        model (str): OpenAI model to use
+
+    Yields:
+        VisionResult: One per image, in file order
+
+    Raises:
+        ValueError: If images_per_request or max_concurrency is not positive
+    """
+    if images_per_request <= 0 or max_concurrency <= 0:
+        raise ValueError("images_per_request and max_concurrency must be positive")
+    client = get_client()
+
+    def run(paths: List[str]) -> List[VisionResult]:
+        try:
+            if len(paths) == 1:
+                answers = [ask_about_images(paths, question, detail, model, client)]
+            else:
+                answers = answer_each(paths, question, detail, model, client)
+        except (OpenAIError, ValueError) as e:
+            return [VisionResult(path, error=str(e)) for path in paths]
+        return [VisionResult(path, answer) for path, answer in zip(paths, answers)]
+
+    pending: "deque[Future]" = deque()
+    group: List[str] = []
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+
+        def submit():
+            pending.append(executor.submit(run, list(group)))
+            group.clear()
+
+        for path in list_images(directory):
+            group.append(path)
+            if len(group) < images_per_request:
+                continue
+            if len(pending) >= max_concurrency:
+                yield from pending.popleft().result()
+            submit()
+        if group:
+            submit()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def main():
+    """Ask about the example image, or about every image of a directory."""
+    parser = argparse.ArgumentParser(description="Ask questions about images")
+    parser.add_argument("sources", nargs="*", help="Image files, URLs or a directory")
+    parser.add_argument("--question", default=QUESTION)
+    parser.add_argument("--detail", choices=["auto", "low", "high"], default="auto")
+    parser.add_argument("--per-request", type=int, default=IMAGES_PER_REQUEST)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    args = parser.parse_args()
+
+    try:
+        if len(args.sources) == 1 and os.path.isdir(args.sources[0]):
+            for result in iter_directory_answers(
+                args.sources[0], args.question, args.per_request,
+                args.concurrency, args.detail,
+            ):  # fmt: skip
+                print(f"{result.path}: {result.answer or 'error: ' + result.error}")
+        else:
+            sources = args.sources or [IMAGE_URL]
+            print(ask_about_images(sources, args.question, args.detail))
+
+    except OpenAIError as e:
+        print(f"OpenAI API error occurred: {str(e)}")
+    except ValueError as e:
+        print(f"Configuration error: {str(e)}")
 
-except OpenAIError as e:
-    print(f"OpenAI API error occurred: {str(e)}")
-except ValueError as e:
-    print(f"Configuration error: {str(e)}")
 
-print(response.choices[0].message.content)
+if __name__ == "__main__":
+    main()
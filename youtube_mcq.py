@@ -8,131 +8,422 @@ Dependencies:
     - youtube_transcript_api
     - openai
     - langchain
+    - tiktoken
 
 Main Features:
-    1. Extracts transcripts using the YouTube API
+    1. Extracts transcripts using the YouTube API, for many videos concurrently
     2. Chunks large transcripts into manageable pieces
     3. Generates concise summaries using OpenAI's GPT-4
     4. Creates multiple choice questions for educational purposes
+    5. Checkpoints every step, so a restarted run only redoes unfinished work
+    6. Optional per-chunk mode: questions for each chunk are generated as soon
+       as its summary is ready, returned as structured objects through a JSON
+       schema, and near-duplicates are removed using embeddings
 
 Example Usage:
     from youtube_mcq import YouTubeMCQGenerator
-    
+
     generator = YouTubeMCQGenerator("video_url")
     mcqs = generator.generate_questions()
     print(mcqs)
+
+    Per-chunk questions for every video of a playlist file:
+
+    $ python youtube_mcq.py urls.txt --per-chunk
 """
 
-import os
-import time
-from youtube_transcript_api import YouTubeTranscriptApi
-from openai import OpenAI, RateLimitError
+import argparse
+import asyncio
+import json
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional, Sequence
+from openai import AsyncOpenAI, OpenAIError
+from checkpoints import CheckpointStore, prompt_version
+from embeddings import embed_texts_async, normalize_rows
+from openai_client import close_async_client, get_async_client, get_client
+from response_cache import cached_chat_completion, cached_chat_completion_async
+from structured_output import SchemaValidationError, parse_json, response_format
+from token_budget import ContextOverflowError, fit_max_tokens, max_tokens_for_words
+from transcripts import (
+    TranscriptCache,
+    iter_transcripts,
+    iter_video_chunks,
+    read_url_list,
+)
+from youtube_summarization import (
+    CHECKPOINT_PATH,
+    DEFAULT_URLS,
+    SUMMARY_PROMPT,
+    TRANSCRIPT_CACHE,
+    summarize_text,
+    summarize_text_async,
+)
+
+MODEL = "gpt-4"
+# Structured Outputs (strict json_schema) needs gpt-4o-mini or a later model
+QUESTION_MODEL = "gpt-4o-mini"
+MCQ_PROMPT = "Generate multiple choice questions from the following summary:"
+MCQ_WORDS = 400
+CHUNK_MCQ_PROMPT = (
+    "Write {count} multiple choice questions about the following summary. "
+    "Give every question four options and the exact text of the correct option."
+)
+QUESTIONS_PER_CHUNK = 3
+MAX_CONCURRENCY = 8
+DUPLICATE_THRESHOLD = 0.9
+
+QUESTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "questions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "question": {"type": "string"},
+                    "options": {"type": "array", "items": {"type": "string"}},
+                    "answer": {"type": "string"},
+                },
+                "required": ["question", "options", "answer"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["questions"],
+    "additionalProperties": False,
+}
 
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
 
-YOUTUBE_URL = "https://www.youtube.com/watch?v=P99aw9snZi0"
-video_id = YOUTUBE_URL.split("v=")[1]
+@dataclass
+class Question:
+    """A multiple choice question and the chunk it was generated from."""
 
+    question: str
+    options: List[str]
+    answer: str
+    chunk: int = 0
 
-def chunk_text(text, chunk_size=4000):
+    def __str__(self) -> str:
+        lines = [self.question]
+        for letter, option in zip("ABCDEFGH", self.options):
+            marker = "*" if option == self.answer else " "
+            lines.append(f" {marker} {letter}) {option}")
+        return "\n".join(lines)
+
+
+def generate_mcq_from_summary(summary, bypass_cache=False):
     """
-    Split text into smaller chunks of specified size.
+    Generate multiple choice questions from a text summary.
 
     Args:
-        text (str): The input text to be chunked
-        chunk_size (int): Maximum size of each chunk in characters
+        summary (str): Text summary to generate questions from
+        bypass_cache (bool): Always sample fresh questions
 
     Returns:
-        list: List of text chunks
+        str: Generated MCQ questions or None if generation fails
     """
-    words = text.split()
-    chunks = []
-    current_chunk = []
-    current_size = 0
-
-    for word in words:
-        current_size += len(word) + 1  # +1 for space
-        if current_size > chunk_size:
-            chunks.append(" ".join(current_chunk))
-            current_chunk = [word]
-            current_size = len(word)
-        else:
-            current_chunk.append(word)
-
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-    return chunks
-
-
-def generate_mcq_from_summary(summary):
+    messages = [
+        {"role": "system", "content": "You are a helpful assistant."},
+        {"role": "user", "content": f"{MCQ_PROMPT}\n\n{summary}"},
+    ]
+    try:
+        mcq_response = cached_chat_completion(
+            get_client(),
+            bypass=bypass_cache,
+            model=MODEL,
+            messages=messages,
+            max_tokens=fit_max_tokens(messages, MODEL, max_tokens_for_words(MCQ_WORDS)),
+            n=1,
+            stop=None,
+            temperature=0.7,
+        )
+        questions = mcq_response.choices[0].message.content.strip()
+        return questions
+    except ContextOverflowError as e:
+        print(f"Summary too long to generate MCQs from: {str(e)}")
+    except OpenAIError as e:
+        print(f"Failed to generate MCQs after several retries: {str(e)}")
+    return None
+
+
+async def generate_questions_async(
+    summary: str,
+    count: int = QUESTIONS_PER_CHUNK,
+    client: Optional[AsyncOpenAI] = None,
+    bypass_cache: bool = False,
+) -> Optional[List[Question]]:
     """
-    Generate multiple choice questions from a text summary.
+    Generate structured multiple choice questions from one chunk summary.
 
     Args:
         summary (str): Text summary to generate questions from
+        count (int): Number of questions to ask for
+        client (Optional[AsyncOpenAI]): Client to use, defaults to the shared client
+        bypass_cache (bool): Always sample fresh questions
 
     Returns:
-        str: Generated MCQ questions or None if generation fails
+        Optional[List[Question]]: Generated questions, or None if generation fails
     """
-    retries = 3
-    for i in range(retries):
-        try:
-            mcq_response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {
-                        "role": "user",
-                        "content": (
-                            "Generate multiple choice questions from the following "
-                            f"summary:\n\n{summary}"
-                        ),
-                    },
-                ],
-                max_tokens=500,
-                n=1,
-                stop=None,
-                temperature=0.7,
-            )
-            questions = mcq_response.choices[0].message.content.strip()
-            return questions
-        except RateLimitError:
-            print(f"Rate limit exceeded. Retrying in {2 ** i} seconds...")
-            time.sleep(2**i)
-    print("Failed to generate MCQs after several retries.")
+    try:
+        response = await cached_chat_completion_async(
+            client or get_async_client(),
+            bypass=bypass_cache,
+            model=QUESTION_MODEL,
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant."},
+                {
+                    "role": "user",
+                    "content": f"{CHUNK_MCQ_PROMPT.format(count=count)}\n\n{summary}",
+                },
+            ],
+            response_format=response_format(QUESTION_SCHEMA, "questions"),
+            temperature=0.7,
+        )
+        message = response.choices[0].message
+        if getattr(message, "refusal", None):
+            print(f"Model refused to generate MCQs: {message.refusal}")
+            return None
+        data = parse_json(message.content, QUESTION_SCHEMA)
+        return [Question(**item) for item in data["questions"]]
+    except OpenAIError as e:
+        print(f"Failed to generate MCQs after several retries: {str(e)}")
+    except SchemaValidationError as e:
+        print(f"Failed to parse generated MCQs: {str(e)}")
     return None
 
-def main():
-    """Process YouTube video to generate summary and MCQ questions."""
-    transcript = YouTubeTranscriptApi.get_transcript(video_id)
-    text_chunks = chunk_text(" ".join([entry["text"] for entry in transcript]))
 
-    summaries = []
-    for chunk in text_chunks:
+async def dedupe_questions(
+    questions: Sequence[Question],
+    threshold: float = DUPLICATE_THRESHOLD,
+    client: Optional[AsyncOpenAI] = None,
+) -> List[Question]:
+    """
+    Drop questions whose embedding is too similar to an earlier question.
+
+    Args:
+        questions (Sequence[Question]): Questions in preferred order
+        threshold (float): Cosine similarity above which questions are duplicates
+        client (Optional[AsyncOpenAI]): Client to use, defaults to the shared client
+
+    Returns:
+        List[Question]: The first question of every group of near-duplicates
+    """
+    if len(questions) < 2:
+        return list(questions)
+    vectors = normalize_rows(
+        await embed_texts_async([q.question for q in questions], client=client)
+    )
+    similarity = vectors @ vectors.T
+    kept: List[int] = []
+    for position in range(len(questions)):
+        if not kept or similarity[position, kept].max() < threshold:
+            kept.append(position)
+    return [questions[position] for position in kept]
+
+
+async def generate_chunk_mcqs(
+    chunks: Sequence[str],
+    video_id: str = "",
+    checkpoints: Optional[CheckpointStore] = None,
+    questions_per_chunk: int = QUESTIONS_PER_CHUNK,
+    max_concurrency: int = MAX_CONCURRENCY,
+    threshold: float = DUPLICATE_THRESHOLD,
+    client: Optional[AsyncOpenAI] = None,
+) -> List[Question]:
+    """
+    Generate questions for every chunk, overlapping summaries and questions.
+
+    Each chunk is summarized and then immediately turned into questions, so
+    question generation for early chunks runs while later chunks are still
+    being summarized. Near-duplicate questions are removed at the end.
+
+    Args:
+        chunks (Sequence[str]): Transcript chunks in order
+        video_id (str): Video the chunks belong to, part of the checkpoint key
+        checkpoints (Optional[CheckpointStore]): Store of finished steps
+        questions_per_chunk (int): Number of questions asked per chunk
+        max_concurrency (int): Maximum number of requests in flight
+        threshold (float): Cosine similarity above which questions are duplicates
+        client (Optional[AsyncOpenAI]): Client to use, defaults to the shared client
+
+    Returns:
+        List[Question]: Questions in chunk order
+
+    Raises:
+        ValueError: If max_concurrency is not positive
+    """
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be a positive number")
+    semaphore = asyncio.Semaphore(max_concurrency)
+    summary_version = prompt_version(SUMMARY_PROMPT)
+    questions_version = prompt_version(
+        CHUNK_MCQ_PROMPT.format(count=questions_per_chunk),
+        json.dumps(QUESTION_SCHEMA, sort_keys=True),
+    )
+
+    async def summarize(chunk: str) -> str:
+        async with semaphore:
+            return await summarize_text_async(chunk, MODEL, client=client)
+
+    async def ask(summary: str) -> Optional[str]:
+        async with semaphore:
+            questions = await generate_questions_async(
+                summary, questions_per_chunk, client
+            )
+        if questions is None:
+            return None
+        return json.dumps([asdict(question) for question in questions])
+
+    async def step(text: str, version: str, model: str, run) -> Optional[str]:
+        if checkpoints is None:
+            return await run(text)
+        return await checkpoints.get_or_run_async(video_id, text, version, model, run)
+
+    async def pipeline(position: int, chunk: str) -> List[Question]:
+        summary = await step(chunk, summary_version, MODEL, summarize)
+        if not summary:
+            return []
+        questions = await step(summary, questions_version, QUESTION_MODEL, ask)
+        return [
+            Question(**dict(item, chunk=position))
+            for item in json.loads(questions or "[]")
+        ]
+
+    results = await asyncio.gather(
+        *(pipeline(position, chunk) for position, chunk in enumerate(chunks))
+    )
+    questions = [question for result in results for question in result]
+    return await dedupe_questions(questions, threshold, client)
+
+
+def generate_video_mcqs(
+    chunks: Sequence[str],
+    video_id: str = "",
+    checkpoints: Optional[CheckpointStore] = None,
+    questions_per_chunk: int = QUESTIONS_PER_CHUNK,
+) -> List[Question]:
+    """
+    Synchronous wrapper around generate_chunk_mcqs.
+
+    Args:
+        chunks (Sequence[str]): Transcript chunks in order
+        video_id (str): Video the chunks belong to, part of the checkpoint key
+        checkpoints (Optional[CheckpointStore]): Store of finished steps
+        questions_per_chunk (int): Number of questions asked per chunk
+
+    Returns:
+        List[Question]: Deduplicated questions in chunk order
+    """
+
+    async def run() -> List[Question]:
         try:
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "Summarize this text concisely:"},
-                    {"role": "user", "content": chunk},
-                ],
+            return await generate_chunk_mcqs(
+                chunks, video_id, checkpoints, questions_per_chunk
             )
-            summaries.append(response.choices[0].message.content)
-            time.sleep(1)
-        except RateLimitError:
-            print("Rate limit hit, waiting 60 seconds...")
-            time.sleep(60)
-            continue
-
-    print("\nFinal Summary:")
+        finally:
+            await close_async_client()
+
+    return asyncio.run(run())
+
+
+def process_video(
+    video_id: str,
+    text_chunks: Iterable[str],
+    checkpoints: CheckpointStore,
+    summary_version: str,
+    mcq_version: str,
+    per_chunk: bool = False,
+):
+    """
+    Summarize one video's chunks and print the generated MCQ questions.
+
+    Args:
+        video_id (str): Video the chunks belong to
+        text_chunks (Iterable[str]): Transcript chunks in order
+        checkpoints (CheckpointStore): Store of finished steps
+        summary_version (str): Checkpoint version of the summary prompt
+        mcq_version (str): Checkpoint version of the MCQ prompt
+        per_chunk (bool): Generate structured questions for every chunk
+            instead of one set from all summaries
+
+    Raises:
+        OpenAIError: If API call fails
+        ValueError: If a request is invalid
+    """
+    if per_chunk:
+        questions = generate_video_mcqs(list(text_chunks), video_id, checkpoints)
+        print(f"\nGenerated MCQ Questions for {video_id}:")
+        for number, question in enumerate(questions, 1):
+            print(f"\n{number}. {question}")
+        return
+
+    summaries = [
+        summary
+        for summary in (
+            checkpoints.get_or_run(
+                video_id, chunk, summary_version, MODEL, summarize_text
+            )
+            for chunk in text_chunks
+        )
+        if summary
+    ]
+
+    print(f"\nFinal Summary of {video_id}:")
     print("\n".join(summaries))
 
-    mcq_questions = generate_mcq_from_summary("\n".join(summaries))
+    mcq_questions = checkpoints.get_or_run(
+        video_id,
+        "\n".join(summaries),
+        mcq_version,
+        MODEL,
+        generate_mcq_from_summary,
+    )
     if mcq_questions:
         print("\nGenerated MCQ Questions:")
         print(mcq_questions)
 
 
+def main(
+    urls: Optional[Iterable[str]] = None,
+    cache_dir: str = TRANSCRIPT_CACHE,
+    checkpoint_path: str = CHECKPOINT_PATH,
+    per_chunk: bool = False,
+):
+    """
+    Process YouTube videos to generate summaries and MCQ questions.
+
+    Args:
+        urls (Optional[Iterable[str]]): Video URLs, defaults to DEFAULT_URLS
+        cache_dir (str): Directory of the on-disk transcript cache
+        checkpoint_path (str): SQLite file recording finished steps
+        per_chunk (bool): Generate structured questions for every chunk
+            instead of one set from all summaries
+    """
+    checkpoints = CheckpointStore(checkpoint_path)
+    summary_version = prompt_version(SUMMARY_PROMPT)
+    mcq_version = prompt_version(MCQ_PROMPT)
+    transcripts = iter_transcripts(
+        urls or DEFAULT_URLS, cache=TranscriptCache(cache_dir)
+    )
+    for transcript, text_chunks in iter_video_chunks(transcripts):
+        video_id = transcript.video_id
+        # A failed video is reported and the run moves on to the next one
+        try:
+            process_video(
+                video_id,
+                text_chunks,
+                checkpoints,
+                summary_version,
+                mcq_version,
+                per_chunk,
+            )
+        except (OpenAIError, ValueError) as e:
+            print(f"\nFailed to process {video_id}: {str(e)}")
+
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate MCQs from YouTube videos")
+    parser.add_argument("urls", nargs="?", help="File with one YouTube URL per line")
+    parser.add_argument("--per-chunk", action="store_true")
+    args = parser.parse_args()
+    main(read_url_list(args.urls) if args.urls else None, per_chunk=args.per_chunk)
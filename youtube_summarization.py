@@ -7,13 +7,17 @@ using the YouTube Transcript API and OpenAI's language models.
 Dependencies:
     - youtube_transcript_api
     - openai
+    - tiktoken
     - os
-    - time
 
 Main Features:
     - Extract transcripts from YouTube videos
     - Generate AI-powered summaries of video content
-    - Handle rate limiting and API errors
+    - Shared adaptive rate limiting and retries for API calls
+    - Concurrent map-reduce summarization of long transcripts
+    - Many videos per run, with concurrently fetched and cached transcripts
+    - Per-chunk checkpoints, so a restarted run only redoes unfinished work
+    - Optional on-disk response cache (set OPENAI_RESPONSE_CACHE)
 
 Example Usage:
     from youtube_summarization import summarize_video
@@ -21,133 +25,317 @@ Example Usage:
     video_id = "dQw4w9WgXcQ"
     summary = summarize_video(video_id)
     print(summary)
-"""
 
-import os
-import time
-from typing import List
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled
-from openai import OpenAI, OpenAIError, RateLimitError
+    Summarize many chunks concurrently, merging the partial summaries:
+
+    import asyncio
+    from text_chunking import chunk_text
+    from youtube_summarization import map_reduce_summarize
 
-client = OpenAI()
-client.api_key = os.getenv("OPENAI_API_KEY")
+    summaries = asyncio.run(map_reduce_summarize(chunk_text(text), reduce=True))
 
+    Summarize every video of a playlist file:
 
-def extract_video_id(url: str) -> str:
+    $ python youtube_summarization.py urls.txt
+"""
+
+import argparse
+import asyncio
+from typing import Iterable, List, Optional
+from openai import AsyncOpenAI, OpenAIError
+from checkpoints import CheckpointStore, prompt_version
+from openai_client import close_async_client, get_async_client, get_client
+from response_cache import cached_chat_completion, cached_chat_completion_async
+from token_budget import count_tokens
+from transcripts import (  # pylint: disable=unused-import
+    TranscriptCache,
+    extract_video_id,
+    iter_transcripts,
+    iter_video_chunks,
+    read_url_list,
+)
+
+SUMMARY_PROMPT = "Summarize this text concisely:"
+REDUCE_PROMPT = "Combine these partial summaries into one concise summary:"
+MAX_CONCURRENCY = 8
+MAX_REDUCE_TOKENS = 6000
+TRANSCRIPT_CACHE = ".transcripts"
+CHECKPOINT_PATH = "checkpoints.sqlite"
+DEFAULT_URLS = ["https://www.youtube.com/watch?v=P99aw9snZi0"]
+
+
+def summarize_text(text: str, model: str = "gpt-4", bypass_cache: bool = False) -> str:
     """
-    Extract video ID from a YouTube URL.
+    Generate a summary of the given text using OpenAI's API.
 
     Args:
-        url (str): YouTube video URL
+        text (str): Text to summarize
+        model (str): OpenAI model to use
+        bypass_cache (bool): Always request a fresh summary
 
     Returns:
-        str: YouTube video ID
+        str: Generated summary
 
     Raises:
-        ValueError: If URL format is invalid
+        OpenAIError: If API call fails
     """
     try:
-        if "v=" not in url:
-            raise ValueError("Invalid YouTube URL format")
-        return url.split("v=")[1].split("&")[0]
-    except Exception as e:
-        raise ValueError(f"Failed to extract video ID: {str(e)}")
+        response = cached_chat_completion(
+            get_client(),
+            bypass=bypass_cache,
+            model=model,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": text},
+            ],
+        )
+        return response.choices[0].message.content
+    except OpenAIError as e:
+        raise OpenAIError(f"Failed to generate summary: {str(e)}")
 
 
-def chunk_text(text: str, chunk_size: int = 4000) -> List[str]:
+async def summarize_text_async(
+    text: str,
+    model: str = "gpt-4",
+    prompt: str = SUMMARY_PROMPT,
+    client: Optional[AsyncOpenAI] = None,
+    bypass_cache: bool = False,
+) -> str:
     """
-    Split text into smaller chunks of specified size.
+    Asynchronously generate a summary of the given text.
 
     Args:
-        text (str): The input text to be chunked
-        chunk_size (int): Maximum size of each chunk in characters
+        text (str): Text to summarize
+        model (str): OpenAI model to use
+        prompt (str): System prompt describing the summarization task
+        client (Optional[AsyncOpenAI]): Client to use, defaults to the shared client
+        bypass_cache (bool): Always request a fresh summary
 
     Returns:
-        List[str]: List of text chunks
+        str: Generated summary
+
+    Raises:
+        OpenAIError: If API call fails
     """
-    words = text.split()
-    chunks = []
-    current_chunk = []
-    current_size = 0
+    try:
+        response = await cached_chat_completion_async(
+            client or get_async_client(),
+            bypass=bypass_cache,
+            model=model,
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": text},
+            ],
+        )
+        return response.choices[0].message.content
+    except OpenAIError as e:
+        raise OpenAIError(f"Failed to generate summary: {str(e)}") from e
 
-    for word in words:
-        current_size += len(word) + 1  # +1 for space
-        if current_size > chunk_size:
-            chunks.append(" ".join(current_chunk))
-            current_chunk = [word]
-            current_size = len(word)
-        else:
-            current_chunk.append(word)
 
-    if current_chunk:
-        chunks.append(" ".join(current_chunk))
-    return chunks
+def _group_summaries(
+    summaries: List[str], max_tokens: int, model: str
+) -> List[List[str]]:
+    """
+    Pack consecutive summaries into groups that fit one reduce request.
 
+    Every group holds at least two summaries so each reduce round shrinks
+    the list, even when single summaries are close to the budget.
+    """
+    groups = []
+    current: List[str] = []
+    current_size = 0
 
-def summarize_text(text: str, model: str = "gpt-4") -> str:
+    for summary in summaries:
+        size = count_tokens(summary, model) + 1  # +1 for the newline separator
+        if len(current) >= 2 and current_size + size > max_tokens:
+            groups.append(current)
+            current = []
+            current_size = 0
+        current.append(summary)
+        current_size += size
+
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].extend(current)
+        else:
+            groups.append(current)
+    return groups
+
+
+async def map_reduce_summarize(
+    chunks: List[str],
+    model: str = "gpt-4",
+    max_concurrency: int = MAX_CONCURRENCY,
+    reduce: bool = False,
+    max_reduce_tokens: int = MAX_REDUCE_TOKENS,
+    client: Optional[AsyncOpenAI] = None,
+    checkpoints: Optional[CheckpointStore] = None,
+    video_id: str = "",
+) -> List[str]:
     """
-    Generate a summary of the given text using OpenAI's API.
+    Summarize chunks concurrently and optionally merge the partial summaries.
+
+    The map step summarizes every chunk with at most ``max_concurrency``
+    requests in flight. Summaries are returned in the original chunk order.
+    With ``reduce`` enabled, consecutive summaries are merged in a tree until
+    they fit into ``max_reduce_tokens``, then combined into a single summary.
 
     Args:
-        text (str): Text to summarize
+        chunks (List[str]): Text chunks to summarize
         model (str): OpenAI model to use
+        max_concurrency (int): Maximum number of requests in flight
+        reduce (bool): Whether to merge the partial summaries into one
+        max_reduce_tokens (int): Size budget of a single reduce request in tokens
+        client (Optional[AsyncOpenAI]): Client to use, defaults to the shared client
+        checkpoints (Optional[CheckpointStore]): Store of finished steps; steps
+            recorded there are not requested again
+        video_id (str): Video the chunks belong to, part of the checkpoint key
 
     Returns:
-        str: Generated summary
+        List[str]: Ordered chunk summaries, or a single merged summary if reducing
 
     Raises:
+        ValueError: If max_concurrency is not positive
         OpenAIError: If API call fails
     """
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "Summarize this text concisely:"},
-                {"role": "user", "content": text},
-            ],
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be a positive number")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def summarize(text: str, prompt: str) -> str:
+        async with semaphore:
+            return await summarize_text_async(text, model, prompt, client)
+
+    async def run(text: str, prompt: str) -> str:
+        if checkpoints is None:
+            return await summarize(text, prompt)
+        return await checkpoints.get_or_run_async(
+            video_id,
+            text,
+            prompt_version(prompt),
+            model,
+            lambda chunk: summarize(chunk, prompt),
         )
-        return response.choices[0].message.content
-    except RateLimitError:
-        print("Rate limit hit, waiting 60 seconds...")
-        time.sleep(60)
-        return summarize_text(text, model)  # Retry
-    except OpenAIError as e:
-        raise OpenAIError(f"Failed to generate summary: {str(e)}")
 
+    summaries = await asyncio.gather(*(run(chunk, SUMMARY_PROMPT) for chunk in chunks))
+    summaries = [summary for summary in summaries if summary]
+    if not reduce or len(summaries) <= 1:
+        return summaries
+
+    while (
+        len(summaries) > 1
+        and count_tokens("\n".join(summaries), model) > max_reduce_tokens
+    ):
+        groups = _group_summaries(summaries, max_reduce_tokens, model)
+        summaries = await asyncio.gather(
+            *(run("\n".join(group), REDUCE_PROMPT) for group in groups)
+        )
 
-def main():
-    """Main function to process YouTube video and generate summary."""
-    try:
-        if not client.api_key:
-            raise ValueError("OpenAI API key not found in environment variables")
+    return [await run("\n".join(summaries), REDUCE_PROMPT)]
 
-        YOUTUBE_URL = "https://www.youtube.com/watch?v=P99aw9snZi0"
-        video_id = extract_video_id(YOUTUBE_URL)
 
+def summarize_chunks(
+    chunks: List[str],
+    model: str = "gpt-4",
+    reduce: bool = False,
+    checkpoints: Optional[CheckpointStore] = None,
+    video_id: str = "",
+) -> List[str]:
+    """
+    Synchronous wrapper around map_reduce_summarize.
+
+    The event loop's async client is closed before returning, so repeated
+    calls do not leave connection pools open.
+
+    Args:
+        chunks (List[str]): Text chunks to summarize
+        model (str): OpenAI model to use
+        reduce (bool): Whether to merge the partial summaries into one
+        checkpoints (Optional[CheckpointStore]): Store of finished steps
+        video_id (str): Video the chunks belong to, part of the checkpoint key
+
+    Returns:
+        List[str]: Ordered chunk summaries, or a single merged summary if reducing
+
+    Raises:
+        OpenAIError: If API call fails
+    """
+
+    async def run() -> List[str]:
         try:
-            transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        except TranscriptsDisabled:
-            print("Transcripts are disabled for this video")
-            return
-        except Exception as e:
-            print(f"Failed to fetch transcript: {str(e)}")
-            return
-
-        FULL_TEXT = " ".join([entry["text"] for entry in transcript])
-        text_chunks = chunk_text(FULL_TEXT)
-
-        summaries = []
-        for chunk in text_chunks:
-            summary = summarize_text(chunk)
-            if summary:
-                summaries.append(summary)
-
-        print("\nFinal Summary:")
-        print("\n".join(summaries))
+            return await map_reduce_summarize(
+                chunks,
+                model,
+                reduce=reduce,
+                checkpoints=checkpoints,
+                video_id=video_id,
+            )
+        finally:
+            await close_async_client()
+
+    return asyncio.run(run())
+
+
+def main(
+    concurrent: bool = True,
+    reduce: bool = False,
+    urls: Optional[Iterable[str]] = None,
+    cache_dir: str = TRANSCRIPT_CACHE,
+    checkpoint_path: str = CHECKPOINT_PATH,
+):
+    """
+    Main function to process YouTube videos and generate summaries.
 
-    except Exception as e:
-        print(f"An error occurred: {str(e)}")
+    Args:
+        concurrent (bool): Summarize chunks concurrently instead of one by one
+        reduce (bool): Merge the chunk summaries into a single summary
+        urls (Optional[Iterable[str]]): Video URLs, defaults to DEFAULT_URLS
+        cache_dir (str): Directory of the on-disk transcript cache
+        checkpoint_path (str): SQLite file recording finished chunk summaries
+    """
+    try:
+        get_client()  # Fails early when no API key is configured
+    except ValueError as e:
+        print(f"Configuration error: {str(e)}")
+        return
+    checkpoints = CheckpointStore(checkpoint_path)
+    version = prompt_version(SUMMARY_PROMPT)
+
+    transcripts = iter_transcripts(
+        urls or DEFAULT_URLS, cache=TranscriptCache(cache_dir)
+    )
+    for transcript, chunks in iter_video_chunks(transcripts):
+        # A failed video is reported and the run moves on to the next one
+        try:
+            text_chunks = list(chunks)
+
+            if concurrent:
+                summaries = summarize_chunks(
+                    text_chunks,
+                    reduce=reduce,
+                    checkpoints=checkpoints,
+                    video_id=transcript.video_id,
+                )
+            else:
+                summaries = []
+                for chunk in text_chunks:
+                    summary = checkpoints.get_or_run(
+                        transcript.video_id, chunk, version, "gpt-4", summarize_text
+                    )
+                    if summary:
+                        summaries.append(summary)
+        except (OpenAIError, ValueError) as e:
+            print(f"\nFailed to summarize {transcript.video_id}: {str(e)}")
+            continue
+
+        print(f"\nFinal Summary of {transcript.video_id}:")
+        print("\n".join(summaries))
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Summarize YouTube videos")
+    parser.add_argument("urls", nargs="?", help="File with one YouTube URL per line")
+    parser.add_argument("--reduce", action="store_true")
+    args = parser.parse_args()
+    main(reduce=args.reduce, urls=read_url_list(args.urls) if args.urls else None)